@@ -1,25 +1,31 @@
 import gradio as gr
 import pandas as pd
 import os
-from transformers import pipeline
+from transformers import pipeline, StoppingCriteria, StoppingCriteriaList
 import torch
 import sys
-import json
 import logging
 from src.logging_config import setup_logging
+from src.availability_index import availability_index
+from src.profiling import profile_request, request_id_var, new_request_id
+from src.reference_index import reporter_index, commodity_index
+from src.comtrade_api import SeriesKey
+from src import api
+from src.narrative import NarrativeGenerator, template_narrative
 
 # Add the 'src' directory to the Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from pipeline import run_analysis_pipeline
 from config import (
     LLM_MODEL,
     LLM_MAX_NEW_TOKENS,
-    REPORTERS_JSON_PATH,
-    COMMODITIES_JSON_PATH,
-    COUNTRY_CODE_MAP,
+    REFERENCE_DROPDOWN_MAX_LEVEL,
     GRADIO_SERVER_NAME,
     GRADIO_SERVER_PORT,
+    INTERACTIVE_TIME_BUDGET_SECONDS,
+    PREWARM_ENABLED,
+    LLM_UPGRADE_WHEN_READY,
+    LLM_UPGRADE_TIMEOUT_SECONDS,
 )
 
 # --- 0. Setup Logging ---
@@ -37,55 +43,67 @@ try:
     )
     logging.info("Generative AI pipeline loaded successfully.")
 except Exception as e:
-    logging.error(f"Error loading LLM: {e}. Using a placeholder function.")
-    def generator(prompt, **kwargs):
-        return [{"generated_text": "Generative AI model could not be loaded. This is a placeholder."}]
+    logging.error(f"Error loading LLM: {e}. Falling back to template narratives.")
+    generator = None
 
-# --- 2. Load Data for Dropdowns ---
-def get_dropdown_choices():
-    """Loads the metadata from local JSON files to populate the dropdowns."""
-    try:
-        with open(REPORTERS_JSON_PATH, 'r') as f:
-            reporters = json.load(f)
-        with open(COMMODITIES_JSON_PATH, 'r') as f:
-            commodities = json.load(f)
-            
-        partners = [{"id": "0", "text": "World"}] + reporters
-        
-        reporter_choices = [(r['text'], r['id']) for r in reporters if r['text'] != 'World']
-        partner_choices = [(p['text'], p['id']) for p in partners]
-        commodity_choices = [(c['text'], c['id']) for c in commodities]
-        
-        return reporter_choices, partner_choices, commodity_choices
-    except FileNotFoundError as e:
-        logging.error(f"Could not load dropdown choices: {e}")
-        return [], [], []
+class StopOnEvent(StoppingCriteria):
+    """Ends generation at the next token once an event is set."""
 
-# --- 3. Define Core Logic ---
-def generate_analysis(reporter_id, partner_id, product_id, progress=gr.Progress()):
-    """
-    Main function for the Gradio interface. Runs the pipeline and generates AI analysis.
-    """
-    # Clear previous outputs
-    empty_df = pd.DataFrame()
-    initial_outputs = [empty_df, empty_df, ""]
+    def __init__(self, event):
+        self.event = event
 
-    if not all([reporter_id, partner_id, product_id]):
-        logging.warning("User did not make a selection for all dropdowns.")
-        return initial_outputs + ["Please make a selection for all dropdowns."]
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.event.is_set()
+
+def generate_llm_text(prompt, stop_event):
+    """Runs the LLM on a prompt and returns only the model's reply, stopping early if `stop_event` is set."""
+    outputs = generator(prompt, max_new_tokens=LLM_MAX_NEW_TOKENS, stopping_criteria=StoppingCriteriaList([StopOnEvent(stop_event)]))
+    return outputs[0]['generated_text'].split('<start_of_turn>model\n')[-1]
+
+# Bounds how long a request waits for the LLM and how many may queue for it.
+narrator = NarrativeGenerator(generate_llm_text if generator is not None else None)
 
-    country_code = COUNTRY_CODE_MAP.get(reporter_id, "WLD")
+# --- 2. Load Data for Dropdowns ---
+def get_dropdown_choices():
+    """Builds the dropdown choices from the reference indexes loaded at startup."""
+    reporter_choices = [choice for choice in reporter_index.choices(sort_by_text=True) if choice[1] != '0']
+    partner_choices = [("World", "0")] + reporter_choices
+    commodity_choices = commodity_index.choices(max_level=REFERENCE_DROPDOWN_MAX_LEVEL)
+    return reporter_choices, partner_choices, commodity_choices
 
-    forecast_df, backtest_df, error_message = run_analysis_pipeline(reporter_id, partner_id, product_id, country_code, progress)
+def search_product_choices(query, commodity_choices):
+    """Returns the product choices matching a name or HS code prefix, with their parent chapter."""
+    if not query.strip():
+        return commodity_choices
+    choices = []
+    for entry in commodity_index.search(query):
+        ancestors = commodity_index.ancestors(entry.id)
+        label = f"{entry.text} ({ancestors[-1].text})" if ancestors else entry.text
+        choices.append((label, entry.id))
+    return choices
 
-    if error_message:
-        logging.error(f"Analysis failed: {error_message}")
-        return initial_outputs + [f"**Analysis Failed**\n\n{error_message}"]
+def filter_product_choices(reporter_id, partner_id, commodity_choices):
+    """Drops products the availability index knows cannot be forecast for the selection."""
+    if not (reporter_id and partner_id):
+        return commodity_choices
+    availability_index.reload_if_changed()
+    return [
+        (text, product_id) for text, product_id in commodity_choices
+        if availability_index.is_forecastable((reporter_id, partner_id, product_id))
+    ]
 
-    if forecast_df is None:
-        logging.error("An unknown error occurred in the pipeline.")
-        return initial_outputs + ["An unknown error occurred."]
+# --- 3. Define Core Logic ---
+def generate_narrative(forecast_df, backtest_df, skipped_stages, keep_pending=True):
+    """Generates the analysis text for a completed pipeline run.
 
+    Args:
+        keep_pending (bool): Whether to keep an LLM generation that missed its
+                             deadline; otherwise it is cancelled.
+
+    Returns:
+        tuple: The analysis text, and the still-running LLM generation when the
+               text is the template fallback because the LLM missed its deadline.
+    """
     prompt = f"""
     <start_of_turn>user
     You are an expert economic analyst. Provide a forecast summary for the trade relationship based on the following data.
@@ -102,11 +120,94 @@ def generate_analysis(reporter_id, partner_id, product_id, progress=gr.Progress(
     <start_of_turn>model
     """
 
+    generated_text, pending = narrator.generate(prompt, lambda: template_narrative(forecast_df, backtest_df), keep_pending)
+    return generated_text + skipped_stages_note(skipped_stages), pending
+
+def skipped_stages_note(skipped_stages):
+    """Returns the note appended to the analysis when stages were skipped for the time budget."""
+    if not skipped_stages:
+        return ""
+    return f"\n\n_Skipped to stay within the {INTERACTIVE_TIME_BUDGET_SECONDS:.0f}s time budget: {', '.join(skipped_stages)}._"
+
+@profile_request
+def stream_analysis(reporter_id, partner_id, product_id, progress=gr.Progress(), upgrade_narrative=LLM_UPGRADE_WHEN_READY):
+    """
+    Runs the pipeline and yields the outputs as each stage completes, so the
+    cleaned history and SARIMAX forecast appear before the slower stages finish.
+
+    If the LLM misses its deadline a template narrative is yielded first, and
+    with `upgrade_narrative` the LLM text replaces it once it is ready.
+
+    Yields:
+        tuple: (history_df, forecast_df, backtest_df, analysis, error_message)
+    """
+    # Clear previous outputs
+    empty_df = pd.DataFrame()
+
+    if not all([reporter_id, partner_id, product_id]):
+        logging.warning("User did not make a selection for all dropdowns.")
+        yield empty_df, empty_df, empty_df, "", "Please make a selection for all dropdowns."
+        return
+
+    key = SeriesKey(str(reporter_id), str(partner_id), str(product_id))
+    history_df, forecast_df, backtest_df = empty_df, empty_df, empty_df
+    pending_text = "_Generating AI analysis once all models have finished..._"
+
+    # Shares the API's cache, popularity counts, and live-request counter, so the
+    # prewarmer keeps popular selections warm for the UI and yields to UI traffic.
+    api.popularity.record(key)
+    cached = api.result_cache.get(key)
+    if cached is not None:
+        logging.info(f"Serving {reporter_id}/{partner_id}/{product_id} from the result cache.")
+        history_df = api.records_to_frame(cached['history']).reset_index()
+        forecast_df = api.records_to_frame(cached['forecast'])
+        backtest_df = api.records_to_frame(cached['backtest'])
+        skipped_stages = cached['skipped_stages']
+    else:
+        with api.live_requests.track():
+            for event in api.stream_forecast(key, INTERACTIVE_TIME_BUDGET_SECONDS, progress):
+                if event.stage == 'error':
+                    logging.error(f"Analysis failed: {event.data}")
+                    yield empty_df, empty_df, empty_df, "", f"**Analysis Failed**\n\n{event.data}"
+                    return
+                if event.stage == 'done':
+                    forecast_df, backtest_df, skipped_stages = event.data
+                    break
+                if event.stage == 'cleaned':
+                    history_df = event.data
+                elif event.stage in ('sarimax', 'baseline', 'lstm'):
+                    forecast_df = event.data
+                elif event.stage == 'backtest':
+                    backtest_df = event.data
+                yield history_df, forecast_df, backtest_df, pending_text, ""
+            else:
+                logging.error("An unknown error occurred in the pipeline.")
+                yield empty_df, empty_df, empty_df, "", "An unknown error occurred."
+                return
+
     progress(1.0, desc="Generating AI Analysis...")
-    outputs = generator(prompt, max_new_tokens=LLM_MAX_NEW_TOKENS)
-    generated_text = outputs[0]['generated_text'].split('<start_of_turn>model\n')[-1]
-    
-    return forecast_df, backtest_df, generated_text, ""
+    analysis, pending = generate_narrative(forecast_df, backtest_df, skipped_stages, keep_pending=upgrade_narrative)
+    yield history_df, forecast_df, backtest_df, analysis, ""
+
+    if pending is not None and upgrade_narrative:
+        try:
+            llm_text = pending.result(timeout=LLM_UPGRADE_TIMEOUT_SECONDS)
+        except Exception as e:
+            logging.warning(f"Keeping template narrative; LLM text not available: {e}")
+            narrator.cancel(pending)
+            return
+        yield history_df, forecast_df, backtest_df, llm_text + skipped_stages_note(skipped_stages), ""
+
+@profile_request
+def generate_analysis(reporter_id, partner_id, product_id, progress=gr.Progress()):
+    """
+    Main function for the Gradio interface. Runs the pipeline and generates AI analysis.
+    Returns as soon as an analysis is available, without waiting for a late LLM.
+    """
+    for outputs in stream_analysis(reporter_id, partner_id, product_id, progress, upgrade_narrative=False):
+        pass
+    history_df, forecast_df, backtest_df, generated_text, error_message = outputs
+    return forecast_df, backtest_df, generated_text, error_message
 
 # --- 4. Setup and Launch the App ---
 if __name__ == "__main__":
@@ -120,37 +221,55 @@ if __name__ == "__main__":
             reporter_dd = gr.Dropdown(reporter_choices, label="Reporter (Exporting Country)", value="842") # Default USA
             partner_dd = gr.Dropdown(partner_choices, label="Partner (Importing Country/Region)", value="0") # Default World
             product_dd = gr.Dropdown(commodity_choices, label="Product Category", value="87") # Default Vehicles
-        
+        product_search = gr.Textbox(label="Search Products", placeholder="Type a product name or HS code, e.g. 'vehicles' or '8703'")
+
+        def update_product_choices(query, reporter_id, partner_id):
+            choices = search_product_choices(query, commodity_choices)
+            return gr.update(choices=filter_product_choices(reporter_id, partner_id, choices))
+
+        for component in (reporter_dd, partner_dd, product_search):
+            component.change(update_product_choices, inputs=[product_search, reporter_dd, partner_dd], outputs=product_dd)
+
         submit_btn = gr.Button("Generate Forecast and Analysis", variant="primary")
         
         with gr.Accordion("Help / About", open=False):
             gr.Markdown("""
-            - **Forecasted Values:** The predicted trade values for the next 5 years from two different models (SARIMAX and LSTM).
+            - **Historical Values:** The cleaned annual trade values the models are trained on.
+            - **Forecasted Values:** The predicted trade values for the next 5 years from three model families (SARIMAX, LSTM, and a fast statistical baseline averaging Holt's trend, Theta, and GDP-driven drift).
             - **Model Backtest Results:** How the models performed when forecasting the *last 5 years* of historical data. This helps gauge which model is more reliable. 'Error' is the difference between the actual and forecasted value.
             - **Generative AI Analysis:** An AI-generated summary of the results.
             """)
 
         error_box = gr.Markdown(value="", visible=False)
 
+        history_output = gr.DataFrame(label="Historical Values (Cleaned)")
         forecast_output = gr.DataFrame(label="Forecasted Values (Next 5 Years)")
         backtest_output = gr.DataFrame(label="Model Backtest Results (Last 5 Years)")
         analysis_output = gr.Markdown()
 
-        def submit_logic(reporter_id, partner_id, product_id):
-            forecast_df, backtest_df, analysis, error_msg = generate_analysis(reporter_id, partner_id, product_id)
-            error_visibility = bool(error_msg)
-            return {
-                forecast_output: forecast_df,
-                backtest_output: backtest_df,
-                analysis_output: analysis,
-                error_box: gr.update(value=error_msg, visible=error_visibility)
-            }
+        def submit_logic(reporter_id, partner_id, product_id, request: gr.Request = None):
+            # Tag this request's logs and profile with the caller's X-Request-ID, or a new id.
+            request_id = (request.headers.get('x-request-id') if request is not None else None) or new_request_id()
+            request_id_var.set(request_id)
+            logging.info(f"Analysis request {request_id}: {reporter_id}/{partner_id}/{product_id}")
+            # Render each stage as soon as the pipeline yields it.
+            for history_df, forecast_df, backtest_df, analysis, error_msg in stream_analysis(reporter_id, partner_id, product_id):
+                error_visibility = bool(error_msg)
+                yield {
+                    history_output: history_df,
+                    forecast_output: forecast_df,
+                    backtest_output: backtest_df,
+                    analysis_output: analysis,
+                    error_box: gr.update(value=error_msg, visible=error_visibility)
+                }
 
         submit_btn.click(
             fn=submit_logic,
             inputs=[reporter_dd, partner_dd, product_dd],
-            outputs=[forecast_output, backtest_output, analysis_output, error_box]
+            outputs=[history_output, forecast_output, backtest_output, analysis_output, error_box]
         )
 
+    if PREWARM_ENABLED:
+        api.prewarmer.start()
     logging.info("Launching Gradio web application...")
     demo.launch(server_name=GRADIO_SERVER_NAME, server_port=GRADIO_SERVER_PORT)
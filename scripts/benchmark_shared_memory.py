@@ -0,0 +1,125 @@
+"""Compares dispatching pipeline inputs to worker processes by pickling and by shared memory.
+
+For a synthetic panel of trade series and per-reporter GDP tables, every
+task is sent to a process pool either as the pickled enriched DataFrame plus
+the reporter's feature matrix (what a plain `ProcessPoolExecutor.map` over
+the model functions would do) or as a series key and country code that the
+worker resolves against the shared-memory data plane. The task itself does
+almost no work, so the timings measure dispatch overhead.
+
+Usage:
+    python scripts/benchmark_shared_memory.py --series 2000 --years 40 --workers 4
+"""
+import os
+import sys
+import time
+import pickle
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.comtrade_api import SeriesKey
+from src.exog_features import ExogFeatureMatrix
+from src.shared_data import SharedDataPlane, shared_exog, shared_series
+
+
+def make_inputs(n_series, n_years, n_reporters, first_year=1980):
+    """Builds random series keyed by reporter, and one GDP matrix per reporter."""
+    rng = np.random.default_rng(0)
+    reporters = [f"R{i:03d}" for i in range(n_reporters)]
+    matrices = {
+        reporter: ExogFeatureMatrix(first_year, ['GDP_USD'], 1e12 * np.cumprod(rng.normal(1.03, 0.02, n_years))[:, None])
+        for reporter in reporters
+    }
+    series = {}
+    for i in range(n_series):
+        key = SeriesKey(str(i % n_reporters), '0', f"{i:06d}")
+        start = rng.integers(0, n_years // 2)
+        series[key] = pd.Series(1e3 * np.cumprod(rng.normal(1.04, 0.1, n_years - start)),
+                                index=range(first_year + start, first_year + n_years))
+    return series, matrices, reporters
+
+
+def enriched_frame(values, matrix):
+    """Builds the enriched DataFrame the pipeline would pass to the models."""
+    years = values.index.values
+    return pd.DataFrame({
+        'Year': pd.to_datetime(years.astype(str)),
+        'Value': values.values,
+        'GDP_USD': matrix.at_years(years)[:, 0],
+    })
+
+
+def _pickled_task(input_df, exog_matrix):
+    return float(input_df['Value'].iloc[-1] + exog_matrix.values[-1, 0])
+
+
+def _shared_task(key, country_code):
+    return float(shared_series(key)['Value'].iloc[-1] + shared_exog(country_code).values[-1, 0])
+
+
+def _warm_up(executor, workers, fn, *args):
+    # Start every worker process before timing.
+    list(executor.map(fn, *[[arg] * workers * 2 for arg in args]))
+
+
+def run_benchmark(n_series, n_years, n_reporters, workers):
+    """Dispatches one task per series both ways and returns the IPC bytes and timings of each."""
+    series, matrices, reporters = make_inputs(n_series, n_years, n_reporters)
+    keys = list(series)
+    codes = [reporters[int(key.reporter)] for key in keys]
+    context = multiprocessing.get_context('spawn')
+
+    # --- Pickling ---
+    frames = [enriched_frame(series[key], matrices[code]) for key, code in zip(keys, codes)]
+    exogs = [matrices[code] for code in codes]
+    pickled_bytes = sum(len(pickle.dumps((frame, exog))) for frame, exog in zip(frames, exogs))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        _warm_up(executor, workers, _pickled_task, frames[0], exogs[0])
+        start = time.perf_counter()
+        pickled_results = list(executor.map(_pickled_task, frames, exogs, chunksize=16))
+        pickled_seconds = time.perf_counter() - start
+
+    # --- Shared memory ---
+    with SharedDataPlane() as plane:
+        start = time.perf_counter()
+        for code, matrix in matrices.items():
+            plane.publish_exog(code, matrix)
+        plane.publish_panel(series)
+        publish_seconds = time.perf_counter() - start
+        setup_bytes = len(pickle.dumps(plane.handles)) * workers
+        shared_bytes = sum(len(pickle.dumps((key, code))) for key, code in zip(keys, codes))
+        with plane.executor(max_workers=workers) as executor:
+            _warm_up(executor, workers, _shared_task, keys[0], codes[0])
+            start = time.perf_counter()
+            shared_results = list(executor.map(_shared_task, keys, codes, chunksize=16))
+            shared_seconds = time.perf_counter() - start
+
+    if not np.allclose(pickled_results, shared_results):
+        raise RuntimeError("Pickled and shared-memory workers returned different results.")
+
+    return pd.DataFrame({
+        'task_ipc_bytes': [pickled_bytes, shared_bytes],
+        'setup_ipc_bytes': [0, setup_bytes],
+        'bytes_per_task': [pickled_bytes / n_series, (shared_bytes + setup_bytes) / n_series],
+        'publish_seconds': [0.0, publish_seconds],
+        'dispatch_seconds': [pickled_seconds, shared_seconds],
+        'us_per_task': [1e6 * pickled_seconds / n_series, 1e6 * shared_seconds / n_series],
+    }, index=pd.Index(['pickle', 'shared_memory'], name='transport'))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark worker dispatch by pickling against shared memory.")
+    parser.add_argument('--series', type=int, default=2000)
+    parser.add_argument('--years', type=int, default=40)
+    parser.add_argument('--reporters', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.series, args.years, args.reporters, args.workers)
+    with pd.option_context('display.float_format', '{:,.3f}'.format, 'display.width', None, 'display.max_columns', None):
+        print(results)
@@ -38,17 +38,20 @@ def create_lstm_dataset(dataset, look_back=1):
         dataY.append(dataset[i + look_back, 0])
     return np.array(dataX), np.array(dataY)
 
-def forecast_lstm(input_df):
+def forecast_lstm(input_df, exog_matrix=None):
     """Builds and trains a Long Short-Term Memory (LSTM) model for forecasting.
 
     This function preprocesses the data by scaling the 'Value' and 'GDP_USD'
-    features. It then structures the data for a supervised learning problem,
-    trains a simple LSTM model using Keras, and generates a forecast for the
-    next `FORECAST_STEPS` years.
+    features, or the features of `exog_matrix` when one is given. It then
+    structures the data for a supervised learning problem, trains a simple
+    LSTM model using Keras, and generates a forecast for the next
+    `FORECAST_STEPS` years.
 
     Args:
         input_df (pd.DataFrame): The enriched DataFrame containing 'Year', 'Value',
                                  and 'GDP_USD' columns.
+        exog_matrix (ExogFeatureMatrix, optional): Precomputed exogenous features
+                                                   for the reporter.
 
     Returns:
         pd.DataFrame: A DataFrame containing the mean forecast values for the
@@ -57,19 +60,32 @@ def forecast_lstm(input_df):
     logging.info("Training LSTM model...")
     df = input_df.set_index('Year')
     df.index = pd.to_datetime(df.index)
-    df = df.asfreq('YS').dropna()
+    df = df.asfreq('YS')
+
+    if exog_matrix is None:
+        df = df.dropna()
+        exog = df[['GDP_USD']].values
+        future_exog = np.array(
+            [df['GDP_USD'].iloc[-1] * (GDP_GROWTH_ASSUMPTION)**i for i in range(1, FORECAST_STEPS + 1)]
+        ).reshape(-1, 1)
+    else:
+        df = df.dropna(subset=['Value'])
+        df = df[exog_matrix.covers(df.index.year)]
+        exog = exog_matrix.at_years(df.index.year)
+        future_exog = exog_matrix.extrapolate(df.index.year[-1], FORECAST_STEPS)
+    n_features = 1 + exog.shape[1]
 
     scaler_value = MinMaxScaler(feature_range=(0, 1))
-    scaler_gdp = MinMaxScaler(feature_range=(0, 1))
+    scaler_exog = MinMaxScaler(feature_range=(0, 1))
     
-    df['Value_Scaled'] = scaler_value.fit_transform(df['Value'].values.reshape(-1, 1))
-    df['GDP_Scaled'] = scaler_gdp.fit_transform(df['GDP_USD'].values.reshape(-1, 1))
+    value_scaled = scaler_value.fit_transform(df['Value'].values.reshape(-1, 1))
+    exog_scaled = scaler_exog.fit_transform(exog)
     
-    dataset = df[['Value_Scaled', 'GDP_Scaled']].values
+    dataset = np.hstack([value_scaled, exog_scaled])
     trainX, trainY = create_lstm_dataset(dataset, LSTM_LOOK_BACK)
 
     model = Sequential([
-        LSTM(LSTM_NEURONS, input_shape=(LSTM_LOOK_BACK, 2)),
+        LSTM(LSTM_NEURONS, input_shape=(LSTM_LOOK_BACK, n_features)),
         Dense(1)
     ])
     model.compile(loss='mean_squared_error', optimizer='adam')
@@ -77,18 +93,16 @@ def forecast_lstm(input_df):
 
     logging.info("Generating LSTM forecast...")
     last_data = dataset[-LSTM_LOOK_BACK:]
-    future_gdp_scaled = scaler_gdp.transform(
-        np.array([df['GDP_USD'].iloc[-1] * (GDP_GROWTH_ASSUMPTION)**i for i in range(1, FORECAST_STEPS + 1)]).reshape(-1, 1)
-    )
+    future_exog_scaled = scaler_exog.transform(future_exog)
     
     forecast = []
     current_input = last_data
     
-    for gdp_val in future_gdp_scaled:
-        pred_input = np.reshape(current_input, (1, LSTM_LOOK_BACK, 2))
+    for exog_row in future_exog_scaled:
+        pred_input = np.reshape(current_input, (1, LSTM_LOOK_BACK, n_features))
         pred = model.predict(pred_input, verbose=0)
         forecast.append(pred[0][0])
-        new_row = np.array([pred[0][0], gdp_val[0]])
+        new_row = np.concatenate([[pred[0][0]], exog_row])
         current_input = np.append(current_input[1:], [new_row], axis=0)
 
     forecast = scaler_value.inverse_transform(np.array(forecast).reshape(-1, 1))
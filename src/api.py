@@ -0,0 +1,290 @@
+import gzip
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, request, jsonify, g
+from src.comtrade_api import SeriesKey
+import pandas as pd
+from src.pipeline import iter_analysis_pipeline, PipelineEvent
+from src.result_cache import ResultCache
+from src.hierarchy import forecast_hierarchy, leaf_series_from_store
+from src.trade_store import TradeStore
+from src.prewarmer import PopularityTracker, LiveRequestCounter, CachePrewarmer
+from src.profiling import request_id_var, new_request_id
+from src.reference_index import COUNTRY_CODE_MAP, reporter_index, commodity_index
+from src.config import (
+    API_SERVER_HOST,
+    API_SERVER_PORT,
+    API_BATCH_MAX_SERIES,
+    API_BATCH_MAX_WORKERS,
+    API_GZIP_MIN_BYTES,
+    REFERENCE_SEARCH_LIMIT,
+    PREWARM_ENABLED,
+    HIERARCHY_RECONCILIATION,
+)
+
+result_cache = ResultCache()
+# Holds fetched series and the last complete result computed from each.
+trade_store = TradeStore()
+popularity = PopularityTracker()
+live_requests = LiveRequestCounter()
+
+
+def _no_progress(*args, **kwargs):
+    """Progress callback for runs outside the Gradio UI."""
+
+
+def frame_to_records(df):
+    """Converts a Year-indexed DataFrame into JSON-ready records."""
+    if df is None or df.empty:
+        return []
+    df = df.reset_index()
+    if 'Year' in df.columns and hasattr(df['Year'], 'dt'):
+        df['Year'] = df['Year'].dt.year
+    return json.loads(df.to_json(orient='records'))
+
+
+def records_to_frame(records, index='Year'):
+    """Converts records from `frame_to_records` back into a DataFrame indexed by `index`."""
+    df = pd.DataFrame(records)
+    if df.empty or index not in df.columns:
+        return df
+    df[index] = pd.to_datetime(df[index].astype(str))
+    return df.set_index(index)
+
+
+def _build_result(key, forecast_df=None, backtest_df=None, history_df=None, skipped_stages=None, error_message=None):
+    return {
+        'reporter': key.reporter,
+        'partner': key.partner,
+        'product': key.product,
+        'history': frame_to_records(history_df.set_index('Year') if history_df is not None else None),
+        'forecast': frame_to_records(forecast_df),
+        'backtest': frame_to_records(backtest_df),
+        'skipped_stages': skipped_stages or [],
+        'error': error_message,
+    }
+
+
+def _replay_result(result):
+    """Yields a stored result as the 'cleaned', 'done', and 'result' events of a pipeline run."""
+    yield PipelineEvent('cleaned', records_to_frame(result['history']).reset_index())
+    yield PipelineEvent('done', (
+        records_to_frame(result['forecast']), records_to_frame(result['backtest']), result['skipped_stages']
+    ))
+    yield PipelineEvent('result', result)
+
+
+def stream_forecast(key, time_budget=None, progress=_no_progress):
+    """Runs the pipeline for a series and stores the result if it is complete.
+
+    The result is cached as soon as the 'done' event arrives, so a caller
+    that stops iterating there still fills the cache for the API, the UI,
+    and the prewarmer alike. A complete result is also saved in the trade
+    store, and replayed from there until new data for the series arrives.
+
+    Yields:
+        PipelineEvent: The events of `iter_analysis_pipeline`, followed by a
+                       'result' event carrying the JSON-ready result.
+    """
+    stored = trade_store.fresh_result(key)
+    if stored is not None:
+        logging.info(f"Serving {key} from the trade store; no new data since it was computed.")
+        result_cache.set(key, stored)
+        yield from _replay_result(stored)
+        return
+
+    country_code = COUNTRY_CODE_MAP.get(key.reporter, "WLD")
+    history_df = None
+    result = _build_result(key, error_message="The pipeline ended without a result.")
+    for event in iter_analysis_pipeline(
+        key.reporter, key.partner, key.product, country_code, progress, time_budget=time_budget, store=trade_store
+    ):
+        if event.stage == 'cleaned':
+            history_df = event.data
+        elif event.stage == 'error':
+            result = _build_result(key, error_message=event.data)
+        elif event.stage == 'done':
+            forecast_df, backtest_df, skipped_stages = event.data
+            result = _build_result(key, forecast_df, backtest_df, history_df, skipped_stages)
+            # Budget-truncated runs are not cached so they do not stick.
+            if not skipped_stages:
+                result_cache.set(key, result)
+                trade_store.save_result(key, result)
+        yield event
+    yield PipelineEvent('result', result)
+
+
+def compute_forecast(key, time_budget=None):
+    """Runs the pipeline for a series, unless its stored result is still fresh, and stores the result if it is complete."""
+    for event in stream_forecast(key, time_budget):
+        pass
+    return event.data
+
+
+def _prewarm(key):
+    """Refreshes a series for the prewarmer, giving up between stages once a live request arrives.
+
+    Returns:
+        bool: False if the refresh was abandoned for live traffic.
+    """
+    for event in stream_forecast(key):
+        if event.stage not in ('done', 'result') and not live_requests.idle:
+            logging.info(f"Abandoning prewarm of {key}: live requests in flight.")
+            return False
+    return True
+
+
+def get_forecast(key, time_budget=None):
+    """Returns the JSON-ready pipeline result for a series, using the result cache.
+
+    Args:
+        key (SeriesKey): The (reporter, partner, product) series to forecast.
+        time_budget (float, optional): The pipeline time budget in seconds.
+
+    Returns:
+        dict: The series key, forecast and backtest records, the stages skipped
+              to meet the time budget, and any error message.
+    """
+    popularity.record(key)
+    result = result_cache.get(key)
+    if result is not None:
+        return result
+    with live_requests.track():
+        return compute_forecast(key, time_budget)
+
+
+# Looks up the cache at call time so tests can swap `result_cache`.
+prewarmer = CachePrewarmer(_prewarm, lambda key: result_cache.expires_in(key), popularity, live_requests)
+
+
+def _parse_key(params):
+    """Builds a `SeriesKey` from request parameters, or returns None if incomplete."""
+    values = [params.get(name) for name in ('reporter', 'partner', 'product')]
+    if not all(values):
+        return None
+    return SeriesKey(*map(str, values))
+
+
+def create_app():
+    """Creates the Flask application serving the JSON forecast API."""
+    app = Flask(__name__)
+
+    @app.get('/api/health')
+    def health():
+        return jsonify({'status': 'ok', 'cached_series': len(result_cache)})
+
+    @app.get('/api/forecast')
+    def forecast():
+        key = _parse_key(request.args)
+        if key is None:
+            return jsonify({'error': "Query parameters 'reporter', 'partner', and 'product' are required."}), 400
+        budget = request.args.get('budget', type=float)
+        result = get_forecast(key, time_budget=budget)
+        return jsonify(result), (422 if result['error'] else 200)
+
+    @app.post('/api/forecast/batch')
+    def forecast_batch():
+        payload = request.get_json(silent=True) or {}
+        series = payload.get('series')
+        if not isinstance(series, list) or not series:
+            return jsonify({'error': "Body must be a JSON object with a non-empty 'series' list."}), 400
+        if len(series) > API_BATCH_MAX_SERIES:
+            return jsonify({'error': f"A batch may contain at most {API_BATCH_MAX_SERIES} series."}), 400
+
+        keys = [_parse_key(item) if isinstance(item, dict) else None for item in series]
+        if any(key is None for key in keys):
+            return jsonify({'error': "Every series needs 'reporter', 'partner', and 'product'."}), 400
+
+        logging.info(f"Running batch forecast for {len(keys)} series...")
+        request_id = g.request_id
+
+        def forecast_in_request(key):
+            # Pool threads do not inherit the request's context.
+            request_id_var.set(request_id)
+            return get_forecast(key)
+
+        with ThreadPoolExecutor(max_workers=API_BATCH_MAX_WORKERS) as executor:
+            results = list(executor.map(forecast_in_request, keys))
+        return jsonify({'results': results})
+
+    @app.get('/api/forecast/hierarchy')
+    def forecast_hierarchy_view():
+        reporter = request.args.get('reporter')
+        if not reporter:
+            return jsonify({'error': "Query parameter 'reporter' is required."}), 400
+        leaves = leaf_series_from_store(trade_store, reporter)
+        if not leaves:
+            return jsonify({'error': f"No bilateral product series are stored for reporter {reporter}."}), 404
+        method = request.args.get('method', HIERARCHY_RECONCILIATION)
+        try:
+            forecasts = forecast_hierarchy(leaves, method=method)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'method': method, 'results': [
+            {'reporter': key.reporter, 'partner': key.partner, 'product': key.product,
+             'forecast': frame_to_records(forecast_df)}
+            for key, forecast_df in forecasts.items()
+        ]})
+
+    @app.get('/api/reference/<catalog>')
+    def reference_search(catalog):
+        index = {'reporters': reporter_index, 'commodities': commodity_index}.get(catalog)
+        if index is None:
+            return jsonify({'error': "Catalog must be 'reporters' or 'commodities'."}), 404
+        limit = min(request.args.get('limit', REFERENCE_SEARCH_LIMIT, type=int), REFERENCE_SEARCH_LIMIT)
+        matches = index.search(request.args.get('q', ''), limit=limit)
+        return jsonify({'results': [
+            {'id': entry.id, 'text': entry.text, 'parent': entry.parent, 'level': entry.level} for entry in matches
+        ]})
+
+    @app.before_request
+    def assign_request_id():
+        """Takes the caller's X-Request-ID, or makes one, for the logs and profiles of this request."""
+        g.request_id = request.headers.get('X-Request-ID') or new_request_id()
+        g.request_id_token = request_id_var.set(g.request_id)
+
+    @app.after_request
+    def echo_request_id(response):
+        response.headers['X-Request-ID'] = g.request_id
+        return response
+
+    @app.teardown_request
+    def clear_request_id(exc):
+        token = g.pop('request_id_token', None)
+        if token is not None:
+            request_id_var.reset(token)
+
+    @app.after_request
+    def conditional_and_compressed(response):
+        """Adds an ETag, answers matching conditional GETs, and gzips large bodies."""
+        if response.status_code != 200 or response.direct_passthrough:
+            return response
+
+        body = response.get_data()
+        etag = hashlib.sha1(body).hexdigest()
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '') and len(body) >= API_GZIP_MIN_BYTES
+        tag = f"{etag}-gzip" if use_gzip else etag
+
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.set_etag(tag)
+        if request.method in ('GET', 'HEAD') and request.if_none_match.contains(tag):
+            response.status_code = 304
+            response.set_data(b'')
+            return response
+
+        if use_gzip:
+            response.set_data(gzip.compress(body))
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+    return app
+
+
+if __name__ == "__main__":
+    from src.logging_config import setup_logging
+    setup_logging()
+    if PREWARM_ENABLED:
+        prewarmer.start()
+    create_app().run(host=API_SERVER_HOST, port=API_SERVER_PORT, threaded=True)
@@ -0,0 +1,234 @@
+import pandas as pd
+import os
+import json
+import logging
+import threading
+from src.comtrade_api import SeriesKey
+from src.trade_store import series_id, parse_series_id
+from src.config import (
+    AVAILABILITY_INDEX_PATH,
+    BULK_VALUES_PATH,
+    BULK_COLUMNS,
+    BULK_INDICATOR,
+    BULK_PRODUCT_CODE_MAP,
+    BULK_CHUNK_SIZE,
+    MIN_YEARS_FOR_FORECAST,
+)
+
+
+def _normalize_area_code(code):
+    """Normalizes reporter/partner codes so '000' and '0' refer to the same area."""
+    code = str(code).strip()
+    return str(int(code)) if code.isdigit() else code
+
+
+class AvailabilityIndex:
+    """A precomputed index of which trade series exist and how much history they have.
+
+    For each (reporter, partner, product) series the index keeps the first and
+    last year, the number of distinct years, and the raw row count. Lookups
+    are a single dictionary access, so selections that cannot be forecast are
+    rejected before any API call is made.
+
+    Updates are saved to `path`, and `reload_if_changed` picks up entries that
+    another process, such as an incremental refresh, wrote there since.
+    """
+
+    def __init__(self, entries=None, path=AVAILABILITY_INDEX_PATH):
+        self.path = path
+        self._entries = entries or {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        # Modification time of the index file as of the last load or save.
+        self._mtime = None
+
+    @classmethod
+    def load(cls, path=AVAILABILITY_INDEX_PATH):
+        """Loads the index from disk, or returns an empty index if none exists."""
+        if not os.path.exists(path):
+            return cls(path=path)
+        with open(path, 'r') as f:
+            data = json.load(f)
+        entries = {parse_series_id(value): tuple(entry) for value, entry in data['series'].items()}
+        logging.info(f"Loaded availability index with {len(entries)} series from {path}.")
+        index = cls(entries, path)
+        index._mtime = os.path.getmtime(path)
+        return index
+
+    def save(self, path=None):
+        """Writes the index to disk atomically."""
+        path = path or self.path
+        with self._save_lock:
+            with self._lock:
+                data = {'series': {series_id(key): list(entry) for key, entry in self._entries.items()}}
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+            if path == self.path:
+                self._mtime = os.path.getmtime(path)
+
+    def reload_if_changed(self):
+        """Merges in the entries on disk if the index file changed since this process last read or wrote it.
+
+        Returns:
+            bool: True if entries were reloaded.
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return False
+        if self._mtime is not None and mtime <= self._mtime:
+            return False
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        entries = {parse_series_id(value): tuple(entry) for value, entry in data['series'].items()}
+        with self._lock:
+            self._entries.update(entries)
+        self._mtime = mtime
+        logging.info(f"Reloaded {len(entries)} availability index entries changed on disk.")
+        return True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns (first_year, last_year, n_years, rows) for a series, or None if unknown."""
+        return self._entries.get(SeriesKey(*key))
+
+    def update(self, key, df):
+        """Records the coverage of a series from a frame in the `get_comtrade_data` schema.
+
+        Args:
+            key (SeriesKey): The series the frame belongs to.
+            df (pd.DataFrame): All stored rows of the series, with a 'Year' column.
+
+        Returns:
+            bool: True if the entry changed.
+        """
+        key = SeriesKey(*map(str, key))
+        if df.empty:
+            entry = (None, None, 0, 0)
+        else:
+            years = df['Year'].dt.year if pd.api.types.is_datetime64_any_dtype(df['Year']) else df['Year'].astype(int)
+            entry = (int(years.min()), int(years.max()), int(years.nunique()), len(df))
+        with self._lock:
+            changed = self._entries.get(key) != entry
+            self._entries[key] = entry
+        return changed
+
+    def update_from_store(self, store, keys=None):
+        """Refreshes the entries of stored series, by default every series in the store."""
+        for key in (store.keys() if keys is None else keys):
+            self.update(key, store.load(key))
+
+    def check(self, key, min_years=MIN_YEARS_FOR_FORECAST):
+        """Checks whether a series can be forecast without fetching it.
+
+        Returns:
+            tuple: (forecastable, reason). `forecastable` is None when the series
+                   is not in the index, so callers should fall back to fetching.
+        """
+        entry = self.get(key)
+        if entry is None:
+            return None, None
+        first_year, last_year, n_years, rows = entry
+        if n_years == 0:
+            return False, "No data is available for this selection. Please try another selection."
+        if n_years < min_years:
+            return False, f"Not enough data for a reliable forecast. Found {n_years} years ({first_year}-{last_year}), need {min_years}."
+        return True, None
+
+    def is_forecastable(self, key, min_years=MIN_YEARS_FOR_FORECAST):
+        """Returns False only for series known to be unforecastable."""
+        forecastable, _ = self.check(key, min_years)
+        return forecastable is not False
+
+    def forecastable_keys(self, min_years=MIN_YEARS_FOR_FORECAST):
+        """Returns every indexed series with enough history to forecast."""
+        with self._lock:
+            return sorted(key for key, entry in self._entries.items() if entry[2] >= min_years)
+
+
+def _comtrade_product_codes(codes, product_map):
+    """Maps bulk product codes to Comtrade codes, or NaN where there is no equivalent."""
+    codes = codes.str.strip()
+    return codes.map(product_map).fillna(codes.where(codes.str.isdigit()))
+
+
+def build_from_bulk(path=BULK_VALUES_PATH, columns=BULK_COLUMNS, chunksize=BULK_CHUNK_SIZE, index=None,
+                    indicator=BULK_INDICATOR, product_map=BULK_PRODUCT_CODE_MAP):
+    """Builds or extends an availability index from a bulk trade values CSV.
+
+    The file is streamed in chunks so only the key, year, and value columns
+    are ever held in memory. Product codes are translated to the Comtrade
+    codes the app looks series up by; rows whose product has no Comtrade
+    equivalent are skipped, since they could never match a selection.
+
+    Args:
+        path (str): The bulk CSV file.
+        columns (dict): Maps 'reporter', 'partner', 'product', 'year', and 'value',
+                        and 'indicator' if `indicator` is given, to column names
+                        in the file.
+        chunksize (int): The number of rows to read per chunk.
+        index (AvailabilityIndex, optional): An index to extend.
+        indicator (str, optional): Only index rows of this indicator, i.e. the
+                                   trade flow the app fetches.
+        product_map (dict): Maps bulk product codes to Comtrade product codes.
+                            Numeric HS codes are kept unchanged.
+
+    Returns:
+        AvailabilityIndex: The index with an entry for every matching series in the file.
+    """
+    index = index or AvailabilityIndex()
+    key_columns = [columns['reporter'], columns['partner'], columns['product']]
+    year_column = columns['year']
+    usecols = key_columns + [year_column, columns['value']]
+    if indicator is not None:
+        usecols.append(columns['indicator'])
+
+    # Count rows per (series, year) chunk by chunk, then combine the counts.
+    counts = []
+    reader = pd.read_csv(path, usecols=usecols, dtype=str, chunksize=chunksize)
+    for chunk in reader:
+        if indicator is not None:
+            chunk = chunk[chunk[columns['indicator']] == indicator]
+        chunk = chunk.assign(**{columns['product']: _comtrade_product_codes(chunk[columns['product']], product_map)})
+        chunk = chunk.dropna(subset=[columns['value'], columns['product']])
+        counts.append(chunk.groupby(key_columns + [year_column]).size())
+    if not counts:
+        return index
+
+    rows_by_year = pd.concat(counts).groupby(level=list(range(4))).sum().reset_index(name='rows')
+    rows_by_year[year_column] = rows_by_year[year_column].astype(int)
+    stats = rows_by_year.groupby(key_columns).agg(
+        first_year=(year_column, 'min'),
+        last_year=(year_column, 'max'),
+        n_years=(year_column, 'nunique'),
+        rows=('rows', 'sum'),
+    )
+
+    for (reporter, partner, product), entry in zip(stats.index, stats.itertuples(index=False)):
+        key = SeriesKey(_normalize_area_code(reporter), _normalize_area_code(partner), str(product).strip())
+        index._entries[key] = tuple(int(value) for value in entry)
+
+    logging.info(f"Built availability index for {len(stats)} series from {path}.")
+    return index
+
+
+# Shared by the pipeline and the UI so both see the same, incrementally updated index.
+availability_index = AvailabilityIndex.load()
+
+
+if __name__ == "__main__":
+    from src.logging_config import setup_logging
+    from src.trade_store import TradeStore
+    setup_logging()
+    index = AvailabilityIndex()
+    try:
+        build_from_bulk(index=index)
+    except (FileNotFoundError, ValueError) as e:
+        logging.warning(f"Could not read bulk data file {BULK_VALUES_PATH}: {e}. Indexing stored series only.")
+    index.update_from_store(TradeStore())
+    index.save()
+    print(f"Availability index saved with {len(index)} series to {AVAILABILITY_INDEX_PATH}")
@@ -0,0 +1,315 @@
+import pandas as pd
+import numpy as np
+import logging
+from src.forecasting_script import _forecast_index, _prepare_exog
+from src.config import (
+    FORECAST_STEPS,
+    BASELINE_ALPHA_GRID,
+    BASELINE_BETA_GRID,
+)
+
+# Below this summed squared deviation of GDP log growth the elasticity is left at zero.
+_MIN_GDP_GROWTH_VARIANCE = 1e-10
+
+
+def _valid_bounds(values):
+    """Returns the index of the first and last observation and the observation count per row."""
+    mask = ~np.isnan(values)
+    first = mask.argmax(axis=1)
+    last = values.shape[1] - 1 - mask[:, ::-1].argmax(axis=1)
+    return first, last, mask.sum(axis=1)
+
+
+def _at(values, index):
+    return values[np.arange(len(values)), index]
+
+
+def _exponential_smoothing(values, alphas, betas, steps=FORECAST_STEPS):
+    """Fits additive-trend exponential smoothing to every row at once.
+
+    All (alpha, beta) combinations are run side by side as one array of shape
+    (n_series, n_combinations); the loop is over time only. Each row keeps
+    the combination with the smallest one-step-ahead squared error. Missing
+    values leave the state to follow its trend. A beta grid of (0,) gives
+    simple exponential smoothing with no trend.
+
+    Args:
+        values (np.array): Shape (n_series, n_years), NaN where not observed.
+        alphas (sequence): Candidate level smoothing factors.
+        betas (sequence): Candidate trend smoothing factors.
+        steps (int): The number of years to forecast.
+
+    Returns:
+        tuple: The forecasts of shape (n_series, steps), the final level, and
+               the chosen alpha of each row.
+    """
+    n_series, n_years = values.shape
+    alpha, beta = (grid.ravel() for grid in np.meshgrid(alphas, betas, indexing='ij'))
+    first, _, n_obs = _valid_bounds(values)
+
+    # The initial trend is the first difference of the first two observations.
+    trended = np.any(beta > 0)
+    after_first = np.where(np.arange(n_years) > first[:, None], values, np.nan)
+    second = _valid_bounds(after_first)[0]
+    init_trend = np.where(n_obs >= 2, _at(values, second) - _at(values, first), 0.0) if trended else np.zeros(n_series)
+
+    level = np.zeros((n_series, len(alpha)))
+    trend = np.zeros_like(level)
+    sse = np.zeros_like(level)
+    for t in range(n_years):
+        observed = values[:, t][:, None]
+        start = (first == t)[:, None]
+        active = (first < t)[:, None]
+        valid = ~np.isnan(observed)
+
+        prediction = level + trend
+        error = np.where(valid & active, observed - prediction, 0.0)
+        new_level = np.where(valid, alpha * np.nan_to_num(observed) + (1 - alpha) * prediction, prediction)
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        sse += error ** 2
+        level = np.where(start, np.nan_to_num(observed), np.where(active, new_level, level))
+        trend = np.where(start, init_trend[:, None], np.where(active, new_trend, trend))
+
+    best = sse.argmin(axis=1)
+    level, trend = _at(level, best), _at(trend, best)
+    horizon = np.arange(1, steps + 1)
+    return level[:, None] + trend[:, None] * horizon, level, alpha[best]
+
+
+def holt_forecast(values, steps=FORECAST_STEPS, alphas=BASELINE_ALPHA_GRID, betas=BASELINE_BETA_GRID):
+    """Forecasts every row with Holt's linear trend method."""
+    forecasts, _, _ = _exponential_smoothing(values, alphas, betas, steps)
+    return forecasts
+
+
+def theta_forecast(values, steps=FORECAST_STEPS, alphas=BASELINE_ALPHA_GRID):
+    """Forecasts every row with the Theta method.
+
+    This is simple exponential smoothing with a drift of half the slope of a
+    linear trend fitted to the series (Hyndman & Billah, 2003).
+    """
+    _, level, alpha = _exponential_smoothing(values, alphas, (0.0,), steps)
+
+    mask = ~np.isnan(values)
+    n_obs = mask.sum(axis=1)
+    t = np.arange(values.shape[1], dtype=float)
+    safe_n = np.maximum(n_obs, 1)
+    t_mean = (mask * t).sum(axis=1) / safe_n
+    y = np.nan_to_num(values)
+    y_mean = y.sum(axis=1) / safe_n
+    t_dev = mask * (t - t_mean[:, None])
+    t_var = (t_dev ** 2).sum(axis=1)
+    slope = np.divide((t_dev * (y - y_mean[:, None])).sum(axis=1), t_var, out=np.zeros(len(values)), where=t_var > 0)
+
+    horizon = np.arange(1, steps + 1)
+    drift = (horizon - 1)[None, :] + (1 / alpha - (1 - alpha) ** n_obs / alpha)[:, None]
+    return level[:, None] + slope[:, None] / 2 * drift
+
+
+def drift_forecast(values, gdp=None, future_gdp=None, steps=FORECAST_STEPS):
+    """Forecasts every row with a random walk with drift, plus a GDP-elasticity term.
+
+    For rows with only positive values the model is fitted on log growth,
+    `dlog(y) = c + e * dlog(gdp)`, by least squares, so `e` is the elasticity
+    of trade to GDP. Without GDP the elasticity is zero and this is a drift in
+    log growth. Rows with non-positive values use a drift in levels. A row
+    with a single observation gets a naive, flat forecast.
+
+    Args:
+        values (np.array): Shape (n_series, n_years), NaN where not observed.
+        gdp (np.array, optional): GDP aligned with `values`, same shape.
+        future_gdp (np.array, optional): GDP for the forecast years, shape (n_series, steps).
+        steps (int): The number of years to forecast.
+
+    Returns:
+        np.array: The forecasts of shape (n_series, steps).
+    """
+    first, last, n_obs = _valid_bounds(values)
+    y_first, y_last = _at(values, first), _at(values, last)
+    horizon = np.arange(1, steps + 1)
+
+    span = np.maximum(last - first, 1)
+    level_drift = np.where(n_obs >= 2, (y_last - y_first) / span, 0.0)
+    forecasts = y_last[:, None] + level_drift[:, None] * horizon
+
+    positive = (n_obs > 0) & (np.where(np.isnan(values), np.inf, values).min(axis=1) > 0)
+    if not positive.any():
+        return forecasts
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.diff(np.log(np.where(positive[:, None], values, np.nan)), axis=1)
+        if gdp is not None and future_gdp is not None:
+            gdp_growth = np.diff(np.log(gdp), axis=1)
+        else:
+            gdp_growth = np.zeros_like(growth)
+    pairs = ~np.isnan(growth) & ~np.isnan(gdp_growth)
+    count = pairs.sum(axis=1)
+    x = np.where(pairs, gdp_growth, 0.0)
+    y = np.where(pairs, growth, 0.0)
+    x_mean = np.divide(x.sum(axis=1), count, out=np.zeros(len(values)), where=count > 0)
+    y_mean = np.divide(y.sum(axis=1), count, out=np.zeros(len(values)), where=count > 0)
+    x_dev = pairs * (x - x_mean[:, None])
+    x_var = (x_dev ** 2).sum(axis=1)
+    # GDP growing at a near-constant rate cannot identify an elasticity apart from the drift.
+    identified = x_var > _MIN_GDP_GROWTH_VARIANCE
+    elasticity = np.divide((x_dev * (y - y_mean[:, None])).sum(axis=1), x_var, out=np.zeros(len(values)), where=identified)
+    intercept = y_mean - elasticity * x_mean
+
+    log_forecast = np.log(np.where(positive, y_last, 1.0))[:, None] + intercept[:, None] * horizon
+    if gdp is not None and future_gdp is not None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gdp_change = np.log(future_gdp) - np.log(_at(gdp, last))[:, None]
+        log_forecast += elasticity[:, None] * np.nan_to_num(gdp_change)
+    return np.where((positive & (count > 0))[:, None], np.exp(log_forecast), forecasts)
+
+
+def forecast_panel(values, gdp=None, future_gdp=None, steps=FORECAST_STEPS):
+    """Runs every baseline method across a panel of series at once.
+
+    Series are rows of `values`; shorter histories are padded with NaN at
+    the start so that every row ends in the same year.
+
+    Args:
+        values (array-like): Shape (n_series, n_years).
+        gdp (array-like, optional): GDP aligned with `values`, same shape.
+        future_gdp (array-like, optional): GDP for the forecast years, shape (n_series, steps).
+        steps (int): The number of years to forecast.
+
+    Returns:
+        dict: Arrays of shape (n_series, steps) for 'holt', 'theta', 'drift',
+              and their equal-weight average under 'mean'.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    if gdp is not None:
+        gdp = np.atleast_2d(np.asarray(gdp, dtype=float))
+        future_gdp = np.atleast_2d(np.asarray(future_gdp, dtype=float))
+    forecasts = {
+        'holt': holt_forecast(values, steps),
+        'theta': theta_forecast(values, steps),
+        'drift': drift_forecast(values, gdp, future_gdp, steps),
+    }
+    forecasts['mean'] = np.mean(list(forecasts.values()), axis=0)
+    return forecasts
+
+
+def align_panel(series_by_key):
+    """Stacks yearly series into one NaN-padded panel.
+
+    Args:
+        series_by_key (dict): Maps each key to a pd.Series of values indexed by year.
+
+    Returns:
+        tuple: The keys, the yearly DatetimeIndex, and the array of shape (n_keys, n_years).
+    """
+    panel = pd.DataFrame({key: series for key, series in series_by_key.items()})
+    panel.index = pd.to_datetime(panel.index.astype(str) if panel.index.dtype.kind in 'iu' else panel.index)
+    panel = panel.sort_index().asfreq('YS')
+    return list(panel.columns), panel.index, panel.values.T
+
+
+def _align_gdp(keys, years, exog_by_key, steps=FORECAST_STEPS):
+    """Lines up each key's GDP with the panel years and extrapolates it over the forecast.
+
+    Keys without a matrix, or whose matrix stops before the last panel year,
+    get a constant GDP, which leaves the drift method with no elasticity term.
+
+    Returns:
+        tuple: GDP of shape (n_keys, n_years), future GDP of shape (n_keys, steps),
+               and a mask of the panel years each key's matrix covers.
+    """
+    year_numbers = np.asarray(years.year)
+    gdp = np.ones((len(keys), len(years)))
+    future_gdp = np.ones((len(keys), steps))
+    covered = np.ones(gdp.shape, dtype=bool)
+    for row, key in enumerate(keys):
+        matrix = exog_by_key.get(key)
+        if matrix is None or 'GDP_USD' not in matrix.feature_index or not matrix.covers(year_numbers[-1]):
+            continue
+        column = matrix.feature_index['GDP_USD']
+        covered[row] = matrix.covers(year_numbers)
+        gdp[row] = np.nan
+        gdp[row, covered[row]] = matrix.at_years(year_numbers[covered[row]])[:, column]
+        future_gdp[row] = matrix.extrapolate(year_numbers[-1], steps)[:, column]
+    return gdp, future_gdp, covered
+
+
+def forecast_baseline_panel(series_by_key, steps=FORECAST_STEPS, exog_by_key=None):
+    """Forecasts many series together, returning one forecast frame per key.
+
+    Args:
+        series_by_key (dict): Maps each key to a pd.Series of values indexed by year.
+        steps (int): The number of years to forecast.
+        exog_by_key (dict, optional): Maps keys to the reporter's ExogFeatureMatrix.
+                                      As in `forecast_baseline`, years the matrix
+                                      does not cover are left out of the fit.
+
+    Returns:
+        dict: A forecast DataFrame per key, indexed by forecast 'Year'.
+    """
+    keys, years, values = align_panel(series_by_key)
+    logging.info(f"Fitting baseline models for {len(keys)} series...")
+    # Series that end early are shifted to end in the last column and forecast
+    # over their trailing gap as well, keeping only the steps after the panel's last year.
+    _, last, n_obs = _valid_bounds(values)
+    gaps = np.where(n_obs > 0, values.shape[1] - 1 - last, 0)
+    horizon = steps + gaps.max()
+    gdp = future_gdp = None
+    if exog_by_key:
+        gdp, future_gdp, covered = _align_gdp(keys, years, exog_by_key, horizon)
+        values = np.where(covered, values, np.nan)
+    if gaps.any():
+        values = np.vstack([np.roll(row, gap) for row, gap in zip(values, gaps)])
+        if gdp is not None:
+            # The GDP of the gap years becomes the start of each shifted row's future GDP.
+            future_gdp = np.vstack([
+                np.concatenate([row[len(row) - gap:], future])[:horizon]
+                for row, future, gap in zip(gdp, future_gdp, gaps)
+            ])
+            gdp = np.vstack([np.roll(row, gap) for row, gap in zip(gdp, gaps)])
+    forecasts = forecast_panel(values, gdp, future_gdp, steps=horizon)
+    after_origin = gaps[:, None] + np.arange(steps)
+    index = pd.date_range(start=years.max() + pd.DateOffset(years=1), periods=steps, freq='YS', name='Year')
+    return {
+        key: pd.DataFrame({
+            name: np.take_along_axis(forecast, after_origin, axis=1)[row] for name, forecast in forecasts.items()
+        }, index=index)
+        for row, key in enumerate(keys)
+    }
+
+
+def forecast_baseline(input_df, exog_matrix=None):
+    """Forecasts one series with the baseline engine.
+
+    Args:
+        input_df (pd.DataFrame): The enriched DataFrame containing 'Year' and
+                                 'Value', and 'GDP_USD' unless `exog_matrix` is given.
+                                 Without any GDP the drift method has no
+                                 elasticity term.
+        exog_matrix (ExogFeatureMatrix, optional): Precomputed exogenous features
+                                                   for the reporter.
+
+    Returns:
+        pd.DataFrame: A DataFrame indexed by forecast 'Year' with the 'mean'
+                      baseline forecast and one column per method.
+    """
+    logging.info("Fitting baseline models...")
+    df = input_df.set_index('Year')
+    df.index = pd.to_datetime(df.index)
+    df = df.asfreq('YS')
+    if exog_matrix is None:
+        df = df.dropna(subset=[column for column in ('Value', 'GDP_USD') if column in df.columns])
+    else:
+        df = df.dropna(subset=['Value'])
+        df = df[exog_matrix.covers(df.index.year)]
+
+    gdp = future_gdp = None
+    if exog_matrix is not None or 'GDP_USD' in df.columns:
+        exog, exog_forecast = _prepare_exog(df, exog_matrix)
+        if 'GDP_USD' in exog.columns:
+            gdp, future_gdp = exog['GDP_USD'].values, exog_forecast['GDP_USD'].values
+
+    forecasts = forecast_panel(df['Value'].values, gdp, future_gdp)
+    forecast_df = pd.DataFrame({name: forecast[0] for name, forecast in forecasts.items()}, index=_forecast_index(df))
+    forecast_df = forecast_df[['mean', 'holt', 'theta', 'drift']]
+    forecast_df.index.name = 'Year'
+    return forecast_df
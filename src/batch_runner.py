@@ -0,0 +1,410 @@
+import os
+import json
+import time
+import socket
+import uuid
+import logging
+import argparse
+import multiprocessing
+import pandas as pd
+from src.comtrade_api import SeriesKey
+from src.trade_store import series_id, parse_series_id
+from src.config import (
+    BATCH_RUNS_DIR,
+    BATCH_SHARD_SIZE,
+    BATCH_CLAIM_TIMEOUT_SECONDS,
+    BATCH_WORKERS,
+)
+
+
+def _shard_name(shard):
+    return f"shard-{shard:05d}"
+
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class BatchRun:
+    """A batch forecasting run whose state lives entirely in a shared directory.
+
+    The manifest splits the series into fixed shards. A worker claims a shard
+    by creating its lock file with O_CREAT | O_EXCL, which succeeds for
+    exactly one process even across machines sharing the directory, and
+    keeps the claim alive by touching the lock after every series. A lock
+    not touched for `claim_timeout` seconds belongs to a dead worker and can
+    be taken over. Each lock carries a per-claim token: a worker checks it
+    before every series and stops once its claim was taken over, and only
+    removes a lock that still carries its own token. Each finished series is
+    appended to the shard's results file as one JSON line, so a restarted
+    worker skips everything already done.
+
+    Layout:
+        manifest.json             The shards of series ids.
+        claims/shard-NNNNN.lock   Held by the worker processing the shard.
+        results/shard-NNNNN.jsonl One line per finished series.
+        done/shard-NNNNN          Present once every series in the shard is finished.
+    """
+
+    def __init__(self, run_dir, claim_timeout=BATCH_CLAIM_TIMEOUT_SECONDS):
+        self.run_dir = run_dir
+        self.claim_timeout = claim_timeout
+        with open(os.path.join(run_dir, 'manifest.json'), 'r') as f:
+            self.manifest = json.load(f)
+        self.shards = self.manifest['shards']
+        # The token written into each lock this instance holds.
+        self._tokens = {}
+        for name in ('claims', 'results', 'done'):
+            os.makedirs(os.path.join(run_dir, name), exist_ok=True)
+
+    @classmethod
+    def create(cls, run_dir, keys, shard_size=BATCH_SHARD_SIZE, **kwargs):
+        """Creates a run for `keys`, or reopens it if the run directory already has a manifest."""
+        manifest_path = os.path.join(run_dir, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            os.makedirs(run_dir, exist_ok=True)
+            ids = list(dict.fromkeys(series_id(SeriesKey(*map(str, key))) for key in keys))
+            _write_json_atomic(manifest_path, {
+                'created': time.time(),
+                'shard_size': shard_size,
+                'series_count': len(ids),
+                'shards': [ids[i:i + shard_size] for i in range(0, len(ids), shard_size)],
+            })
+        else:
+            logging.info(f"Resuming existing batch run in {run_dir}.")
+        return cls(run_dir, **kwargs)
+
+    def _path(self, kind, shard, suffix=''):
+        return os.path.join(self.run_dir, kind, f"{_shard_name(shard)}{suffix}")
+
+    def is_done(self, shard):
+        return os.path.exists(self._path('done', shard))
+
+    def _read_claim(self, path):
+        """Returns the contents and modification time of a lock file, or (None, None) if it is gone.
+
+        A lock that has just been created and not yet written reads as an empty dict.
+        """
+        try:
+            with open(path, 'r') as f:
+                mtime = os.fstat(f.fileno()).st_mtime
+                try:
+                    return json.load(f), mtime
+                except json.JSONDecodeError:
+                    return {}, mtime
+        except FileNotFoundError:
+            return None, None
+
+    def _remove_lock(self, lock_path, token, reason):
+        """Removes a lock file only if it carries `token`.
+
+        A shared directory has no atomic compare-and-delete, so the lock is
+        moved aside and its token checked afterwards. A lock that another
+        worker replaced in between is linked back. If a third worker created
+        a lock meanwhile the link fails: the replaced lock is lost, and its
+        owner finds out at its next heartbeat.
+
+        Returns:
+            bool: True if the lock carrying `token` was removed.
+        """
+        moved_path = f"{lock_path}.{reason}.{uuid.uuid4().hex}"
+        try:
+            os.rename(lock_path, moved_path)
+        except FileNotFoundError:
+            return False
+        moved, _ = self._read_claim(moved_path)
+        removed = (moved or {}).get('token') == token
+        if not removed:
+            try:
+                # Link, not rename, so a lock created meanwhile is never overwritten.
+                os.link(moved_path, lock_path)
+            except FileExistsError:
+                logging.warning(f"Claim of {(moved or {}).get('worker')} on {os.path.basename(lock_path)} was lost to a concurrent claim.")
+        os.remove(moved_path)
+        return removed
+
+    def claim(self, shard, worker_id):
+        """Tries to claim a shard, taking over the lock if its owner stopped heartbeating.
+
+        Every claim writes a fresh token into its lock file. A stale lock is
+        only removed if it still carries the token seen stale, see `_remove_lock`.
+
+        Returns:
+            bool: True if this worker now holds the shard.
+        """
+        lock_path = self._path('claims', shard, '.lock')
+        stale, mtime = self._read_claim(lock_path)
+        if stale and time.time() - mtime > self.claim_timeout:
+            if not self._remove_lock(lock_path, stale.get('token'), 'stale'):
+                return False
+            logging.warning(f"Took over stale claim on {_shard_name(shard)} from {stale.get('worker')}.")
+
+        token = uuid.uuid4().hex
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'worker': worker_id, 'token': token, 'claimed': time.time()}, f)
+        self._tokens[shard] = token
+        return True
+
+    def owns(self, shard):
+        """Returns True if this `BatchRun` still holds its claim on a shard."""
+        claim, _ = self._read_claim(self._path('claims', shard, '.lock'))
+        return claim is not None and self._tokens.get(shard) is not None and claim.get('token') == self._tokens[shard]
+
+    def heartbeat(self, shard):
+        """Refreshes a held claim so other workers do not treat it as stale.
+
+        Returns:
+            bool: False if the claim was lost to another worker.
+        """
+        if not self.owns(shard):
+            return False
+        try:
+            os.utime(self._path('claims', shard, '.lock'))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self, shard):
+        """Removes this worker's lock on a shard, leaving a lock taken over by another worker alone."""
+        if not self.owns(shard):
+            self._tokens.pop(shard, None)
+            return
+        self._remove_lock(self._path('claims', shard, '.lock'), self._tokens.pop(shard), 'released')
+
+    def claim_next(self, worker_id):
+        """Claims the first unfinished shard no other live worker holds, or returns None."""
+        for shard in range(len(self.shards)):
+            if not self.is_done(shard) and self.claim(shard, worker_id):
+                if self.is_done(shard):
+                    # Finished by another worker between the check and the claim.
+                    self.release(shard)
+                    continue
+                return shard
+        return None
+
+    def records(self, shard):
+        """Reads the checkpointed results of a shard, ignoring a line torn by a crash."""
+        path = self._path('results', shard, '.jsonl')
+        if not os.path.exists(path):
+            return []
+        records = []
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+    def finished_series(self, shard, retry_failed=False):
+        """Returns the ids of series in a shard that need no further work."""
+        return {record['series'] for record in self.records(shard)
+                if record['status'] == 'ok' or not retry_failed}
+
+    def record(self, shard, key, status, result=None, error=None, seconds=None):
+        """Appends the outcome of one series to its shard's results file."""
+        line = json.dumps({
+            'series': series_id(key),
+            'status': status,
+            'result': result,
+            'error': error,
+            'seconds': seconds,
+            'finished': time.time(),
+        })
+        with open(self._path('results', shard, '.jsonl'), 'a+b') as f:
+            # Start on a fresh line if a crash left the last line unterminated.
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+            f.write(line.encode() + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def mark_done(self, shard):
+        open(self._path('done', shard), 'w').close()
+
+    def reopen_failed(self):
+        """Clears the done marker of finished shards whose latest attempt at some series failed.
+
+        Returns:
+            list: The reopened shards.
+        """
+        reopened = []
+        for shard in range(len(self.shards)):
+            if not self.is_done(shard):
+                continue
+            ok = self.finished_series(shard, retry_failed=True)
+            if any(record['series'] not in ok for record in self.records(shard)):
+                try:
+                    os.remove(self._path('done', shard))
+                except FileNotFoundError:
+                    pass
+                reopened.append(shard)
+        if reopened:
+            logging.info(f"Reopened {len(reopened)} finished shards with failed series for retry.")
+        return reopened
+
+    def status(self):
+        """Summarizes progress and throughput across all shards.
+
+        Returns:
+            dict: Shard and series counts, series per minute, and the estimated
+                  seconds remaining.
+        """
+        ok, failed, finished_at = set(), set(), []
+        for shard in range(len(self.shards)):
+            for record in self.records(shard):
+                (ok if record['status'] == 'ok' else failed).add(record['series'])
+                finished_at.append(record['finished'])
+        failed -= ok
+
+        total = self.manifest['series_count']
+        claimed = sum(1 for shard in range(len(self.shards))
+                      if not self.is_done(shard) and os.path.exists(self._path('claims', shard, '.lock')))
+        elapsed = max(finished_at) - min(finished_at) if finished_at else 0.0
+        per_minute = 60.0 * (len(finished_at) - 1) / elapsed if elapsed > 0 else None
+        remaining = total - len(ok) - len(failed)
+        return {
+            'shards_total': len(self.shards),
+            'shards_done': sum(1 for shard in range(len(self.shards)) if self.is_done(shard)),
+            'shards_claimed': claimed,
+            'series_total': total,
+            'series_ok': len(ok),
+            'series_failed': len(failed),
+            'series_per_minute': round(per_minute, 2) if per_minute else None,
+            'eta_seconds': round(60.0 * remaining / per_minute) if per_minute else None,
+        }
+
+
+def forecast_series(key):
+    """Runs the full pipeline for one series, reusing its stored result while no new data has arrived.
+
+    Returns:
+        dict: The forecast and backtest as JSON-ready records.
+
+    Raises:
+        RuntimeError: If the pipeline reports an error for the series.
+    """
+    from src.api import compute_forecast
+
+    result = compute_forecast(key)
+    if result['error']:
+        raise RuntimeError(result['error'])
+    return {'forecast': result['forecast'], 'backtest': result['backtest']}
+
+
+def run_worker(run_dir, worker_id=None, forecast_fn=forecast_series, retry_failed=False,
+               claim_timeout=BATCH_CLAIM_TIMEOUT_SECONDS):
+    """Claims and processes shards until none are left.
+
+    Args:
+        run_dir (str): The batch run directory.
+        worker_id (str, optional): Identifies this worker in lock files.
+        forecast_fn (callable): Takes a `SeriesKey` and returns a JSON-ready result.
+        retry_failed (bool): Rerun series whose earlier attempt failed, reopening
+                             finished shards that recorded failures.
+        claim_timeout (float): Seconds after which an untouched claim is stale.
+
+    Returns:
+        int: The number of series this worker processed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    run = BatchRun(run_dir, claim_timeout=claim_timeout)
+    if retry_failed:
+        run.reopen_failed()
+    processed = 0
+    while (shard := run.claim_next(worker_id)) is not None:
+        logging.info(f"Worker {worker_id} claimed {_shard_name(shard)}.")
+        try:
+            finished = run.finished_series(shard, retry_failed)
+            for value in run.shards[shard]:
+                if value in finished:
+                    continue
+                key = parse_series_id(value)
+                start = time.perf_counter()
+                try:
+                    result = forecast_fn(key)
+                    run.record(shard, key, 'ok', result=result, seconds=time.perf_counter() - start)
+                except Exception as e:
+                    logging.error(f"Batch forecast for {value} failed: {e}")
+                    run.record(shard, key, 'error', error=str(e), seconds=time.perf_counter() - start)
+                processed += 1
+                if not run.heartbeat(shard):
+                    logging.warning(f"Worker {worker_id} lost its claim on {_shard_name(shard)}; leaving it to the new owner.")
+                    break
+            else:
+                run.mark_done(shard)
+        finally:
+            run.release(shard)
+    logging.info(f"Worker {worker_id} finished after processing {processed} series.")
+    return processed
+
+
+def _worker_main(run_dir, retry_failed):
+    from src.logging_config import setup_logging
+    setup_logging()
+    run_worker(run_dir, retry_failed=retry_failed)
+
+
+def run_workers(run_dir, workers=BATCH_WORKERS, retry_failed=False):
+    """Runs `workers` local worker processes against a run and waits for them.
+
+    Comtrade requests from all workers share one rate limit through the
+    file-backed `shared_rate_limiter`.
+    """
+    # Spawned rather than forked so each worker initializes TensorFlow cleanly.
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_worker_main, args=(run_dir, retry_failed)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def read_keys(path):
+    """Reads series keys from a CSV with 'reporter', 'partner', and 'product' columns."""
+    df = pd.read_csv(path, dtype=str)
+    return [SeriesKey(*row) for row in df[['reporter', 'partner', 'product']].itertuples(index=False)]
+
+
+if __name__ == "__main__":
+    from src.logging_config import setup_logging
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description="Sharded, resumable batch forecasting.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    init_parser = subparsers.add_parser('init', help="Create a run from a list of series.")
+    init_parser.add_argument('run_dir', nargs='?', default=BATCH_RUNS_DIR)
+    source = init_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--keys', help="CSV with 'reporter', 'partner', and 'product' columns.")
+    source.add_argument('--from-index', action='store_true', help="Every forecastable series in the availability index.")
+    init_parser.add_argument('--shard-size', type=int, default=BATCH_SHARD_SIZE)
+    run_parser = subparsers.add_parser('run', help="Process shards with local worker processes.")
+    run_parser.add_argument('run_dir', nargs='?', default=BATCH_RUNS_DIR)
+    run_parser.add_argument('--workers', type=int, default=BATCH_WORKERS)
+    run_parser.add_argument('--retry-failed', action='store_true')
+    status_parser = subparsers.add_parser('status', help="Show progress and throughput.")
+    status_parser.add_argument('run_dir', nargs='?', default=BATCH_RUNS_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'init':
+        if args.from_index:
+            from src.availability_index import availability_index
+            keys = availability_index.forecastable_keys()
+        else:
+            keys = read_keys(args.keys)
+        run = BatchRun.create(args.run_dir, keys, shard_size=args.shard_size)
+        print(f"Batch run in {args.run_dir}: {run.manifest['series_count']} series in {len(run.shards)} shards.")
+    elif args.command == 'run':
+        run_workers(args.run_dir, args.workers, args.retry_failed)
+        print(json.dumps(BatchRun(args.run_dir).status(), indent=2))
+    else:
+        print(json.dumps(BatchRun(args.run_dir).status(), indent=2))
@@ -2,12 +2,41 @@ import pandas as pd
 import os
 import logging
 import sys
+from collections import namedtuple
 import comtradeapicall
 
 # Adjust path for standalone execution and imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-def get_comtrade_data(reporter_id, partner_id, product_id):
+# Identifies one trade series: the Comtrade reporter, partner, and product codes.
+SeriesKey = namedtuple('SeriesKey', ['reporter', 'partner', 'product'])
+
+def format_comtrade_frame(df):
+    """Converts raw Comtrade records into the project's trade data schema.
+
+    Args:
+        df (pd.DataFrame): Raw Comtrade records with 'period', 'reporterDesc',
+                           'partnerDesc', 'cmdDesc', and 'primaryValue' columns.
+
+    Returns:
+        pd.DataFrame: A DataFrame with columns ['Year', 'Reporter', 'Partner',
+                      'Product', 'Value'], with 'Value' in millions.
+    """
+    # Select and rename columns to match the project's existing structure
+    df = df[['period', 'reporterDesc', 'partnerDesc', 'cmdDesc', 'primaryValue']].copy()
+    df.rename(columns={
+        'period': 'Year',
+        'reporterDesc': 'Reporter',
+        'partnerDesc': 'Partner',
+        'cmdDesc': 'Product',
+        'primaryValue': 'Value'
+    }, inplace=True)
+
+    # Convert value to millions for consistency
+    df['Value'] = df['Value'] / 1e6
+    return df
+
+def get_comtrade_data(reporter_id, partner_id, product_id, period='recent'):
     """Fetches and processes annual trade data from the UN Comtrade public API
     using the comtradeapicall package's preview function.
 
@@ -19,6 +48,8 @@ def get_comtrade_data(reporter_id, partner_id, product_id):
         reporter_id (str): The Comtrade code for the reporting country.
         partner_id (str): The Comtrade code for the partner country/region (e.g., "0" for World).
         product_id (str): The Comtrade Harmonized System (HS) code for the product.
+        period (str): 'recent' for the latest available years, or one or more
+                      comma-separated years to fetch only those periods.
 
     Returns:
         pd.DataFrame: A DataFrame containing the formatted trade data with columns
@@ -33,7 +64,7 @@ def get_comtrade_data(reporter_id, partner_id, product_id):
             typeCode='C',
             freqCode='A', # Annual data
             clCode='HS',
-            period='recent', # Fetch recent years as per public API limitations
+            period=period, # 'recent' by default as per public API limitations
             reporterCode=reporter_id,
             cmdCode=product_id,
             flowCode='M', # Imports
@@ -50,19 +81,8 @@ def get_comtrade_data(reporter_id, partner_id, product_id):
             logging.warning("No data returned from the API for this selection.")
             return pd.DataFrame()
 
-        # Select and rename columns to match the project's existing structure
-        df = df[['period', 'reporterDesc', 'partnerDesc', 'cmdDesc', 'primaryValue']]
-        df.rename(columns={
-            'period': 'Year',
-            'reporterDesc': 'Reporter',
-            'partnerDesc': 'Partner',
-            'cmdDesc': 'Product',
-            'primaryValue': 'Value'
-        }, inplace=True)
-        
-        # Convert value to millions for consistency
-        df['Value'] = df['Value'] / 1e6
-        
+        df = format_comtrade_frame(df)
+
         logging.info(f"Successfully fetched and processed {len(df)} rows of data.")
         return df
 
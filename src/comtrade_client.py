@@ -0,0 +1,264 @@
+import pandas as pd
+import os
+import json
+import fcntl
+import logging
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from src.comtrade_api import format_comtrade_frame
+from src.config import (
+    COMTRADE_API_BASE_URL,
+    COMTRADE_MAX_RECORDS,
+    COMTRADE_POOL_SIZE,
+    COMTRADE_MAX_CONCURRENCY,
+    COMTRADE_RATE_LIMIT_PER_SEC,
+    COMTRADE_RATE_LIMIT_BURST,
+    COMTRADE_RATE_LIMIT_STATE_PATH,
+    COMTRADE_MAX_RETRIES,
+    COMTRADE_BACKOFF_BASE_SECONDS,
+    COMTRADE_BACKOFF_MAX_SECONDS,
+    COMTRADE_REQUEST_TIMEOUT_SECONDS,
+    COMTRADE_TIMEOUT_BUDGET_SECONDS,
+)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class ComtradeAPIError(Exception):
+    """Raised when a Comtrade request fails after all retries or exceeds its budget."""
+
+
+class TokenBucket:
+    """A thread-safe token bucket rate limiter.
+
+    Tokens are added continuously at `rate` per second up to `capacity`. Each
+    request takes one token, waiting for a refill when the bucket is empty.
+    """
+
+    def __init__(self, rate=COMTRADE_RATE_LIMIT_PER_SEC, capacity=COMTRADE_RATE_LIMIT_BURST):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self):
+        """Takes a token if one is available; otherwise returns the seconds until one is."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout=None):
+        """Takes one token, blocking until one is available.
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait.
+
+        Returns:
+            bool: True if a token was taken, False if the timeout expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class FileTokenBucket(TokenBucket):
+    """A token bucket whose state lives in a file, shared by every process using the same path.
+
+    The token count is read and updated under an exclusive `flock`, so the
+    spawned batch and shared-memory workers draw from one limit instead of
+    each getting the full rate.
+    """
+
+    def __init__(self, path=COMTRADE_RATE_LIMIT_STATE_PATH, rate=COMTRADE_RATE_LIMIT_PER_SEC,
+                 capacity=COMTRADE_RATE_LIMIT_BURST):
+        super().__init__(rate, capacity)
+        self.path = path
+
+    def _take(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            now = time.time()
+            try:
+                tokens, updated = json.load(f)
+            except ValueError:
+                tokens, updated = self.capacity, now
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+            if not wait:
+                tokens -= 1
+            f.seek(0)
+            f.truncate()
+            json.dump([tokens, now], f)
+        return wait
+
+
+# Shared by every client, across processes, so concurrent workers respect one limit.
+shared_rate_limiter = FileTokenBucket()
+
+
+class ComtradeClient:
+    """A pooled, rate-limited HTTP client for the UN Comtrade API.
+
+    Connections are kept alive in a `requests` session pool, requests are
+    throttled by a token bucket shared across workers, and failures with a
+    429 or 5xx status are retried with jittered exponential backoff. Every
+    call is bounded by an overall timeout budget covering all of its retries.
+    """
+
+    def __init__(self, base_url=COMTRADE_API_BASE_URL, rate_limiter=None,
+                 pool_size=COMTRADE_POOL_SIZE, max_concurrency=COMTRADE_MAX_CONCURRENCY,
+                 max_retries=COMTRADE_MAX_RETRIES, backoff_base=COMTRADE_BACKOFF_BASE_SECONDS,
+                 backoff_max=COMTRADE_BACKOFF_MAX_SECONDS,
+                 request_timeout=COMTRADE_REQUEST_TIMEOUT_SECONDS,
+                 timeout_budget=COMTRADE_TIMEOUT_BUDGET_SECONDS):
+        self.base_url = base_url
+        self.rate_limiter = rate_limiter or shared_rate_limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.request_timeout = request_timeout
+        self.timeout_budget = timeout_budget
+        self._concurrency = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Closes the pooled connections."""
+        self.session.close()
+
+    def _backoff(self, attempt, response=None):
+        """Returns the delay before the next attempt, honouring Retry-After."""
+        if response is not None and response.headers.get('Retry-After'):
+            try:
+                return float(response.headers['Retry-After'])
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _get(self, params):
+        """Issues a GET request with rate limiting, retries, and the timeout budget."""
+        deadline = time.monotonic() + self.timeout_budget
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.rate_limiter.acquire(timeout=remaining):
+                break
+
+            response = None
+            with self._concurrency:
+                try:
+                    response = self.session.get(
+                        self.base_url,
+                        params=params,
+                        timeout=min(self.request_timeout, max(deadline - time.monotonic(), 0.001)),
+                    )
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    last_error = e
+                else:
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        if not response.ok:
+                            raise ComtradeAPIError(f"Comtrade API returned HTTP {response.status_code}: {response.text[:200]}")
+                        return response.json()
+                    last_error = f"HTTP {response.status_code}"
+
+            if attempt == self.max_retries:
+                break
+            delay = self._backoff(attempt, response)
+            if time.monotonic() + delay >= deadline:
+                break
+            logging.warning(f"Comtrade request failed ({last_error}); retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries}).")
+            time.sleep(delay)
+
+        raise ComtradeAPIError(f"Comtrade request failed after retries within {self.timeout_budget}s budget: {last_error}")
+
+    def fetch_raw(self, reporter_code, partner_code, cmd_code, period='recent', flow_code='M',
+                  max_records=COMTRADE_MAX_RECORDS):
+        """Fetches raw annual trade records from the Comtrade API.
+
+        Args:
+            reporter_code (str): One or more comma-separated reporter codes.
+            partner_code (str): One or more comma-separated partner codes.
+            cmd_code (str): One or more comma-separated HS commodity codes.
+            period (str): 'recent' or one or more comma-separated years.
+            flow_code (str): The trade flow code, 'M' for imports.
+            max_records (int): The maximum number of records to return.
+
+        Returns:
+            pd.DataFrame: The raw records as returned by the API.
+
+        Raises:
+            ComtradeAPIError: If the request fails after all retries.
+        """
+        params = {
+            'reporterCode': reporter_code,
+            'partnerCode': partner_code,
+            'cmdCode': cmd_code,
+            'period': period,
+            'flowCode': flow_code,
+            'maxRecords': max_records,
+            'includeDesc': 'true',
+        }
+        payload = self._get(params)
+        return pd.DataFrame(payload.get('data') or [])
+
+    def get_trade_data(self, reporter_id, partner_id, product_id, period='recent'):
+        """Fetches one trade series in the same schema as `get_comtrade_data`.
+
+        Args:
+            reporter_id (str): The Comtrade code for the reporting country.
+            partner_id (str): The Comtrade code for the partner country/region.
+            product_id (str): The Comtrade HS code for the product.
+            period (str): 'recent' or one or more comma-separated years.
+
+        Returns:
+            pd.DataFrame: A DataFrame with columns ['Year', 'Reporter', 'Partner',
+                          'Product', 'Value'], empty if the API returned no data.
+
+        Raises:
+            ComtradeAPIError: If the request fails after all retries.
+        """
+        logging.info(f"Fetching data from UN Comtrade API for reporter:{reporter_id}, partner:{partner_id}, product:{product_id}")
+        df = self.fetch_raw(reporter_id, partner_id, product_id, period=period)
+        if df.empty:
+            logging.warning("No data returned from the API for this selection.")
+            return pd.DataFrame()
+        return format_comtrade_frame(df)
+
+
+if __name__ == "__main__":
+    with ComtradeClient() as client:
+        print(client.get_trade_data(reporter_id="842", partner_id="0", product_id="8703").head())
@@ -0,0 +1,187 @@
+import pandas as pd
+import logging
+from collections import defaultdict, namedtuple
+from src.comtrade_api import SeriesKey, format_comtrade_frame
+from src.config import (
+    COMTRADE_MAX_RECORDS,
+    COMTRADE_RECORDS_PER_SERIES_ESTIMATE,
+    COMTRADE_AGGREGATE_CMD_CODES,
+)
+
+# One bulk Comtrade call covering every reporter x partner x product combination.
+BulkQuery = namedtuple('BulkQuery', ['reporters', 'partners', 'products'])
+
+
+def _chunks(codes, size):
+    return [codes[i:i + size] for i in range(0, len(codes), size)]
+
+
+def _split_to_limit(query, max_series):
+    """Splits a bulk query into blocks of at most `max_series` series each."""
+    reporter_size = min(len(query.reporters), max_series)
+    product_size = min(len(query.products), max(1, max_series // reporter_size))
+    partner_size = min(len(query.partners), max(1, max_series // (reporter_size * product_size)))
+
+    return [
+        BulkQuery(reporters, partners, products)
+        for reporters in _chunks(query.reporters, reporter_size)
+        for partners in _chunks(query.partners, partner_size)
+        for products in _chunks(query.products, product_size)
+    ]
+
+
+def plan_bulk_queries(keys, max_records=COMTRADE_MAX_RECORDS,
+                      records_per_series=COMTRADE_RECORDS_PER_SERIES_ESTIMATE):
+    """Groups series requests into as few bulk Comtrade calls as the record limit allows.
+
+    The API expands comma-separated codes into their full cross product, so
+    series are merged only where the cross product is exactly the requested
+    set: first reporters sharing a (partner, product), then products sharing
+    those reporters, then partners sharing both. Each resulting query is
+    split so its expected record count stays under `max_records`. Aggregate
+    commodity codes such as 'AG2' expand into many codes in the response and
+    are therefore always queried on their own.
+
+    Args:
+        keys (iterable): The `SeriesKey` (reporter, partner, product) tuples to fetch.
+        max_records (int): The API's per-call record limit.
+        records_per_series (int): The expected number of records per series.
+
+    Returns:
+        list: A list of `BulkQuery` tuples covering every requested series once.
+    """
+    keys = sorted({SeriesKey(*map(str, key)) for key in keys})
+    max_series = max(1, max_records // records_per_series)
+
+    reporters_by_flow = defaultdict(set)
+    for key in keys:
+        reporters_by_flow[(key.partner, key.product)].add(key.reporter)
+
+    products_by_reporters = defaultdict(set)
+    for (partner, product), reporters in reporters_by_flow.items():
+        group = product if product in COMTRADE_AGGREGATE_CMD_CODES else None
+        products_by_reporters[(partner, frozenset(reporters), group)].add(product)
+
+    partners_by_block = defaultdict(set)
+    for (partner, reporters, group), products in products_by_reporters.items():
+        partners_by_block[(reporters, frozenset(products))].add(partner)
+
+    queries = []
+    for (reporters, products), partners in partners_by_block.items():
+        query = BulkQuery(tuple(sorted(reporters)), tuple(sorted(partners)), tuple(sorted(products)))
+        queries.extend(_split_to_limit(query, max_series))
+
+    logging.info(f"Planned {len(queries)} bulk Comtrade call(s) for {len(keys)} series.")
+    return queries
+
+
+def split_bulk_response(query, raw_df):
+    """Splits a combined bulk response back into per-series frames.
+
+    Dimensions with a single requested code are not matched on, so aggregate
+    commodity codes whose response rows carry the expanded codes still land
+    on the requested series.
+
+    Args:
+        query (BulkQuery): The query that produced the response.
+        raw_df (pd.DataFrame): The raw records returned by the API.
+
+    Returns:
+        dict: A mapping of `SeriesKey` to a DataFrame in the `get_comtrade_data`
+              schema. Series without records map to an empty DataFrame.
+    """
+    results = {}
+    for reporter in query.reporters:
+        for partner in query.partners:
+            for product in query.products:
+                results[SeriesKey(reporter, partner, product)] = pd.DataFrame()
+
+    if raw_df.empty:
+        return results
+
+    columns = []
+    for column, codes in (('reporterCode', query.reporters), ('partnerCode', query.partners), ('cmdCode', query.products)):
+        if len(codes) > 1:
+            columns.append(column)
+
+    if not columns:
+        key = SeriesKey(query.reporters[0], query.partners[0], query.products[0])
+        results[key] = format_comtrade_frame(raw_df).reset_index(drop=True)
+        return results
+
+    codes = raw_df[columns].astype(str)
+    for group_codes, group in raw_df.groupby([codes[c] for c in columns]):
+        group_codes = dict(zip(columns, group_codes if isinstance(group_codes, tuple) else (group_codes,)))
+        key = SeriesKey(
+            group_codes.get('reporterCode', query.reporters[0]),
+            group_codes.get('partnerCode', query.partners[0]),
+            group_codes.get('cmdCode', query.products[0]),
+        )
+        if key in results:
+            results[key] = format_comtrade_frame(group).reset_index(drop=True)
+    return results
+
+
+def fetch_series_bulk(keys, fetch_raw, period='recent', max_records=COMTRADE_MAX_RECORDS,
+                      records_per_series=COMTRADE_RECORDS_PER_SERIES_ESTIMATE):
+    """Fetches many series with the fewest bulk calls and fans the results out.
+
+    If a response reaches the record limit it may have been truncated, so the
+    query is split in half and re-fetched.
+
+    Args:
+        keys (iterable): The `SeriesKey` (reporter, partner, product) tuples to fetch.
+        fetch_raw (callable): A function with the signature of
+                              `ComtradeClient.fetch_raw`.
+        period (str): 'recent' or one or more comma-separated years.
+        max_records (int): The API's per-call record limit.
+        records_per_series (int): The expected number of records per series.
+
+    Returns:
+        tuple: A tuple containing:
+               - dict: A mapping of `SeriesKey` to a DataFrame in the
+                       `get_comtrade_data` schema.
+               - dict: A report with the number of series requested, bulk calls
+                       made, round-trips saved, and records fetched.
+    """
+    pending = plan_bulk_queries(keys, max_records, records_per_series)
+    results = {}
+    calls = 0
+    records = 0
+
+    while pending:
+        query = pending.pop()
+        raw_df = fetch_raw(
+            ','.join(query.reporters),
+            ','.join(query.partners),
+            ','.join(query.products),
+            period=period,
+            max_records=max_records,
+        )
+        calls += 1
+
+        series_count = len(query.reporters) * len(query.partners) * len(query.products)
+        if len(raw_df) >= max_records and series_count > 1:
+            logging.warning(f"Bulk response hit the {max_records}-record limit; splitting the query.")
+            pending.extend(_split_to_limit(query, max(1, series_count // 2)))
+            continue
+
+        records += len(raw_df)
+        results.update(split_bulk_response(query, raw_df))
+
+    report = {
+        'series_requested': len(results),
+        'bulk_calls': calls,
+        'round_trips_saved': len(results) - calls,
+        'records_fetched': records,
+    }
+    logging.info(f"Bulk fetch report: {report}")
+    return results, report
+
+
+if __name__ == "__main__":
+    from src.comtrade_client import ComtradeClient
+    keys = [SeriesKey(r, '0', p) for r in ('842', '156', '276') for p in ('TOTAL', '87')]
+    with ComtradeClient() as client:
+        frames, report = fetch_series_bulk(keys, client.fetch_raw)
+    print(report)
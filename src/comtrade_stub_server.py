@@ -0,0 +1,161 @@
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+STUB_YEARS = range(2000, 2023)
+
+
+def _stub_value(reporter, partner, cmd, year):
+    """Returns a deterministic trade value in US$ for a series and year."""
+    seed = zlib.crc32(f"{reporter}|{partner}|{cmd}".encode())
+    base = 1e8 * (1 + seed % 1000)
+    return base * (1.05 ** (year - STUB_YEARS[0]))
+
+
+def stub_records(reporter_codes, partner_codes, cmd_codes, period='recent'):
+    """Builds the records the stub server returns for a query.
+
+    Every combination of the comma-separated codes gets one record per year,
+    mirroring how the real API expands multi-code queries.
+
+    Args:
+        reporter_codes (str): Comma-separated reporter codes.
+        partner_codes (str): Comma-separated partner codes.
+        cmd_codes (str): Comma-separated commodity codes.
+        period (str): 'recent' for every stub year, or comma-separated years.
+
+    Returns:
+        list: A list of record dictionaries in the Comtrade response format.
+    """
+    if period == 'recent':
+        years = list(STUB_YEARS)
+    else:
+        years = [int(y) for y in period.split(',') if int(y) in STUB_YEARS]
+
+    records = []
+    for reporter in reporter_codes.split(','):
+        for partner in partner_codes.split(','):
+            for cmd in cmd_codes.split(','):
+                for year in years:
+                    records.append({
+                        'period': year,
+                        'reporterCode': reporter,
+                        'reporterDesc': f"Reporter {reporter}",
+                        'partnerCode': partner,
+                        'partnerDesc': 'World' if partner == '0' else f"Partner {partner}",
+                        'cmdCode': cmd,
+                        'cmdDesc': f"Commodity {cmd}",
+                        'primaryValue': _stub_value(reporter, partner, cmd, year),
+                    })
+    return records
+
+
+class ComtradeStubServer:
+    """A local stand-in for the Comtrade API used to test the HTTP client.
+
+    The server answers GET requests with deterministic data and can be told
+    to fail with a scripted sequence of status codes or to add latency, so
+    retry, rate-limit, and throughput behaviour can be exercised offline.
+
+    Example:
+        with ComtradeStubServer(fail_statuses=[503]) as server:
+            client = ComtradeClient(base_url=server.url)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, fail_statuses=None, latency=0.0, retry_after=None):
+        self.fail_statuses = deque(fail_statuses or [])
+        self.latency = latency
+        self.retry_after = retry_after
+        self.request_log = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/public/v1/get/C/A/HS"
+
+    @property
+    def request_count(self):
+        with self._lock:
+            return len(self.request_log)
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logging.debug(f"Comtrade stub: {format % args}")
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                with stub._lock:
+                    stub.request_log.append((time.monotonic(), params))
+                    status = stub.fail_statuses.popleft() if stub.fail_statuses else 200
+
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                if status != 200:
+                    headers = {'Retry-After': str(stub.retry_after)} if stub.retry_after is not None else None
+                    self._send_json(status, {'error': f"Stubbed failure {status}"}, headers)
+                    return
+
+                records = stub_records(
+                    params.get('reporterCode', ''),
+                    params.get('partnerCode', '0'),
+                    params.get('cmdCode', 'TOTAL'),
+                    params.get('period', 'recent'),
+                )
+                records = records[:int(params.get('maxRecords', len(records)))]
+                self._send_json(200, {'elapsedTime': '0.0 secs', 'count': len(records), 'data': records})
+
+        return Handler
+
+    def start(self):
+        """Starts serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logging.info(f"Comtrade stub server listening on {self.url}")
+        return self
+
+    def stop(self):
+        """Stops the server and releases its socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    from src.logging_config import setup_logging
+    setup_logging()
+    server = ComtradeStubServer(port=8765).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
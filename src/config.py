@@ -1,13 +1,79 @@
 
 # Configuration file for the AI Trade Forecaster
+import os
+import logging
+
+
+def _env_float(name, default):
+    """Reads a float from the environment, ignoring a malformed value instead of failing at import."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logging.warning(f"Ignoring invalid {name}={value!r}; using {default}.")
+        return default
+
 
 # --- Data Paths ---
 DATA_DIR = 'data'
 REPORTERS_JSON_PATH = f'{DATA_DIR}/reporters.json'
 COMMODITIES_JSON_PATH = f'{DATA_DIR}/commodities.json'
+TRADE_STORE_DIR = f'{DATA_DIR}/store'
+AVAILABILITY_INDEX_PATH = f'{DATA_DIR}/availability_index.json'
+BULK_VALUES_PATH = f'{DATA_DIR}/merchandise_values_annual_input.csv'
+BULK_INDICES_PATH = f'{DATA_DIR}/merchandise_indices_annual_input.csv'
+EXOG_CACHE_DIR = f'{DATA_DIR}/exog_cache'
+REFERENCE_INDEX_PATH = f'{DATA_DIR}/reference_index.json'
+COMTRADE_REPORTERS_REF_PATH = f'{DATA_DIR}/comtrade_reporters.json'
+COMTRADE_HS_REF_PATH = f'{DATA_DIR}/comtrade_hs.json'
+POPULARITY_PATH = f'{DATA_DIR}/popularity.json'
+BATCH_RUNS_DIR = f'{DATA_DIR}/batch'
+# Token bucket state shared by every process that calls Comtrade.
+COMTRADE_RATE_LIMIT_STATE_PATH = f'{DATA_DIR}/comtrade_rate_limit.json'
+
+# --- Bulk Data Files ---
+# Column names in the WTO bulk CSV exports for the series key, year, and value.
+BULK_COLUMNS = {
+    'reporter': 'Reporting Economy Code',
+    'partner': 'Partner Economy Code',
+    'product': 'Product/Sector Code',
+    'indicator': 'Indicator Code',
+    'year': 'Year',
+    'value': 'Value',
+}
+# The WTO indicator for the flow the app fetches from Comtrade (merchandise imports).
+BULK_INDICATOR = 'ITS_MTV_AM'
+# WTO product/sector codes with an exact Comtrade equivalent. Other WTO sector
+# groups are not indexed; numeric HS codes are kept as they are.
+BULK_PRODUCT_CODE_MAP = {'TO': 'TOTAL'}
+BULK_CHUNK_SIZE = 200000
+# Columns in the merchandise indices export used to build exogenous features.
+BULK_INDICES_COLUMNS = {
+    'reporter_iso3': 'Reporting Economy ISO3A Code',
+    'indicator': 'Indicator Code',
+    'year': 'Year',
+    'value': 'Value',
+}
 
 # --- Comtrade API ---
 COMTRADE_API_BASE_URL = "https://comtradeapi.un.org/public/v1/get/C/A/HS"
+COMTRADE_MAX_RECORDS = 5000
+COMTRADE_POOL_SIZE = 10
+COMTRADE_MAX_CONCURRENCY = 4
+COMTRADE_RATE_LIMIT_PER_SEC = 1.0
+COMTRADE_RATE_LIMIT_BURST = 5
+COMTRADE_MAX_RETRIES = 5
+COMTRADE_BACKOFF_BASE_SECONDS = 0.5
+COMTRADE_BACKOFF_MAX_SECONDS = 30.0
+COMTRADE_REQUEST_TIMEOUT_SECONDS = 30.0
+COMTRADE_TIMEOUT_BUDGET_SECONDS = 120.0
+COMTRADE_RECORDS_PER_SERIES_ESTIMATE = 30
+COMTRADE_AGGREGATE_CMD_CODES = ('AG2', 'AG4', 'AG6', 'ALL')
+
+# --- Incremental Refresh ---
+STALE_ARTIFACTS = ('forecast', 'backtest', 'model')
 
 # --- World Bank API ---
 WB_INDICATOR = 'NY.GDP.MKTP.CD'
@@ -20,20 +86,115 @@ FORECAST_STEPS = 5
 GDP_GROWTH_ASSUMPTION = 1.04
 BACKTEST_YEARS = 3
 
+# --- Exogenous Features ---
+# Regressors used by the models. 'GDP_USD' comes from the World Bank; any other
+# name must be a key of EXOG_INDEX_INDICATORS.
+EXOG_FEATURES = ['GDP_USD']
+EXOG_INDEX_INDICATORS = {
+    'Export_Volume_Index': 'ITS_MTV_AXV',
+    'Import_Volume_Index': 'ITS_MTV_AMV',
+    'Export_Price_Index': 'ITS_MTV_AXP',
+    'Import_Price_Index': 'ITS_MTV_AMP',
+}
+# Yearly growth factors used to extrapolate features beyond the last known year.
+EXOG_GROWTH_ASSUMPTIONS = {'GDP_USD': GDP_GROWTH_ASSUMPTION}
+EXOG_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600
+# A reporter whose features could not be built is not retried for this long.
+EXOG_CACHE_FAILURE_TTL_SECONDS = 600
+
+# --- GDP Scenarios ---
+GDP_SCENARIO_COUNT = 5000
+GDP_SCENARIO_GROWTH_STD = 0.02
+GDP_SCENARIO_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
 # --- SARIMAX Model ---
 SARIMAX_ORDER = (0, 1, 1)
 
+# --- Baseline Models ---
+# Smoothing factors searched, per series, when fitting Holt's method and Theta.
+BASELINE_ALPHA_GRID = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+BASELINE_BETA_GRID = (0.01, 0.05, 0.1, 0.2, 0.3)
+
+# --- Hierarchical Forecasting ---
+HIERARCHY_WORLD_PARTNER = '0'
+HIERARCHY_TOTAL_PRODUCT = 'TOTAL'
+# 'bottom_up', 'ols', or 'wls' (weighted by the number of leaves under each series).
+HIERARCHY_RECONCILIATION = 'wls'
+
 # --- LSTM Model ---
 LSTM_LOOK_BACK = 2
 LSTM_EPOCHS = 100
 LSTM_BATCH_SIZE = 1
 LSTM_NEURONS = 16
 
+# --- Latency Budget ---
+INTERACTIVE_TIME_BUDGET_SECONDS = 20.0
+# Prior fit cost in seconds per observation, used until a stage has been timed.
+STAGE_TIME_PRIORS = {'sarimax': 0.02, 'baseline': 0.001, 'lstm': 0.5, 'backtest': 0.6}
+FIT_TIME_EWMA_ALPHA = 0.3
+FIT_TIME_LENGTH_BUCKET = 5
+
 # --- Gradio App ---
-COUNTRY_CODE_MAP = {"842": "USA", "156": "CHN", "276": "DEU", "392": "JPN", "356": "IND"}
+# Used for reporters the reference index has no ISO code for; see src/reference_index.py.
+FALLBACK_COUNTRY_CODE_MAP = {"842": "USA", "156": "CHN", "276": "DEU", "392": "JPN", "356": "IND"}
 GRADIO_SERVER_NAME = "0.0.0.0"
 GRADIO_SERVER_PORT = 7860
 
+# --- Reference Catalogs ---
+COMTRADE_REPORTERS_REF_URL = 'https://comtradeapi.un.org/files/v1/app/reference/Reporters.json'
+COMTRADE_HS_REF_URL = 'https://comtradeapi.un.org/files/v1/app/reference/HS.json'
+REFERENCE_SEARCH_LIMIT = 50
+# The product dropdown starts with HS chapters; deeper codes are reached by search.
+REFERENCE_DROPDOWN_MAX_LEVEL = 2
+
+# --- JSON API ---
+API_SERVER_HOST = "0.0.0.0"
+API_SERVER_PORT = 8000
+API_CACHE_TTL_SECONDS = 3600
+API_CACHE_MAX_ENTRIES = 1024
+API_BATCH_MAX_SERIES = 500
+API_BATCH_MAX_WORKERS = 4
+API_GZIP_MIN_BYTES = 500
+
+# --- Cache Prewarming ---
+PREWARM_ENABLED = True
+PREWARM_TOP_N = 20
+# Series prewarmed even before any traffic is recorded, e.g. the UI's default selection.
+PREWARM_SEED_KEYS = [("842", "0", "87")]
+# Popularity counts are multiplied by this factor after every prewarm cycle.
+PREWARM_POPULARITY_DECAY = 0.95
+PREWARM_INTERVAL_SECONDS = 60
+# Refresh a cached result once it is within this many seconds of expiring.
+PREWARM_REFRESH_AHEAD_SECONDS = 600
+PREWARM_MAX_CONCURRENCY = 1
+
+# --- Batch Forecasting ---
+BATCH_SHARD_SIZE = 25
+# A claim whose lock file has not been touched for this long belongs to a dead worker.
+BATCH_CLAIM_TIMEOUT_SECONDS = 1800
+BATCH_WORKERS = 2
+
+# --- Shared-Memory Data Plane ---
+# Prefix of the named shared memory blocks holding worker inputs.
+SHARED_MEMORY_PREFIX = 'trade'
+SHARED_POOL_WORKERS = 4
+
+# --- Request Profiling ---
+# Set TRADE_PROFILE=1 to profile every request, or TRADE_PROFILE_SAMPLE_RATE to a
+# fraction between 0 and 1 to profile a random sample. Both unset means no overhead.
+PROFILE_ENABLED = os.environ.get('TRADE_PROFILE') == '1'
+PROFILE_SAMPLE_RATE = _env_float('TRADE_PROFILE_SAMPLE_RATE', 0.0)
+PROFILE_DIR = os.environ.get('TRADE_PROFILE_DIR', f'{DATA_DIR}/profiles')
+PROFILE_MAX_FILES = 50
+PROFILE_TOP_N = 10
+
 # --- LLM ---
 LLM_MODEL = 'google/gemma-2b-it'
 LLM_MAX_NEW_TOKENS = 512
+# After this many seconds a template narrative is shown instead of waiting for the LLM.
+LLM_TIMEOUT_SECONDS = 15
+# Requests beyond this many queued generations get the template narrative immediately.
+LLM_MAX_QUEUE_DEPTH = 2
+# Replace a template narrative with the LLM text once it arrives, waiting at most this long.
+LLM_UPGRADE_WHEN_READY = True
+LLM_UPGRADE_TIMEOUT_SECONDS = 120
@@ -5,6 +5,28 @@ import os
 import logging
 from src.config import WB_INDICATOR, WB_START_YEAR, WB_END_YEAR
 
+def fetch_gdp(country_code):
+    """Fetches annual GDP for a country from the World Bank API (wbgapi).
+
+    Args:
+        country_code (str): The ISO 3-letter country code.
+
+    Returns:
+        pd.DataFrame: A DataFrame indexed by 'Year' (datetime) with a 'GDP_USD'
+                      column in millions of US$.
+    """
+    gdp_df = wb.data.DataFrame(
+        WB_INDICATOR,
+        country_code,
+        time=range(WB_START_YEAR, WB_END_YEAR)
+    ).transpose()
+
+    gdp_df.index = pd.to_datetime(gdp_df.index.str.replace('YR', ''), format='%Y')
+    gdp_df.index.name = 'Year'
+    gdp_df.rename(columns={country_code: 'GDP_USD'}, inplace=True)
+    gdp_df['GDP_USD'] = gdp_df['GDP_USD'] / 1e6
+    return gdp_df
+
 def integrate_external_data(input_df, country_code="CHN"):
     """Fetches and integrates World Bank GDP data with the trade data.
 
@@ -28,17 +50,7 @@ def integrate_external_data(input_df, country_code="CHN"):
     trade_df.index = pd.to_datetime(trade_df.index)
 
     try:
-        gdp_df = wb.data.DataFrame(
-            WB_INDICATOR,
-            country_code,
-            time=range(WB_START_YEAR, WB_END_YEAR)
-        ).transpose()
-        
-        gdp_df.index = pd.to_datetime(gdp_df.index.str.replace('YR', ''), format='%Y')
-        gdp_df.index.name = 'Year'
-        gdp_df.rename(columns={country_code: 'GDP_USD'}, inplace=True)
-        gdp_df['GDP_USD'] = gdp_df['GDP_USD'] / 1e6
-        
+        gdp_df = fetch_gdp(country_code)
     except Exception as e:
         logging.error(f"Could not fetch GDP data: {e}. Proceeding without it.")
         trade_df['GDP_USD'] = 0 # Return a column of zeros if API fails
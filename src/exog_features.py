@@ -0,0 +1,201 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+import logging
+import threading
+from src.data_integration_script import fetch_gdp
+from src.config import (
+    EXOG_FEATURES,
+    EXOG_INDEX_INDICATORS,
+    EXOG_GROWTH_ASSUMPTIONS,
+    EXOG_CACHE_DIR,
+    EXOG_CACHE_MAX_AGE_SECONDS,
+    EXOG_CACHE_FAILURE_TTL_SECONDS,
+    BULK_INDICES_PATH,
+    BULK_INDICES_COLUMNS,
+    BULK_CHUNK_SIZE,
+)
+
+
+class ExogFeatureMatrix:
+    """Year-aligned exogenous features for one reporter, stored as a contiguous array.
+
+    Row `i` of `values` holds the features for year `first_year + i`, so a year
+    range maps to a row slice by offset arithmetic instead of a pandas join.
+    Only years where every feature is known are kept.
+    """
+
+    def __init__(self, first_year, features, values):
+        self.first_year = int(first_year)
+        self.features = list(features)
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.feature_index = {name: i for i, name in enumerate(self.features)}
+
+    @property
+    def last_year(self):
+        return self.first_year + len(self.values) - 1
+
+    def covers(self, years):
+        """Returns a boolean mask of which years have features."""
+        years = np.asarray(years)
+        return (years >= self.first_year) & (years <= self.last_year)
+
+    def slice(self, start_year, end_year):
+        """Returns a view of the rows for the inclusive year range."""
+        if start_year < self.first_year or end_year > self.last_year:
+            raise KeyError(f"Years {start_year}-{end_year} are outside {self.first_year}-{self.last_year}.")
+        return self.values[start_year - self.first_year:end_year - self.first_year + 1]
+
+    def at_years(self, years):
+        """Returns the rows for the given years, as a view when they are consecutive."""
+        years = np.asarray(years, dtype=int)
+        if len(years) and np.all(np.diff(years) == 1):
+            return self.slice(years[0], years[-1])
+        if not self.covers(years).all():
+            raise KeyError(f"Some years are outside {self.first_year}-{self.last_year}.")
+        return self.values[years - self.first_year]
+
+    def extrapolate(self, last_year, steps, growth=EXOG_GROWTH_ASSUMPTIONS):
+        """Projects the features `steps` years past `last_year`.
+
+        Each feature grows from its `last_year` value by its factor in `growth`;
+        features without a factor are held flat.
+
+        Returns:
+            np.array: An array of shape (steps, n_features).
+        """
+        factors = np.array([growth.get(name, 1.0) for name in self.features])
+        last_row = self.slice(last_year, last_year)[0]
+        return last_row * factors ** np.arange(1, steps + 1)[:, None]
+
+    def save(self, path):
+        """Saves the matrix to a .npz file."""
+        np.savez(path, first_year=self.first_year, features=np.array(self.features), values=self.values)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a matrix saved with `save`."""
+        with np.load(path) as data:
+            return cls(int(data['first_year']), [str(name) for name in data['features']], data['values'])
+
+
+def load_index_features(country_code, indicators, path=BULK_INDICES_PATH, columns=BULK_INDICES_COLUMNS,
+                        chunksize=BULK_CHUNK_SIZE):
+    """Loads merchandise volume/price indices for one reporter from the bulk indices CSV.
+
+    Args:
+        country_code (str): The reporter's ISO 3-letter country code.
+        indicators (dict): Maps feature names to indicator codes in the file.
+        path (str): The bulk indices CSV file.
+        columns (dict): Column names for 'reporter_iso3', 'indicator', 'year', and 'value'.
+        chunksize (int): The number of rows to read per chunk.
+
+    Returns:
+        pd.DataFrame: A DataFrame indexed by integer year with one column per feature.
+    """
+    wanted = {code: name for name, code in indicators.items()}
+    usecols = [columns['reporter_iso3'], columns['indicator'], columns['year'], columns['value']]
+    parts = []
+    for chunk in pd.read_csv(path, usecols=usecols, dtype={columns['reporter_iso3']: str, columns['indicator']: str},
+                             chunksize=chunksize):
+        chunk = chunk[(chunk[columns['reporter_iso3']] == country_code) & chunk[columns['indicator']].isin(wanted)]
+        parts.append(chunk)
+
+    df = pd.concat(parts) if parts else pd.DataFrame(columns=usecols)
+    df = df.pivot_table(index=columns['year'], columns=columns['indicator'], values=columns['value'], aggfunc='mean')
+    df = df.rename(columns=wanted).reindex(columns=list(indicators))
+    df.index = df.index.astype(int)
+    return df
+
+
+def build_exog_matrix(country_code, features=EXOG_FEATURES, indices_path=BULK_INDICES_PATH):
+    """Builds the year-aligned exogenous feature matrix for a reporter.
+
+    This is the one place where the feature sources are joined; afterwards
+    the models only slice the resulting array.
+
+    Args:
+        country_code (str): The reporter's ISO 3-letter country code.
+        features (list): The feature names to include, in column order.
+        indices_path (str): The bulk merchandise indices CSV file.
+
+    Returns:
+        ExogFeatureMatrix: The feature matrix covering every year from the first
+                           one where all features are known, with later gaps
+                           forward-filled.
+    """
+    logging.info(f"Building exogenous feature matrix for {country_code}: {features}")
+    frames = []
+    if 'GDP_USD' in features:
+        gdp_df = fetch_gdp(country_code)
+        gdp_df.index = gdp_df.index.year
+        frames.append(gdp_df[['GDP_USD']])
+
+    index_features = {name: EXOG_INDEX_INDICATORS[name] for name in features if name != 'GDP_USD'}
+    if index_features:
+        frames.append(load_index_features(country_code, index_features, indices_path))
+
+    df = pd.concat(frames, axis=1).sort_index()
+    # Every year is present after the reindex, so once the leading years without
+    # all features are dropped the rows map to years by offset.
+    df = df.reindex(range(df.index.min(), df.index.max() + 1)).ffill()[features].dropna()
+    if df.empty:
+        raise ValueError(f"No years with all exogenous features {features} for {country_code}.")
+    return ExogFeatureMatrix(df.index[0], features, df.values)
+
+
+class ExogFeatureCache:
+    """Caches exogenous feature matrices per reporter in memory and on disk.
+
+    A reporter whose matrix cannot be built, e.g. because the World Bank has no
+    GDP for it, is remembered for `failure_ttl` seconds so that requests in
+    between do not repeat the failing calls.
+    """
+
+    def __init__(self, cache_dir=EXOG_CACHE_DIR, features=EXOG_FEATURES, max_age=EXOG_CACHE_MAX_AGE_SECONDS,
+                 failure_ttl=EXOG_CACHE_FAILURE_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.features = list(features)
+        self.max_age = max_age
+        self.failure_ttl = failure_ttl
+        self._matrices = {}
+        # Time of the last failed build per reporter.
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def _path(self, country_code):
+        return os.path.join(self.cache_dir, f"{country_code}_{'-'.join(self.features)}.npz")
+
+    def get(self, country_code):
+        """Returns the feature matrix for a reporter, or None if it cannot be built."""
+        with self._lock:
+            if country_code in self._matrices:
+                return self._matrices[country_code]
+            failed_at = self._failures.get(country_code)
+            if failed_at is not None and time.time() - failed_at < self.failure_ttl:
+                return None
+
+        path = self._path(country_code)
+        matrix = None
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) < self.max_age:
+            matrix = ExogFeatureMatrix.load(path)
+        else:
+            try:
+                matrix = build_exog_matrix(country_code, self.features)
+            except Exception as e:
+                logging.error(f"Could not build exogenous features for {country_code}: {e}")
+                with self._lock:
+                    self._failures[country_code] = time.time()
+                return None
+            os.makedirs(self.cache_dir, exist_ok=True)
+            matrix.save(path)
+
+        with self._lock:
+            self._matrices[country_code] = matrix
+            self._failures.pop(country_code, None)
+        return matrix
+
+
+# Shared so each reporter's features are built once per process.
+exog_cache = ExogFeatureCache()
@@ -1,49 +1,102 @@
 
 import pandas as pd
+import numpy as np
 import statsmodels.api as sm
 import os
 import warnings
 import logging
-from src.config import SARIMAX_ORDER, FORECAST_STEPS, GDP_GROWTH_ASSUMPTION
+from src.config import (
+    SARIMAX_ORDER,
+    FORECAST_STEPS,
+    GDP_GROWTH_ASSUMPTION,
+    GDP_SCENARIO_COUNT,
+    GDP_SCENARIO_GROWTH_STD,
+    GDP_SCENARIO_QUANTILES,
+)
 
 warnings.filterwarnings("ignore")
 
-def forecast_sarimax(input_df):
-    """Builds and trains a SARIMAX model to generate a multi-year forecast.
+def _forecast_index(df, steps=FORECAST_STEPS):
+    """Returns the yearly DatetimeIndex for the `steps` years after `df`."""
+    return pd.date_range(start=df.index.max() + pd.DateOffset(years=1), periods=steps, freq='YS')
 
-    This function uses the statsmodels library to create a Seasonal AutoRegressive
-    Integrated Moving Average with eXogenous regressors (SARIMAX) model. It uses
-    the trade 'Value' as the endogenous variable and 'GDP_USD' as the exogenous
-    variable.
+def _prepare_exog(df, exog_matrix=None):
+    """Builds the exogenous regressors for the training years and the forecast horizon.
+
+    Without a feature matrix the 'GDP_USD' column of `df` is used and GDP is
+    extrapolated with `GDP_GROWTH_ASSUMPTION`. With one, rows are sliced from
+    the matrix by year and every feature is extrapolated by the matrix.
+
+    Returns:
+        tuple: The training exog DataFrame and the future exog DataFrame.
+    """
+    index = _forecast_index(df)
+    if exog_matrix is None:
+        exog = df[['GDP_USD']]
+        future_gdp = [exog['GDP_USD'].iloc[-1] * (GDP_GROWTH_ASSUMPTION)**i for i in range(1, FORECAST_STEPS + 1)]
+        return exog, pd.DataFrame({'GDP_USD': future_gdp}, index=index)
+
+    years = df.index.year
+    exog = pd.DataFrame(exog_matrix.at_years(years), index=df.index, columns=exog_matrix.features)
+    future = exog_matrix.extrapolate(years[-1], FORECAST_STEPS)
+    return exog, pd.DataFrame(future, index=index, columns=exog_matrix.features)
+
+def _fit_sarimax(input_df, exog_matrix=None):
+    """Fits the SARIMAX model on the enriched data.
 
     Args:
         input_df (pd.DataFrame): The enriched DataFrame containing 'Year', 'Value',
-                                 and 'GDP_USD' columns.
+                                 and 'GDP_USD' columns. 'GDP_USD' is not needed
+                                 when `exog_matrix` is given.
+        exog_matrix (ExogFeatureMatrix, optional): Precomputed exogenous features
+                                                   for the reporter.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the forecast for the next `FORECAST_STEPS`
-                      years. Includes the mean forecast, and confidence intervals.
+        tuple: A tuple containing the fitted statsmodels results object, the
+               yearly-indexed DataFrame it was trained on, and the future exog
+               DataFrame for the forecast horizon.
     """
-    logging.info("Training SARIMAX model...")
-    
     df = input_df.set_index('Year')
     df.index = pd.to_datetime(df.index)
     df = df.asfreq('YS')
-    df.dropna(inplace=True)
+    if exog_matrix is None:
+        df.dropna(inplace=True)
+    else:
+        df = df.dropna(subset=['Value'])
+        df = df[exog_matrix.covers(df.index.year)]
 
     endog = df['Value']
-    exog = df[['GDP_USD']]
+    exog, exog_forecast = _prepare_exog(df, exog_matrix)
 
     model = sm.tsa.statespace.SARIMAX(
         endog=endog,
         exog=exog,
         order=SARIMAX_ORDER,
     ).fit(disp=False)
+    return model, df, exog_forecast
+
+def forecast_sarimax(input_df, exog_matrix=None):
+    """Builds and trains a SARIMAX model to generate a multi-year forecast.
+
+    This function uses the statsmodels library to create a Seasonal AutoRegressive
+    Integrated Moving Average with eXogenous regressors (SARIMAX) model. It uses
+    the trade 'Value' as the endogenous variable and 'GDP_USD' as the exogenous
+    variable, or the features of `exog_matrix` when one is given.
+
+    Args:
+        input_df (pd.DataFrame): The enriched DataFrame containing 'Year', 'Value',
+                                 and 'GDP_USD' columns.
+        exog_matrix (ExogFeatureMatrix, optional): Precomputed exogenous features
+                                                   for the reporter.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the forecast for the next `FORECAST_STEPS`
+                      years. Includes the mean forecast, and confidence intervals.
+    """
+    logging.info("Training SARIMAX model...")
+    model, df, exog_forecast = _fit_sarimax(input_df, exog_matrix)
 
     logging.info("Generating SARIMAX forecast...")
-    future_gdp = [exog['GDP_USD'].iloc[-1] * (GDP_GROWTH_ASSUMPTION)**i for i in range(1, FORECAST_STEPS + 1)]
-    exog_forecast = pd.DataFrame({'GDP_USD': future_gdp}, index=pd.date_range(start=df.index.max() + pd.DateOffset(years=1), periods=FORECAST_STEPS, freq='YS'))
-    
     forecast = model.get_forecast(steps=FORECAST_STEPS, exog=exog_forecast)
     
     forecast_df = forecast.summary_frame()
@@ -52,6 +105,106 @@ def forecast_sarimax(input_df):
     logging.info("SARIMAX forecast generated successfully.")
     return forecast_df
 
+def sample_gdp_growth_paths(n_scenarios=GDP_SCENARIO_COUNT, mean=GDP_GROWTH_ASSUMPTION,
+                            std=GDP_SCENARIO_GROWTH_STD, steps=FORECAST_STEPS, seed=None):
+    """Draws random yearly GDP growth factors for a set of scenarios.
+
+    Args:
+        n_scenarios (int): The number of scenarios to draw.
+        mean (float): The mean yearly growth factor (e.g. 1.04 for 4% growth).
+        std (float): The standard deviation of the yearly growth factor.
+        steps (int): The number of forecast years per scenario.
+        seed (int or np.random.SeedSequence, optional): Seed for the random number generator.
+
+    Returns:
+        np.array: An array of shape (n_scenarios, steps) of growth factors.
+    """
+    rng = np.random.default_rng(seed)
+    return rng.normal(mean, std, size=(n_scenarios, steps))
+
+def gdp_paths_from_growth(last_gdp, growth, steps=FORECAST_STEPS):
+    """Compounds growth factors into GDP level paths starting from `last_gdp`.
+
+    Args:
+        last_gdp (float): The last observed GDP value.
+        growth (array-like): Either a 1-D grid of constant yearly growth factors
+                             (one scenario each) or a 2-D array of shape
+                             (n_scenarios, steps) with a factor per year.
+        steps (int): The number of forecast years, used for a 1-D grid.
+
+    Returns:
+        np.array: An array of shape (n_scenarios, steps) of GDP levels.
+    """
+    growth = np.asarray(growth, dtype=float)
+    if growth.ndim == 1:
+        growth = np.repeat(growth[:, None], steps, axis=1)
+    return last_gdp * np.cumprod(growth, axis=1)
+
+def simulate_gdp_scenarios(input_df, growth=None, quantiles=GDP_SCENARIO_QUANTILES,
+                           include_model_error=True, seed=None, exog_matrix=None):
+    """Evaluates a fitted SARIMAX model over many GDP growth scenarios at once.
+
+    The model is fitted a single time. Because GDP enters the observation
+    equation as a linear regressor, the forecast mean for any GDP path is the
+    zero-GDP forecast plus the GDP coefficient times the path, and the forecast
+    variance does not depend on the path. This lets all scenarios be evaluated
+    as one array operation instead of one `get_forecast` call per scenario.
+
+    Args:
+        input_df (pd.DataFrame): The enriched DataFrame containing 'Year', 'Value',
+                                 and 'GDP_USD' columns.
+        growth (array-like, optional): Yearly GDP growth factors, either a 1-D
+                                       grid or a 2-D (n_scenarios, steps) array.
+                                       Defaults to `GDP_SCENARIO_COUNT` paths drawn
+                                       by `sample_gdp_growth_paths`.
+        quantiles (tuple): The quantiles to report for the fan chart.
+        include_model_error (bool): If True, each scenario also draws from the
+                                    model's forecast error distribution so the fan
+                                    reflects both GDP and model uncertainty.
+        seed (int, optional): Seed for the random number generators. The GDP paths
+                              and the model errors are drawn from independent
+                              child streams of this seed.
+        exog_matrix (ExogFeatureMatrix, optional): Precomputed exogenous features
+                                                   for the reporter. Features other
+                                                   than GDP follow their own
+                                                   extrapolation in every scenario.
+
+    Returns:
+        pd.DataFrame: A DataFrame indexed by forecast 'Year' with one column per
+                      quantile (e.g. 'q05', 'q50', 'q95') plus 'mean'.
+    """
+    logging.info("Training SARIMAX model for GDP scenario simulation...")
+    model, df, exog_forecast = _fit_sarimax(input_df, exog_matrix)
+    index = exog_forecast.index
+    if 'GDP_USD' not in exog_forecast.columns:
+        raise ValueError("GDP scenarios need 'GDP_USD' among the exogenous features.")
+
+    # Independent streams, so the model errors are not the standardized GDP shocks.
+    growth_seed, error_seed = np.random.SeedSequence(seed).spawn(2)
+    if growth is None:
+        growth = sample_gdp_growth_paths(seed=growth_seed)
+    last_gdp = model.model.data.orig_exog['GDP_USD'].iloc[-1]
+    gdp_paths = gdp_paths_from_growth(last_gdp, growth)
+    logging.info(f"Simulating {len(gdp_paths)} GDP scenarios...")
+
+    baseline = model.get_forecast(steps=FORECAST_STEPS, exog=exog_forecast.assign(GDP_USD=0.0))
+    base_mean = np.asarray(baseline.predicted_mean)
+    base_se = np.asarray(baseline.se_mean)
+    gdp_coef = model.params['GDP_USD']
+
+    paths = base_mean + gdp_coef * gdp_paths
+    if include_model_error:
+        rng = np.random.default_rng(error_seed)
+        paths = paths + rng.standard_normal(paths.shape) * base_se
+
+    fan = np.quantile(paths, quantiles, axis=0).T
+    fan_df = pd.DataFrame(fan, index=index, columns=[f"q{round(q * 100):02d}" for q in quantiles])
+    fan_df['mean'] = paths.mean(axis=0)
+    fan_df.index.name = 'Year'
+
+    logging.info("GDP scenario simulation completed successfully.")
+    return fan_df
+
 if __name__ == "__main__":
     data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
     enriched_csv_path = os.path.join(data_dir, 'china_exports_enriched.csv')
@@ -0,0 +1,229 @@
+import pandas as pd
+import numpy as np
+import logging
+import scipy.sparse as sp
+from scipy.sparse.linalg import factorized
+from src.comtrade_api import SeriesKey
+from src.baseline_forecasting import align_panel, forecast_panel, _valid_bounds
+from src.reference_index import commodity_index
+from src.config import (
+    FORECAST_STEPS,
+    HIERARCHY_WORLD_PARTNER,
+    HIERARCHY_TOTAL_PRODUCT,
+    HIERARCHY_RECONCILIATION,
+)
+
+
+def hs_ancestors(code, index=commodity_index):
+    """Returns the HS codes above `code`, nearest first, ending with the total.
+
+    Uses the parent links of the reference index when it knows the code, and
+    otherwise the HS convention that a code's parent is its code with the
+    last two digits removed.
+    """
+    ancestors = [entry.id for entry in index.ancestors(code)] if index is not None else []
+    if not ancestors and code.isdigit():
+        ancestors = [code[:length] for length in range(len(code) - 2, 0, -2)]
+    if code != HIERARCHY_TOTAL_PRODUCT and HIERARCHY_TOTAL_PRODUCT not in ancestors:
+        ancestors.append(HIERARCHY_TOTAL_PRODUCT)
+    return ancestors
+
+
+def build_summation_matrix(leaf_keys, ancestors_fn=hs_ancestors):
+    """Builds the sparse summation matrix mapping leaf series to every level.
+
+    Leaves are bilateral series for the most detailed products. Each leaf
+    adds into the series for its partner and for the World partner, at its
+    own product and at every product above it, within its own reporter.
+
+    Args:
+        leaf_keys (list): The `SeriesKey` of every leaf series.
+        ancestors_fn (callable): Returns the product codes above a product code.
+
+    Returns:
+        tuple: The `SeriesKey` of every node, aggregates first and the leaves
+               last in the order given, and the CSR matrix S of shape
+               (n_nodes, n_leaves) with S[i, j] = 1 when leaf j adds into node i.
+    """
+    leaf_keys = [SeriesKey(*map(str, key)) for key in leaf_keys]
+    leaf_set = set(leaf_keys)
+    node_ids, rows, cols = {}, [], []
+    aggregates = []
+    for col, leaf in enumerate(leaf_keys):
+        partners = [leaf.partner, HIERARCHY_WORLD_PARTNER]
+        products = [leaf.product] + ancestors_fn(leaf.product)
+        for partner in partners:
+            for product in products:
+                node = SeriesKey(leaf.reporter, partner, product)
+                if node == leaf:
+                    continue
+                if node in leaf_set:
+                    raise ValueError(f"Series {node} is both a leaf and an aggregate of {leaf}.")
+                if node not in node_ids:
+                    node_ids[node] = len(aggregates)
+                    aggregates.append(node)
+                rows.append(node_ids[node])
+                cols.append(col)
+
+    n_aggregates = len(aggregates)
+    rows.extend(range(n_aggregates, n_aggregates + len(leaf_keys)))
+    cols.extend(range(len(leaf_keys)))
+    S = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_aggregates + len(leaf_keys), len(leaf_keys)))
+    return aggregates + leaf_keys, S
+
+
+def aggregate(S, leaf_values):
+    """Sums leaf series into every node of the hierarchy.
+
+    Missing leaf values count as zero, except that a year no leaf observed
+    stays missing.
+
+    Args:
+        S (scipy.sparse matrix): The summation matrix.
+        leaf_values (np.array): Shape (n_leaves, n_years), NaN where not observed.
+
+    Returns:
+        np.array: Shape (n_nodes, n_years).
+    """
+    observed = ~np.isnan(leaf_values)
+    totals = S @ np.nan_to_num(leaf_values)
+    counts = S @ observed.astype(float)
+    return np.where(counts > 0, totals, np.nan)
+
+
+def extend_to_origin(leaf_values):
+    """Forecasts leaves that stop early forward to the last year of the panel.
+
+    A leaf last observed before the final year would count as zero in the
+    aggregates of the years after it, so every node above it would appear to
+    fall just before the forecast starts. Each such leaf is instead extended
+    with its own baseline forecast, so that all nodes share one forecast origin.
+
+    Args:
+        leaf_values (np.array): Shape (n_leaves, n_years), NaN where not observed.
+
+    Returns:
+        np.array: The leaf values, with early-ending leaves filled to the last year.
+    """
+    n_years = leaf_values.shape[1]
+    _, last, n_obs = _valid_bounds(leaf_values)
+    gaps = np.where(n_obs > 0, n_years - 1 - last, 0)
+    stale = np.flatnonzero(gaps)
+    if not len(stale):
+        return leaf_values
+    # Shifted right so every stale leaf ends in the last column, and forecast together.
+    shifted = np.vstack([np.roll(leaf_values[row], gaps[row]) for row in stale])
+    forecasts = forecast_panel(shifted, steps=gaps.max())['mean']
+    extended = leaf_values.copy()
+    for i, row in enumerate(stale):
+        extended[row, n_years - gaps[row]:] = forecasts[i, :gaps[row]]
+    return extended
+
+
+def reconcile(base_forecasts, S, method=HIERARCHY_RECONCILIATION, weights=None):
+    """Makes forecasts for every node add up across the hierarchy.
+
+    - 'bottom_up' sums the leaf forecasts and ignores the aggregate ones.
+    - 'ols' projects all forecasts onto the coherent subspace,
+      S (S'S)^-1 S' y.
+    - 'wls' weights each node by `weights`, defaulting to the number of leaves
+      under it (structural scaling), S (S'W^-1 S)^-1 S'W^-1 y.
+
+    The m x m normal matrix is sparse and factorized once for all horizons.
+
+    Args:
+        base_forecasts (np.array): Shape (n_nodes, steps), in the node order of S.
+        S (scipy.sparse matrix): The summation matrix.
+        method (str): 'bottom_up', 'ols', or 'wls'.
+        weights (np.array, optional): Per-node error variances for 'wls'.
+
+    Returns:
+        np.array: Coherent forecasts of shape (n_nodes, steps).
+    """
+    n_leaves = S.shape[1]
+    if method == 'bottom_up':
+        return S @ base_forecasts[-n_leaves:]
+    if method == 'ols':
+        inverse_weights = sp.identity(S.shape[0], format='csr')
+    elif method == 'wls':
+        weights = np.asarray(S.sum(axis=1)).ravel() if weights is None else np.asarray(weights, dtype=float)
+        inverse_weights = sp.diags(1.0 / weights)
+    else:
+        raise ValueError(f"Unknown reconciliation method '{method}'.")
+
+    weighted_S = (S.T @ inverse_weights).tocsr()
+    solve = factorized((weighted_S @ S).tocsc())
+    rhs = weighted_S @ base_forecasts
+    leaf_forecasts = np.column_stack([solve(rhs[:, step]) for step in range(rhs.shape[1])])
+    return S @ leaf_forecasts
+
+
+def forecast_hierarchy(leaf_series, method=HIERARCHY_RECONCILIATION, steps=FORECAST_STEPS, ancestors_fn=hs_ancestors):
+    """Forecasts every level of the hierarchy above a set of leaf series.
+
+    Leaves that end before the others are first extended to the common
+    forecast origin. The aggregate histories are built from the leaves with S
+    rather than fetched, all nodes are forecast together in one pass of the baseline
+    engine, and the forecasts are reconciled so that World and TOTAL equal
+    the sum of their parts.
+
+    Args:
+        leaf_series (dict): Maps each leaf `SeriesKey` to a pd.Series of values
+                            indexed by year.
+        method (str): The reconciliation method, see `reconcile`.
+        steps (int): The number of years to forecast.
+        ancestors_fn (callable): Returns the product codes above a product code.
+
+    Returns:
+        dict: Maps every node `SeriesKey` to a DataFrame indexed by forecast
+              'Year' with the reconciled 'mean' and the unreconciled 'base'
+              forecast.
+    """
+    keys, years, leaf_values = align_panel(leaf_series)
+    leaf_values = extend_to_origin(leaf_values)
+    nodes, S = build_summation_matrix(keys, ancestors_fn)
+    logging.info(f"Forecasting a hierarchy of {len(nodes)} series from {len(keys)} leaves...")
+
+    history = aggregate(S, leaf_values)
+    base = forecast_panel(history, steps=steps)['mean']
+    coherent = reconcile(base, S, method)
+
+    index = pd.date_range(start=years.max() + pd.DateOffset(years=1), periods=steps, freq='YS', name='Year')
+    return {
+        node: pd.DataFrame({'mean': coherent[row], 'base': base[row]}, index=index)
+        for row, node in enumerate(nodes)
+    }
+
+
+def leaf_series_from_store(store, reporter=None):
+    """Collects the bilateral, product-level series already in the trade store.
+
+    Args:
+        store (TradeStore): The local trade store.
+        reporter (str, optional): Only collect series of this reporter.
+
+    Returns:
+        dict: Maps each leaf `SeriesKey` to a pd.Series of values indexed by year.
+    """
+    leaves = {}
+    for key in store.keys():
+        if reporter is not None and key.reporter != str(reporter):
+            continue
+        if key.partner != HIERARCHY_WORLD_PARTNER and key.product.isdigit():
+            leaves[key] = store.load(key).groupby('Year')['Value'].sum()
+    # A stored product with a more detailed stored product below it is an aggregate, not a leaf.
+    parents = {(key.reporter, key.partner, ancestor) for key in leaves for ancestor in hs_ancestors(key.product)}
+    return {key: series for key, series in leaves.items() if tuple(key) not in parents}
+
+
+if __name__ == "__main__":
+    from src.logging_config import setup_logging
+    from src.trade_store import TradeStore
+    setup_logging()
+    leaves = leaf_series_from_store(TradeStore())
+    if not leaves:
+        print("No bilateral, product-level series in the trade store to aggregate.")
+    else:
+        for node, forecast_df in forecast_hierarchy(leaves).items():
+            if node.partner == HIERARCHY_WORLD_PARTNER and node.product == HIERARCHY_TOTAL_PRODUCT:
+                print(f"{node}:\n{forecast_df}")
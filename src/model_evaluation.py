@@ -6,26 +6,30 @@ import numpy as np
 
 from src.forecasting_script import forecast_sarimax
 from src.advanced_forecasting_script import forecast_lstm
+from src.baseline_forecasting import forecast_baseline
 from src.config import BACKTEST_YEARS
 
-def evaluate_models(enriched_df):
+def evaluate_models(enriched_df, exog_matrix=None):
     """Performs a backtest on forecasting models to evaluate performance.
 
     This function splits the historical data into a training and a testing set.
-    It trains both the SARIMAX and LSTM models on the training set, generates
+    It trains the SARIMAX, LSTM, and baseline models on the training set, generates
     forecasts for the test set period, and then compares these forecasts against
     the actual historical values.
 
     Args:
         enriched_df (pd.DataFrame): The complete, enriched DataFrame with a
                                     'Year' column and all features.
+        exog_matrix (ExogFeatureMatrix, optional): Precomputed exogenous features
+                                                   for the reporter, passed on to
+                                                   every model.
 
     Returns:
         tuple: A tuple containing:
                - dict: A dictionary of evaluation metrics (MAE and RMSE) for
-                       both models.
+                       every model.
                - pd.DataFrame: A DataFrame comparing the actual values to the
-                               forecasts from both models for the test period.
+                               forecasts from every model for the test period.
                Returns None if there is not enough data to perform a backtest.
     """
     logging.info("Starting model evaluation backtest...")
@@ -44,32 +48,42 @@ def evaluate_models(enriched_df):
 
     # --- 2. Evaluate SARIMAX ---
     logging.info("Evaluating SARIMAX model...")
-    sarimax_forecast = forecast_sarimax(train_df)
-    sarimax_pred = sarimax_forecast['mean']
+    sarimax_forecast = forecast_sarimax(train_df, exog_matrix)
+    # The models forecast FORECAST_STEPS years; keep only the backtest years.
+    sarimax_pred = sarimax_forecast['mean'].iloc[:len(actual_values)].set_axis(actual_values.index)
 
     # --- 3. Evaluate LSTM ---
     logging.info("Evaluating LSTM model...")
-    lstm_forecast = forecast_lstm(train_df)
-    lstm_pred = lstm_forecast['mean']
+    lstm_forecast = forecast_lstm(train_df, exog_matrix)
+    lstm_pred = lstm_forecast['mean'].iloc[:len(actual_values)].set_axis(actual_values.index)
 
-    # --- 4. Calculate Metrics ---
+    # --- 4. Evaluate Baseline ---
+    logging.info("Evaluating baseline model...")
+    baseline_forecast = forecast_baseline(train_df, exog_matrix)
+    baseline_pred = baseline_forecast['mean'].iloc[:len(actual_values)].set_axis(actual_values.index)
+
+    # --- 5. Calculate Metrics ---
     metrics = {
         'SARIMAX_MAE': mean_absolute_error(actual_values, sarimax_pred),
         'SARIMAX_RMSE': np.sqrt(mean_squared_error(actual_values, sarimax_pred)),
         'LSTM_MAE': mean_absolute_error(actual_values, lstm_pred),
         'LSTM_RMSE': np.sqrt(mean_squared_error(actual_values, lstm_pred)),
+        'Baseline_MAE': mean_absolute_error(actual_values, baseline_pred),
+        'Baseline_RMSE': np.sqrt(mean_squared_error(actual_values, baseline_pred)),
     }
 
     logging.info(f"Model Evaluation Metrics:\n{metrics}")
     
-    # --- 5. Create a comparison DataFrame ---
+    # --- 6. Create a comparison DataFrame ---
     results_df = pd.DataFrame({
         'Actual': actual_values,
         'SARIMAX_Forecast': sarimax_pred,
-        'LSTM_Forecast': lstm_pred
+        'LSTM_Forecast': lstm_pred,
+        'Baseline_Forecast': baseline_pred,
     })
     results_df['SARIMAX_Error'] = results_df['Actual'] - results_df['SARIMAX_Forecast']
     results_df['LSTM_Error'] = results_df['Actual'] - results_df['LSTM_Forecast']
+    results_df['Baseline_Error'] = results_df['Actual'] - results_df['Baseline_Forecast']
 
     logging.info(f"Backtest Results:\n{results_df}")
 
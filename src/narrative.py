@@ -0,0 +1,168 @@
+import logging
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from src.config import LLM_TIMEOUT_SECONDS, LLM_MAX_QUEUE_DEPTH
+
+# A compound growth rate within this band is described as flat.
+FLAT_GROWTH_BAND = 0.005
+
+
+def _model_errors(backtest_df):
+    """Returns the backtest MAE of each model, keyed by model name."""
+    if backtest_df is None or backtest_df.empty:
+        return {}
+    return {
+        column[:-len('_Error')]: float(np.mean(np.abs(backtest_df[column])))
+        for column in backtest_df.columns if column.endswith('_Error')
+    }
+
+
+def template_narrative(forecast_df, backtest_df):
+    """Writes a rule-based analysis of the forecasts without calling the LLM.
+
+    The narrative names the model with the lowest backtest MAE, then
+    describes that model's forecast by its compound annual growth rate and
+    trend direction, and notes how far the models disagree by the last year.
+
+    Args:
+        forecast_df (pd.DataFrame): Year-indexed forecasts with one
+                                    '<Model>_Forecast' column per model.
+        backtest_df (pd.DataFrame): The backtest results with '<Model>_Error' columns.
+
+    Returns:
+        str: The analysis as Markdown.
+    """
+    # A model whose forecast is entirely missing is left out, so the next best one is described.
+    forecast_columns = [
+        column for column in forecast_df.columns
+        if column.endswith('_Forecast') and forecast_df[column].notna().any()
+    ]
+    if forecast_df.empty or not forecast_columns:
+        return "No forecast is available to analyse."
+
+    errors = {model: mae for model, mae in _model_errors(backtest_df).items() if f"{model}_Forecast" in forecast_columns}
+    lines = []
+    if errors:
+        best = min(errors, key=errors.get)
+        ranking = ', '.join(f"{model} ({mae:,.1f})" for model, mae in sorted(errors.items(), key=lambda item: item[1]))
+        lines.append(f"**Model performance:** {best} had the lowest backtest error (MAE by model: {ranking}).")
+    else:
+        best = forecast_columns[0][:-len('_Forecast')]
+        lines.append(f"**Model performance:** No backtest was available, so the {best} forecast is used.")
+
+    forecast = forecast_df[f"{best}_Forecast"].dropna()
+    years = forecast.index.year if hasattr(forecast.index, 'year') else forecast.index
+    first, last = forecast.iloc[0], forecast.iloc[-1]
+    if len(forecast) > 1 and first > 0 and last > 0:
+        cagr = (last / first) ** (1 / (len(forecast) - 1)) - 1
+        direction = 'flat' if abs(cagr) < FLAT_GROWTH_BAND else ('rising' if cagr > 0 else 'declining')
+        lines.append(
+            f"**Outlook:** The {best} forecast is {direction}, moving from {first:,.1f} in {years[0]} "
+            f"to {last:,.1f} in {years[-1]} (US$ millions), a compound annual growth rate of {cagr:+.1%}."
+        )
+    else:
+        lines.append(f"**Outlook:** The {best} forecast moves from {first:,.1f} in {years[0]} to {last:,.1f} in {years[-1]} (US$ millions).")
+
+    final = forecast_df[forecast_columns].iloc[-1].dropna()
+    if len(final) > 1:
+        spread = (final.max() - final.min()) / abs(final.mean()) if final.mean() else 0.0
+        agreement = 'broadly agree' if spread < 0.1 else 'diverge noticeably'
+        lines.append(f"**Model agreement:** The models {agreement} on {years[-1]}, spanning {final.min():,.1f} to {final.max():,.1f}.")
+
+    lines.append("_Generated from rules while the AI analysis was unavailable._")
+    return '\n\n'.join(lines)
+
+
+class NarrativeGenerator:
+    """Runs LLM generation in the background with a deadline and a queue limit.
+
+    Generations run one at a time on a single worker thread. A request that
+    would queue behind `max_queue_depth` others, or that does not finish
+    within `timeout` seconds, gets the fallback narrative instead. In the
+    timeout case the caller can keep the still-running future to replace the
+    fallback once the LLM text is ready, or have it cancelled.
+
+    `generate_fn` is called as `generate_fn(prompt, stop_event)` and should
+    stop early once the `threading.Event` is set.
+    """
+
+    def __init__(self, generate_fn, timeout=LLM_TIMEOUT_SECONDS, max_queue_depth=LLM_MAX_QUEUE_DEPTH):
+        self.generate_fn = generate_fn
+        self.timeout = timeout
+        self.max_queue_depth = max_queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='llm')
+        self._pending = 0
+        self._stop_events = {}
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self):
+        """The number of generations running or waiting to run."""
+        with self._lock:
+            return self._pending
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending -= 1
+            self._stop_events.pop(future, None)
+
+    def submit(self, prompt):
+        """Queues a generation, or returns None if the LLM is unavailable or the queue is full."""
+        if self.generate_fn is None:
+            return None
+        with self._lock:
+            if self._pending >= self.max_queue_depth:
+                return None
+            self._pending += 1
+        stop_event = threading.Event()
+        future = self._executor.submit(self.generate_fn, prompt, stop_event)
+        with self._lock:
+            if not future.done():
+                self._stop_events[future] = stop_event
+        future.add_done_callback(self._finished)
+        return future
+
+    def cancel(self, future):
+        """Drops a generation nobody will wait for.
+
+        A queued generation is removed from the queue. A running one cannot be
+        interrupted, so it is asked to stop through its stop event and frees
+        the worker once `generate_fn` returns.
+        """
+        if future.cancel():
+            return
+        with self._lock:
+            stop_event = self._stop_events.get(future)
+        if stop_event is not None:
+            stop_event.set()
+
+    def generate(self, prompt, fallback_fn, keep_pending=True):
+        """Returns the LLM text if it arrives in time, and otherwise the fallback.
+
+        Args:
+            prompt (str): The prompt for the LLM.
+            fallback_fn (callable): Builds the fallback narrative; only called when needed.
+            keep_pending (bool): Whether to return a generation that missed the
+                                 deadline; otherwise it is cancelled.
+
+        Returns:
+            tuple: The narrative text, and the pending future when the fallback
+                   was returned because of the deadline and `keep_pending` is
+                   set (otherwise None).
+        """
+        future = self.submit(prompt)
+        if future is None:
+            logging.warning(f"LLM unavailable or queue full ({self.queue_depth} pending); using template narrative.")
+            return fallback_fn(), None
+        try:
+            return future.result(timeout=self.timeout), None
+        except TimeoutError:
+            logging.warning(f"LLM did not respond within {self.timeout}s; using template narrative.")
+            if not keep_pending:
+                self.cancel(future)
+                return fallback_fn(), None
+            return fallback_fn(), future
+        except Exception as e:
+            logging.error(f"LLM generation failed: {e}")
+            return fallback_fn(), None
@@ -2,57 +2,141 @@ import os
 import pandas as pd
 import gradio as gr
 import logging
-from src.comtrade_api import get_comtrade_data
+from collections import namedtuple
+from src.comtrade_api import SeriesKey, get_comtrade_data
+from src.availability_index import availability_index
 from src.data_cleaning_script import clean_and_treat_outliers
 from src.data_integration_script import integrate_external_data
+from src.exog_features import exog_cache
 from src.forecasting_script import forecast_sarimax
 from src.advanced_forecasting_script import forecast_lstm
+from src.baseline_forecasting import forecast_baseline
 from src.model_evaluation import evaluate_models
+from src.scheduler import StageScheduler
+from src.profiling import profile_request
 from src.config import MIN_YEARS_FOR_FORECAST
 
-def run_analysis_pipeline(reporter_id, partner_id, product_id, country_code, progress=gr.Progress()):
+# A partial result from the pipeline: the stage that finished and its output.
+PipelineEvent = namedtuple('PipelineEvent', ['stage', 'data'])
+
+def iter_analysis_pipeline(reporter_id, partner_id, product_id, country_code, progress=gr.Progress(), time_budget=None,
+                           store=None):
     """
-    Runs the full end-to-end analysis pipeline using live API data.
+    Runs the end-to-end analysis pipeline, yielding results as each stage completes.
+
+    With a `store` (TradeStore), a series already in the store is read from
+    it instead of Comtrade, which `refresh_series` keeps up to date, and a
+    newly fetched series is added to it.
+
+    SARIMAX always runs first because it is cheap. When `time_budget` (seconds)
+    is given, the baseline and LSTM forecasts and the backtest only run if
+    their estimated fit time fits in what is left of the budget.
+
+    Yields:
+        PipelineEvent: In order, 'cleaned' with the cleaned history, 'sarimax',
+                       'baseline', and 'lstm' with the combined forecast so far, 'backtest'
+                       with the backtest DataFrame, and finally 'done' with a
+                       tuple of (forecast_df, backtest_df, skipped_stages).
+                       Stages skipped for the budget yield no event of their
+                       own. On failure a single 'error' event carries the
+                       message and the generator stops.
     """
+    scheduler = StageScheduler(time_budget)
+    key = SeriesKey(str(reporter_id), str(partner_id), str(product_id))
     try:
+        # Reject selections the availability index already knows cannot be forecast,
+        # after picking up entries an incremental refresh saved since.
+        availability_index.reload_if_changed()
+        forecastable, reason = availability_index.check(key)
+        if forecastable is False:
+            yield PipelineEvent('error', reason)
+            return
+
         # Step 1: Fetch Data
-        progress(0.1, desc="Step 1/6: Fetching live data...")
-        live_df = get_comtrade_data(reporter_id, partner_id, product_id)
+        if store is not None and store.last_year(key) is not None:
+            progress(0.1, desc="Step 1/6: Loading stored data...")
+            live_df = store.load(key)
+        else:
+            progress(0.1, desc="Step 1/6: Fetching live data...")
+            live_df = get_comtrade_data(reporter_id, partner_id, product_id)
+            if store is not None:
+                store.append(key, live_df)
         if live_df.empty:
-            return None, None, "No data returned from the API. Please try another selection."
+            yield PipelineEvent('error', "No data returned from the API. Please try another selection.")
+            return
+        # Empty responses are not indexed, since they may be transient API failures.
+        if availability_index.update(key, live_df):
+            availability_index.save()
         if len(live_df) < MIN_YEARS_FOR_FORECAST:
-            return None, None, f"Not enough data for a reliable forecast. Found {len(live_df)} years, need {MIN_YEARS_FOR_FORECAST}."
+            yield PipelineEvent('error', f"Not enough data for a reliable forecast. Found {len(live_df)} years, need {MIN_YEARS_FOR_FORECAST}.")
+            return
 
         # Step 2: Clean Data
         progress(0.2, desc="Step 2/6: Cleaning data...")
         cleaned_df = clean_and_treat_outliers(live_df)
+        yield PipelineEvent('cleaned', cleaned_df)
 
         # Step 3: Enrich Data
         progress(0.3, desc="Step 3/6: Enriching data with GDP...")
-        enriched_df = integrate_external_data(cleaned_df, country_code)
+        exog_matrix = exog_cache.get(country_code)
+        if exog_matrix is not None:
+            # The models slice the precomputed features by year; only keep covered years.
+            enriched_df = cleaned_df[exog_matrix.covers(cleaned_df['Year'].dt.year)].copy()
+        else:
+            enriched_df = integrate_external_data(cleaned_df, country_code)
         enriched_df['Year'] = pd.to_datetime(enriched_df['Year'])
+        n_obs = len(enriched_df)
+
+        # Step 4: Generate Future Forecasts, cheapest model first
+        progress(0.4, desc="Step 4/6: Training SARIMAX model...")
+        sarimax_forecast = scheduler.run('sarimax', n_obs, forecast_sarimax, enriched_df, exog_matrix, required=True)
+        combined_df = sarimax_forecast[['mean']].rename(columns={'mean': 'SARIMAX_Forecast'})
+        yield PipelineEvent('sarimax', combined_df.copy())
 
-        # Step 4: Evaluate Models
-        progress(0.5, desc="Step 4/6: Evaluating models...")
-        evaluation_results = evaluate_models(enriched_df)
+        baseline_forecast = scheduler.run('baseline', n_obs, forecast_baseline, enriched_df, exog_matrix)
+        if baseline_forecast is not None:
+            combined_df['Baseline_Forecast'] = baseline_forecast['mean']
+            yield PipelineEvent('baseline', combined_df.copy())
+
+        progress(0.5, desc="Step 5/6: Training LSTM model...")
+        lstm_forecast = scheduler.run('lstm', n_obs, forecast_lstm, enriched_df, exog_matrix)
+        if lstm_forecast is not None:
+            combined_df['LSTM_Forecast'] = lstm_forecast['mean']
+            yield PipelineEvent('lstm', combined_df.copy())
+
+        # Step 5: Evaluate Models
+        progress(0.7, desc="Step 6/6: Evaluating models...")
+        evaluation_results = scheduler.run('backtest', n_obs, evaluate_models, enriched_df, exog_matrix)
         if evaluation_results:
             metrics, backtest_df = evaluation_results
             logging.info(f"Model evaluation metrics: {metrics}")
+            yield PipelineEvent('backtest', backtest_df)
         else:
             backtest_df = pd.DataFrame() # Empty df if no evaluation
 
-        # Step 5: Generate Future Forecasts
-        progress(0.7, desc="Step 5/6: Training SARIMAX model...")
-        sarimax_forecast = forecast_sarimax(enriched_df)
-        progress(0.9, desc="Step 6/6: Training LSTM model...")
-        lstm_forecast = forecast_lstm(enriched_df)
-        
-        combined_df = sarimax_forecast[['mean']].rename(columns={'mean': 'SARIMAX_Forecast'})
-        combined_df['LSTM_Forecast'] = lstm_forecast['mean']
-
+        if scheduler.skipped:
+            logging.info(f"Stages skipped to meet the time budget: {scheduler.skipped}")
         logging.info("Analysis pipeline completed successfully.")
-        return combined_df, backtest_df, None
+        yield PipelineEvent('done', (combined_df, backtest_df, scheduler.skipped))
 
     except Exception as e:
         logging.exception("An error occurred in the pipeline.")
-        return None, None, f"An unexpected error occurred: {e}"
\ No newline at end of file
+        yield PipelineEvent('error', f"An unexpected error occurred: {e}")
+
+@profile_request
+def run_analysis_pipeline(reporter_id, partner_id, product_id, country_code, progress=gr.Progress(), time_budget=None):
+    """
+    Runs the full end-to-end analysis pipeline using live API data.
+
+    Returns:
+        tuple: The combined forecast DataFrame, the backtest DataFrame, an error
+               message (None on success), and the list of stages skipped to
+               meet `time_budget`.
+    """
+    for event in iter_analysis_pipeline(reporter_id, partner_id, product_id, country_code, progress, time_budget):
+        if event.stage == 'error':
+            return None, None, event.data, []
+        if event.stage == 'done':
+            combined_df, backtest_df, skipped_stages = event.data
+            return combined_df, backtest_df, None, skipped_stages
+    return None, None, "The pipeline finished without a result.", []
@@ -0,0 +1,175 @@
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from src.comtrade_api import SeriesKey
+from src.trade_store import series_id, parse_series_id
+from src.config import (
+    POPULARITY_PATH,
+    PREWARM_TOP_N,
+    PREWARM_SEED_KEYS,
+    PREWARM_POPULARITY_DECAY,
+    PREWARM_INTERVAL_SECONDS,
+    PREWARM_REFRESH_AHEAD_SECONDS,
+    PREWARM_MAX_CONCURRENCY,
+)
+
+
+class PopularityTracker:
+    """Counts how often each series is requested, with counts that decay over time.
+
+    Decaying the counts once per prewarm cycle lets the top-N list follow
+    shifts in traffic instead of being dominated by old requests. Seed keys
+    are always prewarmed, whatever their counts. The counts are saved to disk
+    so a fresh deploy knows what to prewarm.
+    """
+
+    def __init__(self, path=POPULARITY_PATH, seed_keys=PREWARM_SEED_KEYS, decay=PREWARM_POPULARITY_DECAY):
+        self.path = path
+        self.decay = decay
+        self.seed_keys = [SeriesKey(*key) for key in seed_keys]
+        self._counts = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self._counts.update({parse_series_id(value): count for value, count in json.load(f).items()})
+
+    def record(self, key):
+        """Counts one request for a series."""
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0.0) + 1.0
+
+    def top(self, n=PREWARM_TOP_N):
+        """Returns the `n` most requested series, most popular first, followed by any seed keys not among them."""
+        with self._lock:
+            ranked = sorted(self._counts, key=self._counts.get, reverse=True)[:n]
+        return ranked + [key for key in self.seed_keys if key not in ranked]
+
+    def age(self):
+        """Applies one step of decay, dropping series that are no longer requested."""
+        with self._lock:
+            self._counts = {key: count * self.decay for key, count in self._counts.items()
+                            if count * self.decay >= 0.01}
+
+    def save(self):
+        """Writes the counts to disk atomically."""
+        if not self.path:
+            return
+        with self._lock:
+            data = {series_id(key): count for key, count in self._counts.items()}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+
+class LiveRequestCounter:
+    """Tracks how many live requests are running a pipeline right now."""
+
+    def __init__(self):
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self):
+        with self._lock:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    @property
+    def idle(self):
+        with self._lock:
+            return self._active == 0
+
+
+class CachePrewarmer:
+    """Refreshes the most popular series before their cached results expire.
+
+    Each cycle picks the top-N series whose cached result is missing or
+    expires within `refresh_ahead` seconds, and reruns the full pipeline for
+    them, which refetches the data, refits the models, and stores a fresh
+    forecast. Idle is checked before every refresh, not only once per
+    cycle, and `refresh_fn` may return False to report that it gave up
+    part-way because live traffic arrived. At most `max_concurrency`
+    refreshes run at once.
+    """
+
+    def __init__(self, refresh_fn, expires_in_fn, popularity, live_requests, top_n=PREWARM_TOP_N,
+                 refresh_ahead=PREWARM_REFRESH_AHEAD_SECONDS, max_concurrency=PREWARM_MAX_CONCURRENCY,
+                 interval=PREWARM_INTERVAL_SECONDS):
+        self.refresh_fn = refresh_fn
+        self.expires_in_fn = expires_in_fn
+        self.popularity = popularity
+        self.live_requests = live_requests
+        self.top_n = top_n
+        self.refresh_ahead = refresh_ahead
+        self.max_concurrency = max_concurrency
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def due_keys(self):
+        """Returns the popular series that are not cached or will expire soon."""
+        due = []
+        for key in self.popularity.top(self.top_n):
+            expires_in = self.expires_in_fn(key)
+            if expires_in is None or expires_in < self.refresh_ahead:
+                due.append(key)
+        return due
+
+    def _refresh(self, key):
+        # Re-check right before starting so a live request arriving mid-cycle wins.
+        if self._stop.is_set() or not self.live_requests.idle:
+            return False
+        try:
+            return self.refresh_fn(key) is not False
+        except Exception as e:
+            logging.error(f"Prewarming {series_id(key)} failed: {e}")
+            return False
+
+    def run_once(self):
+        """Runs one prewarm cycle.
+
+        Returns:
+            int: The number of series refreshed.
+        """
+        if not self.live_requests.idle:
+            logging.info("Skipping prewarm cycle: live requests in flight.")
+            return 0
+        keys = self.due_keys()
+        if not keys:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            refreshed = sum(executor.map(self._refresh, keys))
+        logging.info(f"Prewarmed {refreshed} of {len(keys)} due series.")
+        return refreshed
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                self.popularity.age()
+                self.popularity.save()
+            except Exception:
+                logging.exception("Prewarm cycle failed.")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Starts prewarming in a background daemon thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='cache-prewarmer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the background thread after the current refresh finishes."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,155 @@
+import cProfile
+import contextvars
+import functools
+import glob
+import inspect
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from src.config import (
+    PROFILE_ENABLED,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_DIR,
+    PROFILE_MAX_FILES,
+    PROFILE_TOP_N,
+)
+
+# cProfile supports one active profiler per process, so only one request is
+# profiled at a time; nested or concurrent requests run unprofiled.
+_profile_lock = threading.Lock()
+
+# The id of the request being handled. The API and the UI set it so a profile
+# carries the same id as the request's logs and X-Request-ID header.
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:12]
+
+
+def current_request_id():
+    """Returns the id of the request being handled, or a new id outside of one."""
+    return request_id_var.get() or new_request_id()
+
+
+def hot_functions(profiler, top_n=PROFILE_TOP_N):
+    """Returns the functions with the most own time in a profile.
+
+    Returns:
+        list: Dictionaries with 'function', 'calls', 'tottime', and 'cumtime'.
+    """
+    stats = pstats.Stats(profiler).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:top_n]
+    return [
+        {
+            'function': f"{os.path.basename(filename)}:{line}({name})",
+            'calls': calls,
+            'tottime': round(tottime, 4),
+            'cumtime': round(cumtime, 4),
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in ranked
+    ]
+
+
+def _rotate(directory, max_files):
+    """Deletes the oldest profiles so at most `max_files` remain."""
+    paths = sorted(glob.glob(os.path.join(directory, '*.prof')), key=os.path.getmtime)
+    for path in paths[:max(0, len(paths) - max_files)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _save_profile(profiler, name, request_id, elapsed, directory=None, max_files=None):
+    """Writes a profile to the rotating directory and logs its hot functions."""
+    directory = directory or PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{time.strftime('%Y%m%dT%H%M%S')}_{name}_{request_id}.prof")
+    profiler.dump_stats(path)
+    _rotate(directory, max_files or PROFILE_MAX_FILES)
+
+    logging.info(json.dumps({
+        'event': 'request_profile',
+        'request_id': request_id,
+        'function': name,
+        'elapsed_seconds': round(elapsed, 4),
+        'profile_path': path,
+        'hot_functions': hot_functions(profiler),
+    }))
+    return path
+
+
+def _should_profile(enabled, sample_rate):
+    return enabled or random.random() < sample_rate
+
+
+def profile_request(fn=None, enabled=PROFILE_ENABLED, sample_rate=PROFILE_SAMPLE_RATE):
+    """Decorator that captures a cProfile profile for a sample of calls.
+
+    When profiling is disabled and the sample rate is zero the function is
+    returned unchanged, so there is no overhead at all. Otherwise each call
+    is profiled with probability `sample_rate` (always if `enabled`), the
+    profile is saved with the current request id under `PROFILE_DIR`, and the hot
+    functions are written to the log as one JSON line. Generator functions
+    are profiled across all of their steps.
+
+    Args:
+        fn (callable): The function to wrap.
+        enabled (bool): Profile every call.
+        sample_rate (float): The fraction of calls to profile when not `enabled`.
+    """
+    if fn is None:
+        return functools.partial(profile_request, enabled=enabled, sample_rate=sample_rate)
+    if not enabled and sample_rate <= 0:
+        return fn
+
+    name = fn.__name__
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def generator_wrapper(*args, **kwargs):
+            if not _should_profile(enabled, sample_rate) or not _profile_lock.acquire(blocking=False):
+                yield from fn(*args, **kwargs)
+                return
+            request_id = current_request_id()
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            try:
+                generator = fn(*args, **kwargs)
+                while True:
+                    profiler.enable()
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        return
+                    finally:
+                        profiler.disable()
+                    yield item
+            finally:
+                _save_profile(profiler, name, request_id, time.perf_counter() - start)
+                _profile_lock.release()
+        return generator_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _should_profile(enabled, sample_rate) or not _profile_lock.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        request_id = current_request_id()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.disable()
+        finally:
+            _save_profile(profiler, name, request_id, time.perf_counter() - start)
+            _profile_lock.release()
+    return wrapper
@@ -0,0 +1,224 @@
+import os
+import re
+import json
+import bisect
+import logging
+import requests
+from collections import namedtuple
+from src.config import (
+    REPORTERS_JSON_PATH,
+    COMMODITIES_JSON_PATH,
+    REFERENCE_INDEX_PATH,
+    COMTRADE_REPORTERS_REF_URL,
+    COMTRADE_REPORTERS_REF_PATH,
+    COMTRADE_HS_REF_URL,
+    COMTRADE_HS_REF_PATH,
+    REFERENCE_SEARCH_LIMIT,
+    FALLBACK_COUNTRY_CODE_MAP,
+)
+
+ReferenceEntry = namedtuple('ReferenceEntry', ['id', 'text', 'parent', 'level', 'iso3'])
+
+# Comtrade marks the root of a classification with these parent values.
+_ROOT_PARENTS = (None, '', '#')
+
+
+def _tokens(text):
+    """Splits text into the lowercase words used for prefix search."""
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+
+class ReferenceIndex:
+    """A compact, searchable catalog of reference codes such as reporters or HS codes.
+
+    Entries are kept sorted by code, next to a sorted list of (word, row)
+    pairs, so both code and name prefix searches are a binary search over
+    sorted lists rather than a scan of the whole catalog. Parent links give
+    HS-hierarchy lookups.
+    """
+
+    def __init__(self, entries, tokens=None):
+        self.entries = sorted(entries, key=lambda entry: entry.id)
+        self._codes = [entry.id for entry in self.entries]
+        self._by_id = {entry.id: entry for entry in self.entries}
+        if tokens is None:
+            tokens = sorted((word, row) for row, entry in enumerate(self.entries) for word in set(_tokens(entry.text)))
+        self._token_words = [word for word, _ in tokens]
+        self._token_rows = [row for _, row in tokens]
+        self._children = {}
+        for entry in self.entries:
+            if entry.parent not in _ROOT_PARENTS:
+                self._children.setdefault(entry.parent, []).append(entry)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, code):
+        """Returns the entry for a code, or None if it is not in the catalog."""
+        return self._by_id.get(str(code))
+
+    def _code_prefix_rows(self, prefix):
+        start = bisect.bisect_left(self._codes, prefix)
+        end = bisect.bisect_left(self._codes, prefix + '\uffff')
+        return range(start, end)
+
+    def _word_prefix_rows(self, prefix):
+        start = bisect.bisect_left(self._token_words, prefix)
+        end = bisect.bisect_left(self._token_words, prefix + '\uffff')
+        return set(self._token_rows[start:end])
+
+    def search(self, query, limit=REFERENCE_SEARCH_LIMIT):
+        """Finds entries whose code starts with the query, or whose name has
+        a word starting with each word of the query.
+
+        Code matches come first, then name matches ordered from the broadest
+        level of the hierarchy down.
+
+        Returns:
+            list: Up to `limit` matching `ReferenceEntry` tuples.
+        """
+        query = query.strip()
+        if not query:
+            return self.entries[:limit]
+
+        code_rows = list(self._code_prefix_rows(query.upper()))
+        words = _tokens(query)
+        name_rows = set.intersection(*(self._word_prefix_rows(word) for word in words)) if words else set()
+        name_rows = sorted(name_rows - set(code_rows), key=lambda row: (self.entries[row].level, row))
+        return [self.entries[row] for row in (code_rows + name_rows)[:limit]]
+
+    def children(self, code):
+        """Returns the entries directly below a code in the hierarchy."""
+        return list(self._children.get(str(code), []))
+
+    def ancestors(self, code):
+        """Returns the chain of parents of a code, nearest first."""
+        chain = []
+        entry = self.get(code)
+        while entry is not None and entry.parent not in _ROOT_PARENTS:
+            entry = self.get(entry.parent)
+            if entry is None or entry in chain:
+                break
+            chain.append(entry)
+        return chain
+
+    def choices(self, max_level=None, sort_by_text=False):
+        """Returns (text, id) dropdown choices, optionally limited to the top levels."""
+        entries = [entry for entry in self.entries if max_level is None or entry.level <= max_level]
+        if sort_by_text:
+            entries = sorted(entries, key=lambda entry: entry.text)
+        return [(entry.text, entry.id) for entry in entries]
+
+    def iso3_map(self):
+        """Returns a mapping of code to ISO 3-letter code for entries that have one."""
+        return {entry.id: entry.iso3 for entry in self.entries if entry.iso3}
+
+    def to_dict(self):
+        return {
+            'entries': [list(entry) for entry in self.entries],
+            'tokens': [[word, row] for word, row in zip(self._token_words, self._token_rows)],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([ReferenceEntry(*entry) for entry in data['entries']], [tuple(pair) for pair in data['tokens']])
+
+
+def _read_rows(path):
+    """Reads a reference file, either a Comtrade `{"results": [...]}` file or a plain list."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['results'] if isinstance(data, dict) else data
+
+
+def _area_code(code):
+    code = str(code).strip()
+    return str(int(code)) if code.isdigit() else code
+
+
+def reporter_entries(path):
+    """Reads reporter entries from a Comtrade Reporters.json or the local reporters.json."""
+    return [
+        ReferenceEntry(_area_code(row['id']), row['text'], None, 0, row.get('reporterCodeIsoAlpha3'))
+        for row in _read_rows(path)
+    ]
+
+
+def commodity_entries(path):
+    """Reads HS entries from a Comtrade HS.json or the local commodities.json."""
+    entries = []
+    for row in _read_rows(path):
+        code = str(row['id'])
+        level = row.get('aggrLevel', len(code) if code.isdigit() else 0)
+        entries.append(ReferenceEntry(code, row['text'], row.get('parent'), int(level), None))
+    return entries
+
+
+def download_reference_files():
+    """Downloads the full Comtrade reporter and HS catalogs if they are not present."""
+    for url, path in ((COMTRADE_REPORTERS_REF_URL, COMTRADE_REPORTERS_REF_PATH),
+                      (COMTRADE_HS_REF_URL, COMTRADE_HS_REF_PATH)):
+        if os.path.exists(path):
+            continue
+        try:
+            response = requests.get(url, timeout=60)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logging.warning(f"Could not download {url}: {e}")
+            continue
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        logging.info(f"Downloaded {url} to {path}.")
+
+
+def build_reference_indexes(reporters_path=COMTRADE_REPORTERS_REF_PATH, hs_path=COMTRADE_HS_REF_PATH):
+    """Builds the reporter and commodity indexes, preferring the full Comtrade catalogs.
+
+    Any catalog that has not been downloaded falls back to the small local
+    list the dropdowns used before.
+
+    Returns:
+        tuple: (reporter ReferenceIndex, commodity ReferenceIndex)
+    """
+    if not os.path.exists(reporters_path):
+        reporters_path = REPORTERS_JSON_PATH
+    if not os.path.exists(hs_path):
+        hs_path = COMMODITIES_JSON_PATH
+    reporters = ReferenceIndex(reporter_entries(reporters_path))
+    commodities = ReferenceIndex(commodity_entries(hs_path))
+    logging.info(f"Built reference indexes: {len(reporters)} reporters from {reporters_path}, "
+                 f"{len(commodities)} commodities from {hs_path}.")
+    return reporters, commodities
+
+
+def save_reference_indexes(reporters, commodities, path=REFERENCE_INDEX_PATH):
+    """Writes both indexes to one JSON file atomically."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'reporters': reporters.to_dict(), 'commodities': commodities.to_dict()}, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def load_reference_indexes(path=REFERENCE_INDEX_PATH):
+    """Loads the prebuilt indexes, building them from the available files if none exist."""
+    if not os.path.exists(path):
+        return build_reference_indexes()
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    reporters, commodities = ReferenceIndex.from_dict(data['reporters']), ReferenceIndex.from_dict(data['commodities'])
+    logging.info(f"Loaded reference indexes with {len(reporters)} reporters and {len(commodities)} commodities.")
+    return reporters, commodities
+
+
+# Loaded once at startup and shared by the UI and the API.
+reporter_index, commodity_index = load_reference_indexes()
+COUNTRY_CODE_MAP = {**FALLBACK_COUNTRY_CODE_MAP, **reporter_index.iso3_map()}
+
+
+if __name__ == "__main__":
+    from src.logging_config import setup_logging
+    setup_logging()
+    download_reference_files()
+    reporters, commodities = build_reference_indexes()
+    save_reference_indexes(reporters, commodities)
+    print(f"Reference index saved with {len(reporters)} reporters and {len(commodities)} commodities to {REFERENCE_INDEX_PATH}")
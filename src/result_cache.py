@@ -0,0 +1,51 @@
+import threading
+import time
+from collections import OrderedDict
+from src.config import API_CACHE_TTL_SECONDS, API_CACHE_MAX_ENTRIES
+
+
+class ResultCache:
+    """A thread-safe, size-bounded cache of pipeline results with a time-to-live.
+
+    Entries expire `ttl` seconds after they are stored, and the least recently
+    used entry is evicted once `max_entries` is reached.
+    """
+
+    def __init__(self, ttl=API_CACHE_TTL_SECONDS, max_entries=API_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Stores `value` under `key`, evicting the oldest entry if the cache is full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def expires_in(self, key):
+        """Returns the seconds until `key` expires, or None if it is not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return max(0.0, entry[0] - time.monotonic())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
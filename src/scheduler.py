@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+from src.config import STAGE_TIME_PRIORS, FIT_TIME_EWMA_ALPHA, FIT_TIME_LENGTH_BUCKET
+
+
+class FitTimeHistory:
+    """Tracks observed stage durations by series length to predict future costs.
+
+    Durations are kept as an exponentially weighted moving average per stage
+    and series-length bucket. A stage with no history in a bucket is estimated
+    from the nearest timed bucket, scaled by series length, and falls back to
+    the configured per-observation prior if it has never been timed.
+    """
+
+    def __init__(self, priors=STAGE_TIME_PRIORS, alpha=FIT_TIME_EWMA_ALPHA, bucket_size=FIT_TIME_LENGTH_BUCKET):
+        self.priors = priors
+        self.alpha = alpha
+        self.bucket_size = bucket_size
+        self._history = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, n_obs):
+        return n_obs // self.bucket_size
+
+    def record(self, stage, n_obs, seconds):
+        """Records how long a stage took for a series of `n_obs` observations."""
+        key = (stage, self._bucket(n_obs))
+        with self._lock:
+            previous = self._history.get(key)
+            self._history[key] = seconds if previous is None else self.alpha * seconds + (1 - self.alpha) * previous
+
+    def estimate(self, stage, n_obs):
+        """Returns the expected duration in seconds of a stage for `n_obs` observations."""
+        bucket = self._bucket(n_obs)
+        with self._lock:
+            if (stage, bucket) in self._history:
+                return self._history[(stage, bucket)]
+            timed = [b for (s, b) in self._history if s == stage]
+            if timed:
+                nearest = min(timed, key=lambda b: abs(b - bucket))
+                scale = (bucket + 0.5) / (nearest + 0.5)
+                return self._history[(stage, nearest)] * scale
+        return self.priors.get(stage, 0.0) * n_obs
+
+
+# Shared so every request learns from the fit times observed by earlier ones.
+fit_time_history = FitTimeHistory()
+
+
+class StageScheduler:
+    """Runs pipeline stages within a per-request time budget.
+
+    Before each optional stage the scheduler compares its estimated duration
+    against the remaining budget and skips it if it would not fit. Stage
+    durations are fed back into the fit-time history.
+    """
+
+    def __init__(self, budget_seconds=None, history=None):
+        self.budget_seconds = budget_seconds
+        self.history = history or fit_time_history
+        self.started = time.monotonic()
+        self.skipped = []
+
+    def remaining(self):
+        """Returns the seconds left in the budget, or None if there is no budget."""
+        if self.budget_seconds is None:
+            return None
+        return self.budget_seconds - (time.monotonic() - self.started)
+
+    def fits(self, stage, n_obs):
+        """Returns True if the stage is expected to finish within the remaining budget."""
+        remaining = self.remaining()
+        return remaining is None or self.history.estimate(stage, n_obs) <= remaining
+
+    def run(self, stage, n_obs, fn, *args, required=False, **kwargs):
+        """Runs `fn` as the named stage unless it would exceed the budget.
+
+        Args:
+            stage (str): The stage name, used for fit-time history.
+            n_obs (int): The number of observations in the series.
+            fn (callable): The stage function.
+            required (bool): If True, the stage always runs.
+
+        Returns:
+            The result of `fn`, or None if the stage was skipped.
+        """
+        if not required and not self.fits(stage, n_obs):
+            estimate = self.history.estimate(stage, n_obs)
+            logging.warning(f"Skipping stage '{stage}': estimated {estimate:.1f}s exceeds remaining budget of {self.remaining():.1f}s.")
+            self.skipped.append(stage)
+            return None
+
+        start = time.monotonic()
+        result = fn(*args, **kwargs)
+        self.history.record(stage, n_obs, time.monotonic() - start)
+        return result
@@ -0,0 +1,182 @@
+import uuid
+import logging
+import multiprocessing
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from src.exog_features import ExogFeatureMatrix
+from src.baseline_forecasting import align_panel
+from src.config import (
+    SHARED_MEMORY_PREFIX,
+    SHARED_POOL_WORKERS,
+)
+
+# Describes a published array; small enough to send to a worker with every task.
+SharedArray = namedtuple('SharedArray', ['name', 'shape', 'dtype'])
+SharedExog = namedtuple('SharedExog', ['array', 'first_year', 'features'])
+SharedPanel = namedtuple('SharedPanel', ['array', 'keys', 'first_year'])
+
+# Shared memory blocks this process has attached to, kept open so their views stay valid.
+_attached = {}
+# Row of each series key and the years of the columns, per published panel.
+_panel_layouts = {}
+# The handles given to this worker process by `init_worker`.
+_worker_handles = {}
+
+
+def attach_array(handle):
+    """Returns a read-only view of a published array without copying it.
+
+    The first call for a block in a process maps it; later calls reuse the mapping.
+    """
+    block = _attached.get(handle.name)
+    if block is None:
+        block = shared_memory.SharedMemory(name=handle.name)
+        _attached[handle.name] = block
+    array = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=block.buf)
+    array.flags.writeable = False
+    return array
+
+
+class SharedDataPlane:
+    """Publishes the read-only inputs of pipeline workers in named shared memory.
+
+    The exogenous feature matrix of each reporter and the panel of trade
+    series are copied once into shared memory blocks. Tasks sent to a process
+    pool then carry only a series key and a country code, and each worker maps
+    the blocks on first use instead of unpickling DataFrames for every task.
+
+    The plane owns the blocks: `close` unlinks them, so it must outlive the
+    pools that use it. It can be used as a context manager.
+    """
+
+    def __init__(self, prefix=SHARED_MEMORY_PREFIX):
+        self.prefix = prefix
+        self.handles = {}
+        self._blocks = []
+
+    def publish_array(self, array):
+        """Copies an array into a new shared memory block and returns its handle."""
+        array = np.ascontiguousarray(array)
+        name = f"{self.prefix}_{uuid.uuid4().hex[:12]}"
+        block = shared_memory.SharedMemory(name=name, create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        self._blocks.append(block)
+        return SharedArray(name, array.shape, array.dtype.str)
+
+    def publish_exog(self, country_code, matrix):
+        """Publishes a reporter's exogenous feature matrix under its country code."""
+        handle = SharedExog(self.publish_array(matrix.values), matrix.first_year, tuple(matrix.features))
+        self.handles[('exog', country_code)] = handle
+        return handle
+
+    def publish_panel(self, series_by_key):
+        """Publishes yearly series as one NaN-padded panel, one row per key.
+
+        Args:
+            series_by_key (dict): Maps each key to a pd.Series of values indexed by year.
+        """
+        keys, years, values = align_panel(series_by_key)
+        handle = SharedPanel(self.publish_array(values), tuple(keys), int(years[0].year))
+        self.handles['panel'] = handle
+        logging.info(f"Published {len(keys)} series x {len(years)} years ({values.nbytes:,} bytes) to shared memory.")
+        return handle
+
+    def executor(self, max_workers=SHARED_POOL_WORKERS):
+        """Returns a process pool whose workers can attach to everything published so far."""
+        # Spawned rather than forked so each worker initializes TensorFlow cleanly.
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(self.handles,),
+        )
+
+    def close(self):
+        """Releases and unlinks every published block."""
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+        self.handles = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def init_worker(handles):
+    """Process pool initializer that records the published handles for `shared_exog` and `shared_series`."""
+    _worker_handles.clear()
+    _worker_handles.update(handles)
+
+
+def shared_exog(country_code, handles=None):
+    """Returns a reporter's published feature matrix as a zero-copy view, or None if not published."""
+    handle = (handles or _worker_handles).get(('exog', country_code))
+    if handle is None:
+        return None
+    return ExogFeatureMatrix(handle.first_year, handle.features, attach_array(handle.array))
+
+
+def shared_series(key, handles=None):
+    """Returns a published series as a DataFrame with 'Year' and 'Value' columns.
+
+    The series runs from its first to its last observation and its values are
+    a read-only view of the panel. The models cannot fit across missing years,
+    so a series with gaps inside it is returned as a copy with the gaps
+    filled by linear interpolation.
+
+    Raises:
+        KeyError: If the series is not in the published panel.
+    """
+    handle = (handles or _worker_handles)['panel']
+    layout = _panel_layouts.get(handle.array.name)
+    if layout is None:
+        rows = {key: row for row, key in enumerate(handle.keys)}
+        years = pd.date_range(start=str(handle.first_year), periods=handle.array.shape[1], freq='YS', name='Year')
+        layout = _panel_layouts[handle.array.name] = (rows, years)
+    rows, years = layout
+    values = attach_array(handle.array)[rows[key]]
+    observed = ~np.isnan(values)
+    first, last = observed.argmax(), len(values) - observed[::-1].argmax()
+    values, years = values[first:last], years[first:last]
+    if not observed[first:last].all():
+        logging.warning(f"Interpolating {(~observed[first:last]).sum()} missing year(s) inside series {key}.")
+        values = pd.Series(values).interpolate().values
+    return pd.DataFrame({'Year': years, 'Value': values}, copy=False)
+
+
+def run_model(model, key, country_code):
+    """Runs one model for one published series; the task function for `SharedDataPlane.executor`.
+
+    Args:
+        model (str): 'sarimax', 'lstm', 'baseline', or 'backtest'.
+        key: The series key the panel was published with.
+        country_code (str): The reporter's ISO 3-letter country code.
+
+    Returns:
+        The result of the model function, as in the pipeline.
+
+    Raises:
+        KeyError: If the series or the reporter's features were not published.
+    """
+    # Imported here so workers only load the model libraries they need.
+    if model == 'sarimax':
+        from src.forecasting_script import forecast_sarimax as model_fn
+    elif model == 'lstm':
+        from src.advanced_forecasting_script import forecast_lstm as model_fn
+    elif model == 'baseline':
+        from src.baseline_forecasting import forecast_baseline as model_fn
+    elif model == 'backtest':
+        from src.model_evaluation import evaluate_models as model_fn
+    else:
+        raise ValueError(f"Unknown model '{model}'.")
+    exog_matrix = shared_exog(country_code)
+    if exog_matrix is None:
+        raise KeyError(f"No exogenous features published for {country_code}.")
+    return model_fn(shared_series(key), exog_matrix)
@@ -0,0 +1,236 @@
+import pandas as pd
+import os
+import json
+import logging
+import threading
+import datetime
+from collections import defaultdict
+from src.comtrade_api import SeriesKey, get_comtrade_data
+from src.comtrade_query_planner import fetch_series_bulk
+from src.config import TRADE_STORE_DIR, STALE_ARTIFACTS
+
+
+def series_id(key):
+    """Returns the string used to identify a series in the store manifest."""
+    return '|'.join(map(str, key))
+
+
+def parse_series_id(value):
+    """Converts a manifest series id back into a `SeriesKey`."""
+    return SeriesKey(*value.split('|'))
+
+
+class TradeStore:
+    """A local store of trade series with a manifest of what each series holds.
+
+    Each series is kept as a CSV in the `get_comtrade_data` schema. The
+    manifest records the last stored year per series, which lets a refresh
+    fetch only newer periods, and which derived artifacts (forecasts,
+    backtests, fitted models) are stale because new data arrived. The last
+    complete result computed from each series is kept next to it as JSON.
+    """
+
+    def __init__(self, root=TRADE_STORE_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self._lock = threading.RLock()
+        os.makedirs(os.path.join(root, 'series'), exist_ok=True)
+        os.makedirs(os.path.join(root, 'results'), exist_ok=True)
+        self._manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'series': {}}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _entry(self, key):
+        return self._manifest['series'].get(series_id(key))
+
+    def series_path(self, key):
+        """Returns the CSV path for a series."""
+        return os.path.join(self.root, 'series', f"{'_'.join(map(str, key))}.csv")
+
+    def result_path(self, key):
+        """Returns the JSON path for the last result computed from a series."""
+        return os.path.join(self.root, 'results', f"{'_'.join(map(str, key))}.json")
+
+    def keys(self):
+        """Returns the `SeriesKey` of every series in the store."""
+        with self._lock:
+            return [parse_series_id(value) for value in self._manifest['series']]
+
+    def load(self, key):
+        """Loads a stored series, or an empty DataFrame if it is not stored."""
+        path = self.series_path(key)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        return pd.read_csv(path, dtype={'Reporter': str, 'Partner': str, 'Product': str})
+
+    def last_year(self, key):
+        """Returns the last stored year for a series, or None if it is not stored."""
+        with self._lock:
+            entry = self._entry(key)
+            return entry['last_year'] if entry else None
+
+    def append(self, key, new_df):
+        """Appends newly fetched rows for a series, ignoring years already stored.
+
+        Any new rows mark the series' derived artifacts as stale.
+
+        Args:
+            key (SeriesKey): The series to append to.
+            new_df (pd.DataFrame): Rows in the `get_comtrade_data` schema.
+
+        Returns:
+            int: The number of rows appended.
+        """
+        if new_df.empty:
+            return 0
+
+        with self._lock:
+            new_df = new_df.copy()
+            new_df['Year'] = new_df['Year'].astype(int)
+            last_year = self.last_year(key)
+            if last_year is not None:
+                new_df = new_df[new_df['Year'] > last_year]
+            if new_df.empty:
+                return 0
+
+            path = self.series_path(key)
+            new_df.sort_values('Year').to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+            entry = self._manifest['series'].setdefault(series_id(key), {'rows': 0, 'stale': []})
+            entry['last_year'] = int(new_df['Year'].max())
+            entry['rows'] += len(new_df)
+            entry['updated'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            entry['stale'] = sorted(set(entry['stale']) | set(STALE_ARTIFACTS))
+            self._write_manifest()
+
+        logging.info(f"Appended {len(new_df)} new row(s) for series {series_id(key)}.")
+        return len(new_df)
+
+    def is_stale(self, key, artifact):
+        """Returns True if an artifact of a series must be recomputed."""
+        with self._lock:
+            entry = self._entry(key)
+            return entry is None or artifact in entry['stale']
+
+    def mark_fresh(self, key, *artifacts):
+        """Records that artifacts of a series have been recomputed, by default all of them."""
+        artifacts = set(artifacts or STALE_ARTIFACTS)
+        with self._lock:
+            entry = self._entry(key)
+            if entry and artifacts & set(entry['stale']):
+                entry['stale'] = [artifact for artifact in entry['stale'] if artifact not in artifacts]
+                self._write_manifest()
+
+    def save_result(self, key, result):
+        """Stores the result recomputed from a stored series and marks its artifacts fresh.
+
+        Args:
+            key (SeriesKey): The series the result was computed from.
+            result (dict): The JSON-ready forecast and backtest.
+        """
+        if self.last_year(key) is None:
+            return
+        path = self.result_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+        self.mark_fresh(key)
+
+    def fresh_result(self, key):
+        """Returns the stored result of a series, or None if it is missing or any artifact is stale."""
+        with self._lock:
+            entry = self._entry(key)
+            if entry is None or entry['stale']:
+                return None
+        try:
+            with open(self.result_path(key), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def stale_series(self, artifact):
+        """Returns the keys of every series whose artifact is stale."""
+        with self._lock:
+            return [parse_series_id(value) for value, entry in self._manifest['series'].items()
+                    if artifact in entry['stale']]
+
+
+def pending_period(last_year, current_year=None):
+    """Returns the Comtrade period string covering the years after `last_year`.
+
+    Annual data for the current year is never complete, so the range stops at
+    the previous year. Returns None if nothing newer can exist yet, and
+    'recent' if the series has no stored history.
+    """
+    if last_year is None:
+        return 'recent'
+    current_year = current_year or datetime.date.today().year
+    years = range(last_year + 1, current_year)
+    return ','.join(str(year) for year in years) or None
+
+
+def refresh_series(store, keys=None, fetch_raw=None, fetch_fn=get_comtrade_data, current_year=None, index=None):
+    """Fetches only the periods newer than each series' last stored year.
+
+    Series needing the same periods are fetched together with the bulk query
+    planner when `fetch_raw` is given, otherwise one call is made per series
+    through `fetch_fn`. Only series that receive new rows are marked stale.
+
+    Args:
+        store (TradeStore): The store to refresh.
+        keys (iterable, optional): The series to refresh. Defaults to every
+                                   series already in the store.
+        fetch_raw (callable, optional): A function with the signature of
+                                        `ComtradeClient.fetch_raw` for bulk fetching.
+        fetch_fn (callable): A function with the signature of `get_comtrade_data`.
+        current_year (int, optional): Overrides the current calendar year.
+        index (AvailabilityIndex, optional): An availability index to update for
+                                             every series that received new rows.
+
+    Returns:
+        dict: A mapping of each refreshed `SeriesKey` to the number of rows appended.
+    """
+    keys = store.keys() if keys is None else [SeriesKey(*map(str, key)) for key in keys]
+
+    keys_by_period = defaultdict(list)
+    for key in keys:
+        period = pending_period(store.last_year(key), current_year)
+        if period:
+            keys_by_period[period].append(key)
+
+    appended = {}
+    for period, period_keys in keys_by_period.items():
+        logging.info(f"Refreshing {len(period_keys)} series for period '{period}'...")
+        if fetch_raw is not None:
+            frames, _ = fetch_series_bulk(period_keys, fetch_raw, period=period)
+        else:
+            frames = {key: fetch_fn(*key, period=period) for key in period_keys}
+        for key, df in frames.items():
+            appended[key] = store.append(key, df)
+            if index is not None and (appended[key] or store.last_year(key) is None):
+                index.update(key, store.load(key))
+
+    updated = sum(1 for rows in appended.values() if rows)
+    logging.info(f"Incremental refresh complete: {updated} of {len(keys)} series received new data.")
+    return appended
+
+
+if __name__ == "__main__":
+    from src.logging_config import setup_logging
+    setup_logging()
+    from src.availability_index import availability_index
+    store = TradeStore()
+    refresh_series(store, index=availability_index)
+    availability_index.save()
+    print(f"Series to recompute on their next request: {store.stale_series('forecast')}")
@@ -0,0 +1,119 @@
+import unittest
+from unittest.mock import patch
+import gzip
+import tempfile
+import json
+import pandas as pd
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import api
+from src.trade_store import TradeStore
+from src.pipeline import PipelineEvent
+
+def fake_pipeline(reporter_id, partner_id, product_id, country_code, progress, time_budget=None, store=None):
+    """Yields a small history and forecast frame in the pipeline's event format."""
+    history_df = pd.DataFrame({'Year': pd.date_range(start='2013', periods=10, freq='YS'), 'Value': range(10)})
+    yield PipelineEvent('cleaned', history_df)
+    years = pd.date_range(start='2023', periods=5, freq='YS', name='Year')
+    forecast_df = pd.DataFrame({'SARIMAX_Forecast': range(5), 'LSTM_Forecast': range(5)}, index=years)
+    skipped = ['lstm', 'backtest'] if time_budget is not None else []
+    yield PipelineEvent('done', (forecast_df, pd.DataFrame(), skipped))
+
+class TestApi(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a test client with an empty result cache and trade store."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.store = TradeStore(tmp_dir.name)
+        for patcher in (patch.object(api, 'result_cache', api.ResultCache()), patch.object(api, 'trade_store', self.store)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = api.create_app().test_client()
+
+    @patch('src.api.iter_analysis_pipeline', side_effect=fake_pipeline)
+    def test_forecast_returns_json(self, mock_pipeline):
+        """Test that a single forecast is returned as JSON records."""
+        response = self.client.get('/api/forecast?reporter=842&partner=0&product=87')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(len(data['forecast']), 5)
+        self.assertEqual(data['forecast'][0]['Year'], 2023)
+        self.assertEqual(len(data['history']), 10)
+        self.assertIsNone(data['error'])
+
+    @patch('src.api.iter_analysis_pipeline', side_effect=fake_pipeline)
+    def test_stream_caches_when_done(self, mock_pipeline):
+        """Test that a caller stopping at 'done', like the UI, still fills the cache."""
+        key = api.SeriesKey('842', '0', '87')
+        for event in api.stream_forecast(key):
+            if event.stage == 'done':
+                break
+        cached = api.result_cache.get(key)
+        self.assertEqual(len(cached['forecast']), 5)
+        forecast_df = api.records_to_frame(cached['forecast'])
+        self.assertEqual(forecast_df.index[0], pd.Timestamp('2023-01-01'))
+
+    @patch('src.api.iter_analysis_pipeline', side_effect=fake_pipeline)
+    def test_fresh_stored_result_is_not_recomputed(self, mock_pipeline):
+        """Test that a stored series is only recomputed after new data arrives for it."""
+        key = api.SeriesKey('842', '0', '87')
+        self.store.append(key, pd.DataFrame({'Year': range(2013, 2023), 'Value': range(10)}))
+        api.compute_forecast(key)
+        self.assertFalse(self.store.is_stale(key, 'forecast'))
+
+        events = [event.stage for event in api.stream_forecast(key)]
+        self.assertEqual(events, ['cleaned', 'done', 'result'])
+        self.assertEqual(len(api.compute_forecast(key)['history']), 10)
+        self.assertEqual(mock_pipeline.call_count, 1)
+
+        self.store.append(key, pd.DataFrame({'Year': [2023], 'Value': [10]}))
+        api.compute_forecast(key)
+        self.assertEqual(mock_pipeline.call_count, 2)
+        self.assertIs(mock_pipeline.call_args.kwargs['store'], self.store)
+
+    @patch('src.api.iter_analysis_pipeline', side_effect=fake_pipeline)
+    def test_forecast_is_cached(self, mock_pipeline):
+        """Test that repeated requests reuse the cached result."""
+        self.client.get('/api/forecast?reporter=842&partner=0&product=87')
+        self.client.get('/api/forecast?reporter=842&partner=0&product=87')
+        self.assertEqual(mock_pipeline.call_count, 1)
+
+    @patch('src.api.iter_analysis_pipeline', side_effect=fake_pipeline)
+    def test_budgeted_forecast_reports_skipped_stages(self, mock_pipeline):
+        """Test that stages skipped for the time budget are reported and not cached."""
+        response = self.client.get('/api/forecast?reporter=842&partner=0&product=87&budget=1')
+        self.assertEqual(response.get_json()['skipped_stages'], ['lstm', 'backtest'])
+        self.client.get('/api/forecast?reporter=842&partner=0&product=87&budget=1')
+        self.assertEqual(mock_pipeline.call_count, 2)
+
+    @patch('src.api.iter_analysis_pipeline', side_effect=fake_pipeline)
+    def test_conditional_get(self, mock_pipeline):
+        """Test that a matching If-None-Match header yields 304 Not Modified."""
+        first = self.client.get('/api/forecast?reporter=842&partner=0&product=87')
+        etag = first.headers['ETag']
+        second = self.client.get('/api/forecast?reporter=842&partner=0&product=87', headers={'If-None-Match': etag})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.get_data(), b'')
+
+    @patch('src.api.iter_analysis_pipeline', side_effect=fake_pipeline)
+    def test_batch_is_gzipped(self, mock_pipeline):
+        """Test the batch endpoint and gzip content encoding."""
+        series = [{'reporter': r, 'partner': '0', 'product': '87'} for r in ('842', '156', '276')]
+        response = self.client.post('/api/forecast/batch', json={'series': series}, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.get_data()))
+        self.assertEqual([r['reporter'] for r in data['results']], ['842', '156', '276'])
+        self.assertEqual(mock_pipeline.call_count, 3)
+
+    def test_batch_rejects_incomplete_keys(self):
+        """Test that a batch with a missing field is rejected."""
+        response = self.client.post('/api/forecast/batch', json={'series': [{'reporter': '842'}]})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import tempfile
+import pandas as pd
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.comtrade_api import SeriesKey
+from src.availability_index import AvailabilityIndex, build_from_bulk
+
+class TestAvailabilityIndex(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary directory and an empty index."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index = AvailabilityIndex(path=os.path.join(self.tmp_dir.name, 'index.json'))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_check_unknown_short_and_long_series(self):
+        """Test the verdict for unknown, too short, and forecastable series."""
+        short_key, long_key = SeriesKey('842', '0', 'AG2'), SeriesKey('842', '0', '87')
+        self.index.update(short_key, pd.DataFrame({'Year': range(2015, 2020)}))
+        self.index.update(long_key, pd.DataFrame({'Year': range(2000, 2020)}))
+
+        self.assertEqual(self.index.check(SeriesKey('1', '2', '3')), (None, None))
+        forecastable, reason = self.index.check(short_key)
+        self.assertFalse(forecastable)
+        self.assertIn('Found 5 years', reason)
+        self.assertEqual(self.index.check(long_key), (True, None))
+        self.assertTrue(self.index.is_forecastable(SeriesKey('1', '2', '3')))
+
+    def test_save_and_load(self):
+        """Test that the index round-trips through its JSON file."""
+        key = SeriesKey('842', '0', '87')
+        self.index.update(key, pd.DataFrame({'Year': [2020, 2021, 2021]}))
+        self.index.save()
+        loaded = AvailabilityIndex.load(self.index.path)
+        self.assertEqual(loaded.get(key), (2020, 2021, 2, 3))
+
+    def test_reload_if_changed(self):
+        """Test that entries saved by another process are merged in, and unchanged files are not reread."""
+        key = SeriesKey('842', '0', '87')
+        self.assertFalse(self.index.reload_if_changed())
+        self.assertTrue(self.index.update(key, pd.DataFrame({'Year': range(2015, 2020)})))
+        self.assertFalse(self.index.update(key, pd.DataFrame({'Year': range(2015, 2020)})))
+        self.index.save()
+        self.assertFalse(self.index.reload_if_changed())
+
+        other = AvailabilityIndex.load(self.index.path)
+        other.update(key, pd.DataFrame({'Year': range(2000, 2020)}))
+        other.save()
+        os.utime(self.index.path, (os.path.getmtime(self.index.path) + 1,) * 2)
+        self.assertTrue(self.index.reload_if_changed())
+        self.assertEqual(self.index.get(key)[2], 20)
+
+    def test_build_from_bulk(self):
+        """Test that a WTO bulk CSV is indexed under the keys the UI looks up."""
+        path = os.path.join(self.tmp_dir.name, 'bulk.csv')
+        pd.DataFrame({
+            'Indicator Code': ['ITS_MTV_AM'] * 14 + ['ITS_MTV_AX'] * 12,
+            'Reporting Economy Code': ['842'] * 12 + ['156', '156'] + ['156'] * 12,
+            'Partner Economy Code': ['000'] * 26,
+            'Product/Sector Code': ['TO'] * 13 + ['AG'] + ['TO'] * 12,
+            'Year': list(range(2010, 2022)) + [2021, 2021] + list(range(2010, 2022)),
+            'Value': [1.0] * 26,
+        }).to_csv(path, index=False)
+
+        index = build_from_bulk(path, chunksize=5)
+
+        self.assertEqual(index.get(SeriesKey('842', '0', 'TOTAL')), (2010, 2021, 12, 12))
+        # Exports of 156 are a different flow and do not count towards its import series.
+        self.assertFalse(index.is_forecastable(SeriesKey('156', '0', 'TOTAL')))
+        self.assertEqual(len(index), 2)
+
+    def test_build_from_bulk_hs_codes(self):
+        """Test that numeric HS codes in a bulk file without an indicator column are kept."""
+        path = os.path.join(self.tmp_dir.name, 'bulk.csv')
+        pd.DataFrame({
+            'Reporting Economy Code': ['842'] * 3,
+            'Partner Economy Code': ['156'] * 3,
+            'Product/Sector Code': ['87'] * 3,
+            'Year': [2019, 2020, 2021],
+            'Value': [1.0] * 3,
+        }).to_csv(path, index=False)
+
+        index = build_from_bulk(path, indicator=None)
+
+        self.assertFalse(index.is_forecastable(SeriesKey('842', '156', '87')))
+
+if __name__ == '__main__':
+    unittest.main()
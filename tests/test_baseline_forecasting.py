@@ -0,0 +1,126 @@
+import unittest
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.baseline_forecasting import (
+    holt_forecast,
+    theta_forecast,
+    drift_forecast,
+    forecast_panel,
+    forecast_baseline,
+    forecast_baseline_panel,
+)
+from src.exog_features import ExogFeatureMatrix
+from src.config import GDP_GROWTH_ASSUMPTION
+
+class TestBaselineForecasting(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a linear series, a series padded with NaN, and an enriched DataFrame."""
+        self.linear = 100 + 10 * np.arange(12.0)
+        self.padded = np.concatenate([[np.nan] * 4, 50 + 5 * np.arange(8.0)])
+        self.test_df = pd.DataFrame({
+            'Year': pd.to_datetime([str(y) for y in range(2010, 2016)]),
+            'Value': [100, 110, 120, 130, 140, 150],
+            'GDP_USD': [1000, 1100, 1200, 1300, 1400, 1500],
+        })
+
+    def test_holt_and_theta_extend_linear_trend(self):
+        """Test that a straight line is continued by Holt's method and closely by Theta."""
+        panel = np.vstack([self.linear, self.padded])
+        holt = holt_forecast(panel, steps=3)
+        self.assertTrue(np.allclose(holt[0], [220, 230, 240]))
+        self.assertTrue(np.allclose(holt[1], [90, 95, 100]))
+        theta = theta_forecast(panel, steps=3)
+        self.assertTrue(np.all(np.diff(theta[0]) > 0))
+
+    def test_drift_gdp_elasticity(self):
+        """Test that trade growing at twice GDP growth carries an elasticity of two."""
+        gdp = 1000 * np.cumprod([1.0, 1.01, 1.03, 0.99, 1.02, 1.04, 1.00, 1.02, 1.05, 1.01])
+        values = 50 * gdp ** 2 / gdp[0] ** 2
+        future_gdp = gdp[-1] * 1.05 ** np.arange(1, 3)
+        forecast = drift_forecast(values[None, :], gdp[None, :], future_gdp[None, :], steps=2)
+        self.assertTrue(np.allclose(forecast[0], values[-1] * 1.05 ** (2 * np.arange(1, 3))))
+
+        # Constant GDP growth leaves only the drift, without blowing up the elasticity.
+        steady_gdp = 1e12 * 1.03 ** np.arange(10)
+        steady = drift_forecast(values[None, :], steady_gdp[None, :], steady_gdp[None, -2:] * 1.03 ** 2, steps=2)
+        self.assertTrue(np.all(np.isfinite(steady)))
+
+    def test_panel_matches_single_series(self):
+        """Test that fitting a panel gives the same result as fitting rows one at a time."""
+        panel = np.vstack([self.linear, self.padded, np.linspace(-5, 5, 12)])
+        together = forecast_panel(panel)['mean']
+        for row in range(len(panel)):
+            self.assertTrue(np.allclose(forecast_panel(panel[row])['mean'][0], together[row]))
+
+    def test_forecast_baseline_frame(self):
+        """Test that the single-series wrapper returns the shared forecast schema."""
+        forecast_df = forecast_baseline(self.test_df)
+        self.assertEqual(len(forecast_df), 5)
+        self.assertEqual(forecast_df.index[0], pd.Timestamp('2016-01-01'))
+        self.assertIn('mean', forecast_df.columns)
+
+        matrix = ExogFeatureMatrix(2010, ['GDP_USD'], self.test_df[['GDP_USD']].values)
+        from_matrix = forecast_baseline(self.test_df.drop(columns='GDP_USD'), matrix)
+        self.assertTrue(np.allclose(from_matrix['mean'], forecast_df['mean']))
+
+    def test_forecast_baseline_panel(self):
+        """Test that series with different histories are aligned into one panel."""
+        frames = forecast_baseline_panel({
+            'a': pd.Series(self.linear, index=range(2004, 2016)),
+            'b': pd.Series(self.padded[4:], index=range(2008, 2016)),
+        })
+        self.assertEqual(set(frames), {'a', 'b'})
+        self.assertEqual(frames['b'].index[0], pd.Timestamp('2016-01-01'))
+        self.assertTrue(np.allclose(frames['a']['holt'].values, [220, 230, 240, 250, 260]))
+
+    def test_forecast_baseline_panel_unequal_end_years(self):
+        """Test that a series ending early is forecast through its gap, so every method starts after the panel."""
+        early = pd.Series(100 + 10 * np.arange(8.0), index=range(2004, 2012))
+        frames = forecast_baseline_panel({
+            'a': pd.Series(self.linear, index=range(2004, 2016)),
+            'b': early,
+        })
+        self.assertEqual(frames['b'].index[0], pd.Timestamp('2016-01-01'))
+        self.assertTrue(np.allclose(frames['b']['holt'], frames['a']['holt']))
+        self.assertTrue(np.allclose(frames['b']['holt'], [220, 230, 240, 250, 260]))
+        own = forecast_panel(early.values, steps=9)
+        for name in ('holt', 'theta', 'drift', 'mean'):
+            self.assertTrue(np.allclose(frames['b'][name], own[name][0, 4:]), name)
+
+        # With GDP, the drift carries the elasticity through the known GDP of the gap years.
+        gdp = 1000 * np.cumprod([1.0, 1.01, 1.03, 0.99, 1.02, 1.04, 1.00, 1.02, 1.05, 1.01, 1.03, 0.98])
+        frames = forecast_baseline_panel({
+            'a': pd.Series(self.linear, index=range(2004, 2016)),
+            'b': pd.Series(50 * (gdp[:8] / gdp[0]) ** 2, index=range(2004, 2012)),
+        }, exog_by_key={'b': ExogFeatureMatrix(2004, ['GDP_USD'], gdp[:, None])})
+        self.assertTrue(np.allclose(frames['b']['drift'].iloc[0], 50 * (gdp[-1] / gdp[0]) ** 2 * GDP_GROWTH_ASSUMPTION ** 2))
+
+    def test_forecast_baseline_panel_with_gdp(self):
+        """Test that the panel passes each key's GDP through, matching single-series fits."""
+        gdp = 1000 * np.cumprod([1.0, 1.01, 1.03, 0.99, 1.02, 1.04, 1.00, 1.02, 1.05, 1.01, 1.03, 0.98])
+        matrices = {
+            'a': ExogFeatureMatrix(2004, ['GDP_USD'], gdp[:, None]),
+            'b': ExogFeatureMatrix(2004, ['GDP_USD'], gdp[::-1, None]),
+        }
+        series = {
+            'a': pd.Series(50 * (gdp / gdp[0]) ** 2, index=range(2004, 2016)),
+            'b': pd.Series(self.padded[4:], index=range(2008, 2016)),
+            'c': pd.Series(self.linear, index=range(2004, 2016)),
+        }
+        frames = forecast_baseline_panel(series, exog_by_key=matrices)
+        for key, values in series.items():
+            input_df = pd.DataFrame({'Year': pd.to_datetime(values.index.astype(str)), 'Value': values.values})
+            if key in matrices:
+                expected = forecast_baseline(input_df, matrices[key])
+            else:
+                expected = forecast_baseline(input_df)
+            self.assertTrue(np.allclose(frames[key][expected.columns].values, expected.values))
+
+if __name__ == '__main__':
+    unittest.main()
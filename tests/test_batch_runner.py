@@ -0,0 +1,143 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.comtrade_api import SeriesKey
+from src.batch_runner import BatchRun, run_worker
+
+KEYS = [SeriesKey(str(reporter), '0', '87') for reporter in range(1, 8)]
+
+def fake_forecast(key):
+    if key.reporter == '3':
+        raise RuntimeError("No data is available for this selection.")
+    return {'forecast': [{'Year': 2023, 'mean': 1.0}], 'backtest': []}
+
+class TestBatchRunner(unittest.TestCase):
+
+    def setUp(self):
+        """Create a run of seven series in shards of three."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.run_dir = os.path.join(self.tmp_dir.name, 'run')
+        self.run = BatchRun.create(self.run_dir, KEYS, shard_size=3)
+
+    def test_manifest_shards(self):
+        """Test that keys are split into shards and an existing run is reopened unchanged."""
+        self.assertEqual([len(shard) for shard in self.run.shards], [3, 3, 1])
+        reopened = BatchRun.create(self.run_dir, KEYS[:2], shard_size=3)
+        self.assertEqual(reopened.manifest['series_count'], 7)
+
+    def test_claims_are_exclusive_until_stale(self):
+        """Test that a held claim blocks others until its heartbeat goes stale."""
+        self.assertTrue(self.run.claim(0, 'a'))
+        self.assertFalse(self.run.claim(0, 'b'))
+        self.assertEqual(self.run.claim_next('b'), 1)
+
+        lock_path = os.path.join(self.run_dir, 'claims', 'shard-00000.lock')
+        os.utime(lock_path, (time.time() - 10, time.time() - 10))
+        self.run.claim_timeout = 5
+        self.assertTrue(self.run.claim(0, 'b'))
+
+    def test_former_owner_cannot_touch_new_claim(self):
+        """Test that after a takeover the old owner neither refreshes nor removes the new lock."""
+        old_owner, new_owner = BatchRun(self.run_dir, claim_timeout=5), BatchRun(self.run_dir, claim_timeout=5)
+        self.assertTrue(old_owner.claim(0, 'a'))
+        lock_path = os.path.join(self.run_dir, 'claims', 'shard-00000.lock')
+        os.utime(lock_path, (time.time() - 10, time.time() - 10))
+        self.assertTrue(new_owner.claim(0, 'b'))
+
+        self.assertFalse(old_owner.heartbeat(0))
+        with patch('src.batch_runner.os.rename') as rename:
+            old_owner.release(0)
+        rename.assert_not_called()
+        self.assertTrue(new_owner.owns(0))
+        self.assertTrue(new_owner.heartbeat(0))
+        new_owner.release(0)
+        self.assertFalse(os.path.exists(lock_path))
+
+    def test_takeover_race_keeps_fresh_lock(self):
+        """Test that a worker acting on an outdated stale check does not steal a fresh lock."""
+        self.assertTrue(self.run.claim(0, 'a'))
+        lock_path = os.path.join(self.run_dir, 'claims', 'shard-00000.lock')
+        os.utime(lock_path, (time.time() - 10, time.time() - 10))
+        winner, loser = BatchRun(self.run_dir, claim_timeout=5), BatchRun(self.run_dir, claim_timeout=5)
+        real_rename = os.rename
+
+        def rename_after_winner(src, dst):
+            # Between the loser's stale check and its rename, the winner takes the shard over.
+            with patch('src.batch_runner.os.rename', real_rename):
+                self.assertTrue(winner.claim(0, 'winner'))
+            real_rename(src, dst)
+
+        with patch('src.batch_runner.os.rename', side_effect=rename_after_winner):
+            self.assertFalse(loser.claim(0, 'loser'))
+        self.assertTrue(winner.owns(0))
+        self.assertEqual(os.listdir(os.path.join(self.run_dir, 'claims')), ['shard-00000.lock'])
+
+    def test_takeover_during_release(self):
+        """Test that a release interleaved with a takeover and a fresh claim leaves exactly one owner."""
+        owner = BatchRun(self.run_dir, claim_timeout=5)
+        self.assertTrue(owner.claim(0, 'owner'))
+        lock_path = os.path.join(self.run_dir, 'claims', 'shard-00000.lock')
+        os.utime(lock_path, (time.time() - 10, time.time() - 10))
+        taker, newcomer = BatchRun(self.run_dir, claim_timeout=5), BatchRun(self.run_dir, claim_timeout=5)
+        real_rename, real_link = os.rename, os.link
+
+        def rename_after_takeover(src, dst):
+            # After the owner's ownership check, its stale lock is taken over before it moves the lock.
+            with patch('src.batch_runner.os.rename', real_rename):
+                self.assertTrue(taker.claim(0, 'taker'))
+            real_rename(src, dst)
+
+        def link_after_newcomer(src, dst):
+            # With the taker's lock moved aside, a third worker claims the empty slot.
+            self.assertTrue(newcomer.claim(0, 'newcomer'))
+            real_link(src, dst)
+
+        with patch('src.batch_runner.os.rename', side_effect=rename_after_takeover), \
+                patch('src.batch_runner.os.link', side_effect=link_after_newcomer):
+            owner.release(0)
+        self.assertTrue(newcomer.owns(0))
+        self.assertFalse(taker.owns(0))
+        self.assertFalse(taker.heartbeat(0))
+        self.assertEqual(os.listdir(os.path.join(self.run_dir, 'claims')), ['shard-00000.lock'])
+
+    def test_run_checkpoints_and_reports_status(self):
+        """Test that every series is recorded once, with failures kept separately."""
+        self.assertEqual(run_worker(self.run_dir, 'w1', fake_forecast), 7)
+        status = BatchRun(self.run_dir).status()
+        self.assertEqual((status['shards_done'], status['shards_claimed']), (3, 0))
+        self.assertEqual((status['series_ok'], status['series_failed']), (6, 1))
+        self.assertEqual(run_worker(self.run_dir, 'w2', fake_forecast), 0)
+
+        # Retrying after the run finished reopens only the shard with the failure.
+        self.assertEqual(run_worker(self.run_dir, 'w3', lambda key: {}, retry_failed=True), 1)
+        status = BatchRun(self.run_dir).status()
+        self.assertEqual((status['shards_done'], status['series_failed']), (3, 0))
+
+    def test_restart_skips_finished_series(self):
+        """Test that a worker resuming a crashed shard only runs the missing series."""
+        self.run.record(0, KEYS[0], 'ok', result={})
+        self.run.record(0, KEYS[2], 'error', error='boom')
+        with open(os.path.join(self.run_dir, 'results', 'shard-00000.jsonl'), 'a') as f:
+            f.write('{"series": "2|0|87", "sta')
+
+        calls = []
+        def tracking_forecast(key):
+            calls.append(key)
+            return {}
+        run_worker(self.run_dir, 'w1', tracking_forecast)
+        self.assertEqual(calls, KEYS[1:2] + KEYS[3:])
+
+        calls.clear()
+        run_worker(self.run_dir, 'w1', tracking_forecast, retry_failed=True)
+        self.assertEqual(calls, [KEYS[2]])
+        self.assertEqual(BatchRun(self.run_dir).status()['series_failed'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
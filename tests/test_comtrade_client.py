@@ -0,0 +1,78 @@
+import unittest
+import time
+import tempfile
+import pandas as pd
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.comtrade_client import ComtradeClient, ComtradeAPIError, TokenBucket, FileTokenBucket
+from src.comtrade_stub_server import ComtradeStubServer
+
+class TestComtradeClient(unittest.TestCase):
+
+    def make_client(self, server, **kwargs):
+        """Creates a client with fast backoff pointed at the stub server."""
+        options = dict(
+            base_url=server.url,
+            rate_limiter=TokenBucket(rate=1000, capacity=1000),
+            backoff_base=0.01,
+            backoff_max=0.05,
+            timeout_budget=5,
+        )
+        options.update(kwargs)
+        return ComtradeClient(**options)
+
+    def test_get_trade_data_success(self):
+        """Test that a stubbed response is returned in the get_comtrade_data schema."""
+        with ComtradeStubServer() as server, self.make_client(server) as client:
+            df = client.get_trade_data('842', '0', '87')
+
+        self.assertIsInstance(df, pd.DataFrame)
+        self.assertEqual(list(df.columns), ['Year', 'Reporter', 'Partner', 'Product', 'Value'])
+        self.assertGreater(len(df), 10)
+
+    def test_retries_on_retryable_status(self):
+        """Test that 429 and 5xx responses are retried until success."""
+        with ComtradeStubServer(fail_statuses=[429, 503]) as server, self.make_client(server) as client:
+            df = client.get_trade_data('842', '0', '87')
+            self.assertEqual(server.request_count, 3)
+        self.assertFalse(df.empty)
+
+    def test_gives_up_after_max_retries(self):
+        """Test that the client raises once retries are exhausted."""
+        with ComtradeStubServer(fail_statuses=[503] * 10) as server, self.make_client(server, max_retries=2) as client:
+            with self.assertRaises(ComtradeAPIError):
+                client.get_trade_data('842', '0', '87')
+            self.assertEqual(server.request_count, 3)
+
+    def test_does_not_retry_client_errors(self):
+        """Test that non-retryable 4xx responses fail immediately."""
+        with ComtradeStubServer(fail_statuses=[400]) as server, self.make_client(server) as client:
+            with self.assertRaises(ComtradeAPIError):
+                client.get_trade_data('842', '0', '87')
+            self.assertEqual(server.request_count, 1)
+
+    def test_rate_limiter_throttles_requests(self):
+        """Test that the token bucket caps throughput after the burst."""
+        limiter = TokenBucket(rate=20, capacity=1)
+        with ComtradeStubServer() as server, self.make_client(server, rate_limiter=limiter) as client:
+            start = time.monotonic()
+            for _ in range(5):
+                client.fetch_raw('842', '0', '87')
+            elapsed = time.monotonic() - start
+        self.assertGreaterEqual(elapsed, 4 / 20 * 0.9)
+
+    def test_file_bucket_is_shared(self):
+        """Test that buckets on the same state file, as in separate worker processes, share one limit."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'rate_limit.json')
+            first, second = FileTokenBucket(path, rate=0.1, capacity=2), FileTokenBucket(path, rate=0.1, capacity=2)
+            self.assertTrue(first.acquire(timeout=0))
+            self.assertTrue(second.acquire(timeout=0))
+            self.assertFalse(first.acquire(timeout=0.01))
+            self.assertFalse(second.acquire(timeout=0.01))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.comtrade_api import SeriesKey
+from src.comtrade_client import ComtradeClient, TokenBucket
+from src.comtrade_query_planner import plan_bulk_queries, fetch_series_bulk
+from src.comtrade_stub_server import ComtradeStubServer, STUB_YEARS
+
+class TestComtradeQueryPlanner(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a grid of series keys."""
+        self.keys = [SeriesKey(r, p, c) for r in ('842', '156', '276') for p in ('0', '392') for c in ('TOTAL', '87')]
+
+    def test_plan_merges_full_grid_into_one_call(self):
+        """Test that a complete reporter x partner x product grid needs one call."""
+        queries = plan_bulk_queries(self.keys)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(queries[0].reporters), 3)
+
+    def test_plan_respects_record_limit(self):
+        """Test that queries are split so each stays under the record limit."""
+        queries = plan_bulk_queries(self.keys, max_records=100, records_per_series=30)
+        for query in queries:
+            self.assertLessEqual(len(query.reporters) * len(query.partners) * len(query.products), 3)
+        covered = {SeriesKey(r, p, c) for q in queries for r in q.reporters for p in q.partners for c in q.products}
+        self.assertEqual(covered, set(self.keys))
+
+    def test_plan_isolates_aggregate_codes(self):
+        """Test that aggregate commodity codes are never merged with other products."""
+        queries = plan_bulk_queries([SeriesKey('842', '0', 'AG2'), SeriesKey('842', '0', '87')])
+        self.assertEqual(sorted(q.products for q in queries), [('87',), ('AG2',)])
+
+    def test_fetch_series_bulk_fans_out_results(self):
+        """Test that bulk responses are split back into per-series frames."""
+        with ComtradeStubServer() as server:
+            client = ComtradeClient(base_url=server.url, rate_limiter=TokenBucket(rate=1000, capacity=1000))
+            frames, report = fetch_series_bulk(self.keys, client.fetch_raw)
+            client.close()
+            self.assertEqual(server.request_count, 1)
+
+        self.assertEqual(set(frames), set(self.keys))
+        self.assertEqual(report['round_trips_saved'], len(self.keys) - 1)
+        for key, df in frames.items():
+            self.assertEqual(len(df), len(STUB_YEARS))
+            self.assertEqual(list(df.columns), ['Year', 'Reporter', 'Partner', 'Product', 'Value'])
+        self.assertTrue(frames[SeriesKey('156', '0', '87')]['Product'].eq('Commodity 87').all())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.exog_features import ExogFeatureMatrix, ExogFeatureCache, build_exog_matrix
+from src.forecasting_script import forecast_sarimax
+from src.advanced_forecasting_script import forecast_lstm
+
+def fake_gdp(country_code):
+    years = pd.to_datetime([str(y) for y in range(2000, 2016)])
+    return pd.DataFrame({'GDP_USD': np.linspace(1000, 2500, 16)}, index=pd.Index(years, name='Year'))
+
+class TestExogFeatures(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a two-feature matrix and a matching enriched DataFrame."""
+        gdp = np.linspace(1000, 2500, 16)
+        self.matrix = ExogFeatureMatrix(2000, ['GDP_USD', 'Export_Volume_Index'], np.column_stack([gdp, np.arange(16) + 100.0]))
+        self.test_df = pd.DataFrame({
+            'Year': pd.to_datetime([str(y) for y in range(2005, 2016)]),
+            'Value': np.linspace(100, 200, 11),
+            'GDP_USD': gdp[5:],
+        })
+
+    def test_slice_is_view(self):
+        """Test that a year range maps to a view of the contiguous array."""
+        rows = self.matrix.slice(2005, 2007)
+        self.assertTrue(np.shares_memory(rows, self.matrix.values))
+        self.assertEqual(rows[0, 1], 105.0)
+        self.assertEqual(self.matrix.at_years([2001, 2003])[:, 1].tolist(), [101.0, 103.0])
+        with self.assertRaises(KeyError):
+            self.matrix.slice(1999, 2001)
+
+    def test_extrapolate(self):
+        """Test that features grow by their configured factor or stay flat."""
+        future = self.matrix.extrapolate(2015, 2, growth={'GDP_USD': 1.1})
+        self.assertTrue(np.allclose(future[:, 0], [2750.0, 3025.0]))
+        self.assertTrue(np.allclose(future[:, 1], [115.0, 115.0]))
+
+    @patch('src.exog_features.fetch_gdp', side_effect=fake_gdp)
+    def test_build_and_cache(self, mock_gdp):
+        """Test that the matrix is built once and then served from the cache."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ExogFeatureCache(cache_dir=tmp_dir, features=['GDP_USD'])
+            matrix = cache.get('USA')
+            self.assertEqual((matrix.first_year, matrix.last_year), (2000, 2015))
+            self.assertIs(cache.get('USA'), matrix)
+
+            reloaded = ExogFeatureCache(cache_dir=tmp_dir, features=['GDP_USD']).get('USA')
+            self.assertTrue(np.array_equal(reloaded.values, matrix.values))
+        self.assertEqual(mock_gdp.call_count, 1)
+
+    @patch('src.exog_features.fetch_gdp', side_effect=RuntimeError("No GDP data"))
+    def test_failed_build_is_cached_briefly(self, mock_gdp):
+        """Test that a reporter without data is not rebuilt on every request until the failure expires."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ExogFeatureCache(cache_dir=tmp_dir, features=['GDP_USD'], failure_ttl=60)
+            self.assertIsNone(cache.get('XXX'))
+            self.assertIsNone(cache.get('XXX'))
+            self.assertEqual(mock_gdp.call_count, 1)
+
+            cache.failure_ttl = 0
+            self.assertIsNone(cache.get('XXX'))
+            self.assertEqual(mock_gdp.call_count, 2)
+
+    @patch('src.exog_features.fetch_gdp', side_effect=fake_gdp)
+    def test_build_with_indices(self, mock_gdp):
+        """Test that index features are read from the bulk file and aligned by year."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'indices.csv')
+            pd.DataFrame({
+                'Reporting Economy ISO3A Code': ['USA'] * 3 + ['CHN'],
+                'Indicator Code': ['VOL'] * 4,
+                'Year': [2013, 2014, 2015, 2015],
+                'Value': [101.0, 102.0, 103.0, 999.0],
+            }).to_csv(path, index=False)
+            with patch.dict('src.exog_features.EXOG_INDEX_INDICATORS', {'Volume': 'VOL'}):
+                matrix = build_exog_matrix('USA', ['GDP_USD', 'Volume'], indices_path=path)
+
+        self.assertEqual((matrix.first_year, matrix.last_year), (2013, 2015))
+        self.assertEqual(matrix.values[:, 1].tolist(), [101.0, 102.0, 103.0])
+
+    def test_sarimax_with_matrix_matches_gdp_column(self):
+        """Test that slicing GDP from the matrix gives the same forecast as the joined column."""
+        gdp_only = ExogFeatureMatrix(2000, ['GDP_USD'], self.matrix.values[:, :1])
+        expected = forecast_sarimax(self.test_df)
+        actual = forecast_sarimax(self.test_df.drop(columns='GDP_USD'), gdp_only)
+        self.assertTrue(np.allclose(expected['mean'].values, actual['mean'].values))
+
+    def test_lstm_with_multiple_features(self):
+        """Test that the LSTM accepts every feature in the matrix."""
+        forecast_df = forecast_lstm(self.test_df.drop(columns='GDP_USD'), self.matrix)
+        self.assertEqual(len(forecast_df), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,7 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
-from forecasting_script import forecast_sarimax
+from forecasting_script import forecast_sarimax, simulate_gdp_scenarios
 from advanced_forecasting_script import forecast_lstm
 
 class TestForecasting(unittest.TestCase):
@@ -28,6 +28,22 @@ class TestForecasting(unittest.TestCase):
         self.assertEqual(len(forecast_df), 5)
         self.assertIn('mean', forecast_df.columns)
 
+    def test_simulate_gdp_scenarios_matches_point_forecast(self):
+        """Test that a single 4% growth scenario reproduces the SARIMAX forecast."""
+        forecast_df = forecast_sarimax(self.test_df)
+        fan_df = simulate_gdp_scenarios(self.test_df, growth=[1.04], include_model_error=False)
+        self.assertEqual(len(fan_df), 5)
+        self.assertTrue(np.allclose(fan_df['mean'].values, forecast_df['mean'].values))
+
+    def test_simulate_gdp_scenarios_quantiles(self):
+        """Test that the fan chart quantiles are ordered and reproducible from the seed."""
+        fan_df = simulate_gdp_scenarios(self.test_df, seed=0)
+        pd.testing.assert_frame_equal(fan_df, simulate_gdp_scenarios(self.test_df, seed=0))
+        self.assertIn('q05', fan_df.columns)
+        self.assertIn('q95', fan_df.columns)
+        self.assertTrue((fan_df['q05'] <= fan_df['q50']).all())
+        self.assertTrue((fan_df['q50'] <= fan_df['q95']).all())
+
     def test_forecast_lstm(self):
         """Test the LSTM forecasting function."""
         forecast_df = forecast_lstm(self.test_df)
@@ -0,0 +1,117 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.comtrade_api import SeriesKey
+from src.trade_store import TradeStore
+from src.hierarchy import (
+    hs_ancestors,
+    build_summation_matrix,
+    aggregate,
+    reconcile,
+    extend_to_origin,
+    forecast_hierarchy,
+    leaf_series_from_store,
+)
+from src import api
+
+LEAVES = [
+    SeriesKey('842', '156', '870321'),
+    SeriesKey('842', '156', '870322'),
+    SeriesKey('842', '276', '870321'),
+    SeriesKey('842', '276', '0101'),
+]
+
+def leaf_history():
+    years = range(2008, 2023)
+    return {key: pd.Series(100.0 * (i + 1) + np.arange(15) * (3 + i), index=years) for i, key in enumerate(LEAVES)}
+
+class TestHierarchy(unittest.TestCase):
+
+    def setUp(self):
+        """Build the summation matrix for two partners and two HS chapters."""
+        self.nodes, self.S = build_summation_matrix(LEAVES)
+        self.row = {node: i for i, node in enumerate(self.nodes)}
+
+    def test_hs_ancestors_by_truncation(self):
+        """Test that unknown HS codes fall back to the two-digit convention."""
+        self.assertEqual(hs_ancestors('870321', index=None), ['8703', '87', 'TOTAL'])
+        self.assertEqual(hs_ancestors('TOTAL', index=None), [])
+
+    def test_summation_matrix(self):
+        """Test that aggregates sum the right leaves and leaves map to themselves."""
+        self.assertEqual(self.S.shape, (len(self.nodes), 4))
+        self.assertEqual(self.nodes[-4:], LEAVES)
+        world_total = self.S[self.row[SeriesKey('842', '0', 'TOTAL')]].toarray().ravel()
+        self.assertEqual(world_total.tolist(), [1, 1, 1, 1])
+        china_cars = self.S[self.row[SeriesKey('842', '156', '8703')]].toarray().ravel()
+        self.assertEqual(china_cars.tolist(), [1, 1, 0, 0])
+
+        history = aggregate(self.S, np.array([[1.0, np.nan], [2.0, np.nan], [3.0, np.nan], [4.0, np.nan]]))
+        self.assertEqual(history[self.row[SeriesKey('842', '0', '87')]].tolist()[0], 6.0)
+        self.assertTrue(np.isnan(history[self.row[SeriesKey('842', '0', 'TOTAL')], 1]))
+
+    def test_reconciliation_is_coherent(self):
+        """Test that every method makes aggregates equal the sum of their leaves."""
+        rng = np.random.default_rng(0)
+        base = rng.normal(100, 10, size=(len(self.nodes), 3))
+        for method in ('bottom_up', 'ols', 'wls'):
+            coherent = reconcile(base, self.S, method)
+            self.assertTrue(np.allclose(coherent, self.S @ coherent[-4:]), method)
+
+        coherent_base = self.S @ base[-4:]
+        self.assertTrue(np.allclose(reconcile(coherent_base, self.S, 'ols'), coherent_base))
+        with self.assertRaises(ValueError):
+            reconcile(base, self.S, 'median')
+
+    def test_forecast_hierarchy(self):
+        """Test that World/TOTAL forecasts equal the sum of the leaf forecasts."""
+        forecasts = forecast_hierarchy(leaf_history())
+        total = forecasts[SeriesKey('842', '0', 'TOTAL')]
+        self.assertEqual(len(total), 5)
+        leaf_sum = sum(forecasts[key]['mean'] for key in LEAVES)
+        self.assertTrue(np.allclose(total['mean'], leaf_sum))
+
+    def test_leaves_with_different_end_years(self):
+        """Test that a leaf ending early is carried to the common origin instead of counting as zero."""
+        china, germany = SeriesKey('842', '156', '870321'), SeriesKey('842', '276', '870321')
+        forecasts = forecast_hierarchy({
+            china: pd.Series(100.0 + np.arange(24), index=range(2000, 2024)),
+            germany: pd.Series(np.full(16, 50.0), index=range(2000, 2016)),
+        })
+        total = forecasts[SeriesKey('842', '0', 'TOTAL')]
+        self.assertEqual(total.index[0], pd.Timestamp('2024-01-01'))
+        self.assertTrue(np.allclose(forecasts[germany]['base'], 50.0))
+        self.assertTrue(np.all(total['base'] > 170))
+        self.assertTrue(np.allclose(total['mean'], forecasts[china]['mean'] + forecasts[germany]['mean']))
+
+        extended = extend_to_origin(np.array([[1.0, 2.0, 3.0, 4.0], [5.0, 5.0, np.nan, np.nan], [np.nan] * 4]))
+        self.assertTrue(np.allclose(extended[1], 5.0))
+        self.assertEqual(extended[0].tolist(), [1.0, 2.0, 3.0, 4.0])
+        self.assertTrue(np.isnan(extended[2]).all())
+
+    def test_store_leaves_and_api(self):
+        """Test that stored detailed series become leaves and are served by the API."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = TradeStore(tmp_dir)
+            for key, series in leaf_history().items():
+                store.append(key, pd.DataFrame({'Year': series.index, 'Value': series.values}))
+            store.append(SeriesKey('842', '156', '8703'), pd.DataFrame({'Year': [2022], 'Value': [1.0]}))
+            self.assertEqual(set(leaf_series_from_store(store, '842')), set(LEAVES))
+
+            with patch.object(api, 'trade_store', store):
+                client = api.create_app().test_client()
+                response = client.get('/api/forecast/hierarchy?reporter=842&method=bottom_up')
+                missing = client.get('/api/forecast/hierarchy?reporter=156')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['results']), len(self.nodes))
+        self.assertEqual(missing.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import threading
+import time
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.narrative import template_narrative, NarrativeGenerator
+
+class TestNarrative(unittest.TestCase):
+
+    def setUp(self):
+        """Set up forecasts for two models and a backtest where LSTM is more accurate."""
+        years = pd.date_range('2023-01-01', periods=5, freq='YS', name='Year')
+        self.forecast_df = pd.DataFrame({
+            'SARIMAX_Forecast': [100.0, 100.1, 100.2, 100.1, 100.2],
+            'LSTM_Forecast': [100.0, 110.0, 121.0, 133.1, 146.41],
+        }, index=years)
+        self.backtest_df = pd.DataFrame({
+            'Actual': [90.0, 95.0],
+            'SARIMAX_Error': [10.0, -12.0],
+            'LSTM_Error': [1.0, -2.0],
+        })
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def slow_generate(self, prompt, stop_event):
+        for _ in range(500):
+            if self.release.is_set() or stop_event.is_set():
+                break
+            time.sleep(0.01)
+        return "stopped" if stop_event.is_set() else f"LLM: {prompt}"
+
+    def wait_for_empty_queue(self, narrator):
+        for _ in range(100):
+            if narrator.queue_depth == 0:
+                break
+            time.sleep(0.01)
+        return narrator.queue_depth
+
+    def test_template_narrative(self):
+        """Test that the template names the best model and describes its growth."""
+        text = template_narrative(self.forecast_df, self.backtest_df)
+        self.assertIn("LSTM had the lowest backtest error", text)
+        self.assertIn("rising", text)
+        self.assertIn("+10.0%", text)
+        self.assertIn("diverge noticeably", text)
+
+        flat = template_narrative(self.forecast_df[['SARIMAX_Forecast']], self.backtest_df)
+        self.assertIn("SARIMAX forecast is flat", flat)
+
+    def test_template_skips_missing_forecast(self):
+        """Test that an all-NaN forecast for the best model falls back to the next model."""
+        forecast_df = self.forecast_df.assign(LSTM_Forecast=np.nan)
+        text = template_narrative(forecast_df, self.backtest_df)
+        self.assertIn("SARIMAX had the lowest backtest error", text)
+        self.assertIn("SARIMAX forecast is flat", text)
+        self.assertNotIn("Model agreement", text)
+
+        empty = template_narrative(forecast_df.assign(SARIMAX_Forecast=np.nan), self.backtest_df)
+        self.assertEqual(empty, "No forecast is available to analyse.")
+
+    def test_generate_in_time(self):
+        """Test that a prompt answered within the deadline returns the LLM text."""
+        narrator = NarrativeGenerator(lambda prompt, stop_event: f"LLM: {prompt}", timeout=5)
+        self.assertEqual(narrator.generate("hello", lambda: "template"), ("LLM: hello", None))
+
+    def test_timeout_returns_fallback_and_future(self):
+        """Test that a late LLM gives the fallback now and the LLM text later."""
+        narrator = NarrativeGenerator(self.slow_generate, timeout=0.05)
+        text, pending = narrator.generate("hello", lambda: "template")
+        self.assertEqual(text, "template")
+        self.release.set()
+        self.assertEqual(pending.result(timeout=5), "LLM: hello")
+
+    def test_full_queue_and_missing_llm(self):
+        """Test that a full queue or an unloaded LLM falls back without waiting."""
+        narrator = NarrativeGenerator(self.slow_generate, timeout=0.05, max_queue_depth=1)
+        narrator.generate("first", lambda: "template")
+        self.assertEqual(narrator.queue_depth, 1)
+        self.assertEqual(narrator.generate("second", lambda: "template"), ("template", None))
+
+        self.release.set()
+        self.assertEqual(self.wait_for_empty_queue(narrator), 0)
+        self.assertEqual(NarrativeGenerator(None).generate("hello", lambda: "template"), ("template", None))
+
+    def test_cancel_frees_worker_and_queue(self):
+        """Test that an unwanted late generation is cancelled instead of holding the LLM."""
+        narrator = NarrativeGenerator(self.slow_generate, timeout=0.05, max_queue_depth=2)
+        self.assertEqual(narrator.generate("late", lambda: "template", keep_pending=False), ("template", None))
+        self.assertEqual(self.wait_for_empty_queue(narrator), 0)
+
+        running, queued = narrator.submit("first"), narrator.submit("second")
+        while not running.running():
+            time.sleep(0.01)
+        narrator.cancel(queued)
+        self.assertTrue(queued.cancelled())
+        self.assertEqual(narrator.queue_depth, 1)
+        narrator.cancel(running)
+        self.assertEqual(running.result(timeout=5), "stopped")
+        self.assertEqual(self.wait_for_empty_queue(narrator), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.comtrade_api import SeriesKey
+from src.availability_index import AvailabilityIndex
+from src.exog_features import ExogFeatureMatrix
+from src.pipeline import iter_analysis_pipeline, run_analysis_pipeline
+from src.trade_store import TradeStore
+
+def no_progress(*args, **kwargs):
+    pass
+
+def fake_enrich(cleaned_df, country_code):
+    enriched_df = cleaned_df.copy()
+    enriched_df['GDP_USD'] = np.linspace(1000, 3000, len(enriched_df))
+    return enriched_df
+
+def fake_lstm(enriched_df, exog_matrix=None):
+    years = pd.date_range(start=enriched_df['Year'].max() + pd.DateOffset(years=1), periods=5, freq='YS', name='Year')
+    return pd.DataFrame({'mean': np.arange(5.0)}, index=years)
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a live API response with enough history to forecast, and an empty availability index."""
+        years = list(range(2000, 2023))
+        self.live_df = pd.DataFrame({'Year': years, 'Value': np.linspace(100, 300, len(years))})
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.index_path = os.path.join(tmp_dir.name, 'availability_index.json')
+        self.index = AvailabilityIndex(path=self.index_path)
+        patcher = patch('src.pipeline.availability_index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('src.pipeline.exog_cache.get', return_value=None)
+    @patch('src.pipeline.evaluate_models', return_value=({}, pd.DataFrame({'Actual': [1.0]})))
+    @patch('src.pipeline.forecast_lstm', side_effect=fake_lstm)
+    @patch('src.pipeline.integrate_external_data', side_effect=fake_enrich)
+    @patch('src.pipeline.get_comtrade_data')
+    def test_events_arrive_in_stage_order(self, mock_fetch, mock_enrich, mock_lstm, mock_evaluate, mock_exog):
+        """Test that partial results are yielded as each stage completes."""
+        mock_fetch.return_value = self.live_df
+        events = list(iter_analysis_pipeline('842', '0', '87', 'USA', no_progress))
+
+        self.assertEqual([e.stage for e in events], ['cleaned', 'sarimax', 'baseline', 'lstm', 'backtest', 'done'])
+        self.assertEqual(list(events[1].data.columns), ['SARIMAX_Forecast'])
+        self.assertEqual(list(events[3].data.columns), ['SARIMAX_Forecast', 'Baseline_Forecast', 'LSTM_Forecast'])
+
+    @patch('src.pipeline.get_comtrade_data', return_value=pd.DataFrame())
+    def test_error_event_on_empty_data(self, mock_fetch):
+        """Test that a fetch without data yields a single error event."""
+        events = list(iter_analysis_pipeline('1', '1', '1', 'WLD', no_progress))
+        self.assertEqual([e.stage for e in events], ['error'])
+
+        forecast_df, backtest_df, error_message, skipped = run_analysis_pipeline('1', '1', '1', 'WLD', no_progress)
+        self.assertIsNone(forecast_df)
+        self.assertIn('No data', error_message)
+
+    @patch('src.pipeline.get_comtrade_data')
+    def test_known_short_series_is_rejected_without_fetching(self, mock_fetch):
+        """Test that the availability index short-circuits doomed requests."""
+        self.index.update(SeriesKey('842', '0', 'AG2'), pd.DataFrame({'Year': [2020, 2021]}))
+        events = list(iter_analysis_pipeline('842', '0', 'AG2', 'USA', no_progress))
+
+        self.assertEqual([e.stage for e in events], ['error'])
+        self.assertIn('Not enough data', events[0].data)
+        mock_fetch.assert_not_called()
+
+    @patch('src.pipeline.get_comtrade_data')
+    def test_index_updates_persist_and_reload(self, mock_fetch):
+        """Test that a live fetch is saved to the index file, and a later refresh there lifts the rejection."""
+        key = SeriesKey('842', '0', 'AG2')
+        mock_fetch.return_value = self.live_df.iloc[:3]
+        list(iter_analysis_pipeline('842', '0', 'AG2', 'USA', no_progress))
+        self.assertEqual(AvailabilityIndex.load(self.index_path).get(key)[2], 3)
+        self.assertFalse(self.index.is_forecastable(key))
+
+        # An incremental refresh in another process saves the longer history.
+        refreshed = AvailabilityIndex.load(self.index_path)
+        refreshed.update(key, self.live_df)
+        refreshed.save()
+        os.utime(self.index_path, (os.path.getmtime(self.index_path) + 1,) * 2)
+        mock_fetch.return_value = pd.DataFrame()
+        events = list(iter_analysis_pipeline('842', '0', 'AG2', 'USA', no_progress))
+        self.assertIn('No data returned', events[0].data)
+        self.assertEqual(mock_fetch.call_count, 2)
+
+    @patch('src.pipeline.evaluate_models', return_value=None)
+    @patch('src.pipeline.forecast_lstm', side_effect=fake_lstm)
+    @patch('src.pipeline.integrate_external_data')
+    @patch('src.pipeline.get_comtrade_data')
+    def test_uses_exog_matrix_without_joining(self, mock_fetch, mock_enrich, mock_lstm, mock_evaluate):
+        """Test that a cached feature matrix replaces the per-request GDP join."""
+        mock_fetch.return_value = self.live_df
+        matrix = ExogFeatureMatrix(1990, ['GDP_USD'], np.linspace(500, 4000, 40).reshape(-1, 1))
+        with patch('src.pipeline.exog_cache.get', return_value=matrix):
+            events = list(iter_analysis_pipeline('842', '0', '87', 'USA', no_progress))
+
+        self.assertEqual(events[-1].stage, 'done')
+        mock_enrich.assert_not_called()
+        self.assertIs(mock_lstm.call_args[0][1], matrix)
+
+    @patch('src.pipeline.exog_cache.get', return_value=None)
+    @patch('src.pipeline.evaluate_models', return_value=None)
+    @patch('src.pipeline.forecast_lstm', side_effect=fake_lstm)
+    @patch('src.pipeline.integrate_external_data', side_effect=fake_enrich)
+    @patch('src.pipeline.get_comtrade_data')
+    def test_reads_and_fills_trade_store(self, mock_fetch, mock_enrich, mock_lstm, mock_evaluate, mock_exog):
+        """Test that a series is fetched into the store once and read from it afterwards."""
+        mock_fetch.return_value = self.live_df.assign(Reporter='842', Partner='0', Product='87')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = TradeStore(tmp_dir)
+            list(iter_analysis_pipeline('842', '0', '87', 'USA', no_progress, store=store))
+            self.assertEqual(store.last_year(SeriesKey('842', '0', '87')), 2022)
+            events = list(iter_analysis_pipeline('842', '0', '87', 'USA', no_progress, store=store))
+        self.assertEqual(events[-1].stage, 'done')
+        mock_fetch.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
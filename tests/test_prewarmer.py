@@ -0,0 +1,134 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import threading
+import time
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.comtrade_api import SeriesKey
+from src.result_cache import ResultCache
+from src.prewarmer import PopularityTracker, LiveRequestCounter, CachePrewarmer
+from src.trade_store import TradeStore
+from src import api
+from src.pipeline import PipelineEvent
+
+USA_CARS = SeriesKey('842', '0', '87')
+CHN_CARS = SeriesKey('156', '0', '87')
+DEU_CARS = SeriesKey('276', '0', '87')
+
+class TestPrewarmer(unittest.TestCase):
+
+    def setUp(self):
+        """Set up an in-memory popularity tracker and an empty cache."""
+        self.popularity = PopularityTracker(path=None, seed_keys=[USA_CARS])
+        self.live = LiveRequestCounter()
+        self.cache = ResultCache(ttl=100)
+        self.refreshed = []
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        patcher = patch.object(api, 'trade_store', TradeStore(tmp_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def refresh(self, key):
+        self.refreshed.append(key)
+        self.cache.set(key, {'key': key})
+
+    def make_prewarmer(self, **kwargs):
+        return CachePrewarmer(self.refresh, self.cache.expires_in, self.popularity, self.live, **kwargs)
+
+    def test_popularity_ranking_and_decay(self):
+        """Test that the top-N list follows request counts and forgets stale series, but keeps the seeds."""
+        for key in [CHN_CARS, CHN_CARS, DEU_CARS]:
+            self.popularity.record(key)
+        self.assertEqual(self.popularity.top(2), [CHN_CARS, DEU_CARS, USA_CARS])
+
+        self.popularity.decay = 0.001
+        self.popularity.age()
+        self.assertEqual(self.popularity.top(5), [USA_CARS])
+        self.popularity.age()
+        self.assertEqual(self.popularity.top(5), [USA_CARS])
+        self.popularity.record(USA_CARS)
+        self.assertEqual(self.popularity.top(1), [USA_CARS])
+
+    def test_popularity_persists(self):
+        """Test that counts survive a restart so a new deploy can prewarm."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'popularity.json')
+            tracker = PopularityTracker(path=path, seed_keys=[])
+            tracker.record(CHN_CARS)
+            tracker.save()
+            self.assertEqual(PopularityTracker(path=path, seed_keys=[]).top(), [CHN_CARS])
+
+    def test_refreshes_only_due_keys(self):
+        """Test that missing and soon-to-expire entries are refreshed, fresh ones are not."""
+        self.popularity.record(CHN_CARS)
+        self.popularity.record(DEU_CARS)
+        self.cache.set(DEU_CARS, {})
+        prewarmer = self.make_prewarmer(refresh_ahead=10)
+
+        self.assertEqual(prewarmer.run_once(), 2)
+        self.assertEqual(set(self.refreshed), {USA_CARS, CHN_CARS})
+        self.assertEqual(prewarmer.run_once(), 0)
+
+        prewarmer.refresh_ahead = 1000
+        self.assertEqual(prewarmer.run_once(), 3)
+
+    def test_waits_for_idle(self):
+        """Test that nothing is refreshed while a live request is running."""
+        prewarmer = self.make_prewarmer()
+        with self.live.track():
+            self.assertEqual(prewarmer.run_once(), 0)
+        self.assertEqual(prewarmer.run_once(), 1)
+
+    def test_concurrency_cap(self):
+        """Test that no more than `max_concurrency` refreshes run at once."""
+        for key in [CHN_CARS, DEU_CARS, SeriesKey('392', '0', '87')]:
+            self.popularity.record(key)
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def slow_refresh(key):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+        prewarmer = CachePrewarmer(slow_refresh, self.cache.expires_in, self.popularity, self.live, max_concurrency=2)
+        self.assertEqual(prewarmer.run_once(), 4)
+        self.assertEqual(peak[0], 2)
+
+    def test_api_records_popularity_and_prewarms(self):
+        """Test that API requests feed the tracker and the prewarmer fills the API cache."""
+        with patch.object(api, 'result_cache', ResultCache()), patch.object(api, 'popularity', self.popularity):
+            with patch('src.api.compute_forecast', return_value={'error': None}) as mock_compute:
+                api.get_forecast(CHN_CARS)
+                self.assertIn(CHN_CARS, self.popularity.top())
+                mock_compute.assert_called_once()
+
+            done = PipelineEvent('done', (None, None, []))
+            with patch('src.api.iter_analysis_pipeline', side_effect=lambda *args, **kwargs: iter([done])):
+                prewarmer = CachePrewarmer(api._prewarm, api.result_cache.expires_in, self.popularity, self.live)
+                prewarmer.run_once()
+            self.assertIsNotNone(api.result_cache.get(CHN_CARS))
+            self.assertIsNotNone(api.result_cache.get(USA_CARS))
+
+    def test_prewarm_yields_to_live_requests(self):
+        """Test that a refresh is abandoned between stages once a live request starts."""
+        def stages(*args, **kwargs):
+            yield PipelineEvent('cleaned', None)
+            with api.live_requests.track():
+                yield PipelineEvent('sarimax', None)
+                yield PipelineEvent('done', (None, None, []))
+
+        with patch.object(api, 'result_cache', ResultCache()), \
+             patch('src.api.iter_analysis_pipeline', side_effect=stages):
+            self.assertFalse(api._prewarm(USA_CARS))
+            self.assertIsNone(api.result_cache.get(USA_CARS))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import glob
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.profiling import profile_request, request_id_var
+from src.config import _env_float
+from src import api
+
+def busy_sum(n):
+    return sum(i * i for i in range(n))
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        """Point profile output at a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        patcher = patch('src.profiling.PROFILE_DIR', self.tmp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def profiles(self):
+        return glob.glob(os.path.join(self.tmp_dir.name, '*.prof'))
+
+    def test_disabled_returns_function_unchanged(self):
+        """Test that an unconfigured profiler adds no wrapper at all."""
+        self.assertIs(profile_request(busy_sum, enabled=False, sample_rate=0.0), busy_sum)
+
+    def test_profiles_call_and_logs_hot_functions(self):
+        """Test that a profiled call saves a profile and logs a summary."""
+        wrapped = profile_request(busy_sum, enabled=True)
+        with self.assertLogs(level='INFO') as logs:
+            self.assertEqual(wrapped(1000), busy_sum(1000))
+
+        self.assertEqual(len(self.profiles()), 1)
+        self.assertIn('"event": "request_profile"', logs.output[-1])
+        self.assertIn('busy_sum', logs.output[-1])
+
+    def test_generator_and_nested_calls(self):
+        """Test that a generator is profiled once, with nested calls unprofiled."""
+        inner = profile_request(busy_sum, enabled=True)
+
+        @profile_request(enabled=True)
+        def stages():
+            yield inner(100)
+            yield inner(200)
+
+        self.assertEqual(list(stages()), [busy_sum(100), busy_sum(200)])
+        self.assertEqual(len(self.profiles()), 1)
+        self.assertIn('stages', os.path.basename(self.profiles()[0]))
+
+    def test_rotation_keeps_newest_files(self):
+        """Test that the profile directory is bounded."""
+        wrapped = profile_request(busy_sum, enabled=True)
+        with patch('src.profiling.PROFILE_MAX_FILES', 2):
+            for _ in range(4):
+                wrapped(10)
+        self.assertEqual(len(self.profiles()), 2)
+
+    def test_profile_reuses_request_id(self):
+        """Test that a profile is named after the request it was captured for."""
+        wrapped = profile_request(busy_sum, enabled=True)
+        token = request_id_var.set('req-123')
+        try:
+            wrapped(10)
+        finally:
+            request_id_var.reset(token)
+        self.assertTrue(self.profiles()[0].endswith('_busy_sum_req-123.prof'))
+
+    def test_api_request_id(self):
+        """Test that the API echoes the caller's request id and makes one otherwise."""
+        client = api.create_app().test_client()
+        self.assertEqual(client.get('/api/health', headers={'X-Request-ID': 'abc'}).headers['X-Request-ID'], 'abc')
+        self.assertTrue(client.get('/api/health').headers['X-Request-ID'])
+        self.assertIsNone(request_id_var.get())
+
+    def test_malformed_sample_rate(self):
+        """Test that a malformed sample rate falls back to the default instead of failing."""
+        with patch.dict(os.environ, {'TRADE_PROFILE_SAMPLE_RATE': 'five percent'}):
+            with self.assertLogs(level='WARNING'):
+                self.assertEqual(_env_float('TRADE_PROFILE_SAMPLE_RATE', 0.0), 0.0)
+        with patch.dict(os.environ, {'TRADE_PROFILE_SAMPLE_RATE': '0.25'}):
+            self.assertEqual(_env_float('TRADE_PROFILE_SAMPLE_RATE', 0.0), 0.25)
+
+if __name__ == '__main__':
+    unittest.main()
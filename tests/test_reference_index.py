@@ -0,0 +1,79 @@
+import unittest
+import tempfile
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.reference_index import (
+    ReferenceIndex,
+    reporter_entries,
+    commodity_entries,
+    build_reference_indexes,
+    save_reference_indexes,
+    load_reference_indexes,
+)
+
+HS_RESULTS = [
+    {"id": "TOTAL", "text": "Total of all HS commodities", "parent": "#", "isLeaf": 0, "aggrLevel": 0},
+    {"id": "87", "text": "87 - Vehicles; other than railway or tramway rolling stock", "parent": "TOTAL", "isLeaf": 0, "aggrLevel": 2},
+    {"id": "8703", "text": "8703 - Motor cars and other motor vehicles", "parent": "87", "isLeaf": 0, "aggrLevel": 4},
+    {"id": "870380", "text": "870380 - Vehicles; with only electric motor for propulsion", "parent": "8703", "isLeaf": 1, "aggrLevel": 6},
+    {"id": "01", "text": "01 - Animals; live", "parent": "TOTAL", "isLeaf": 0, "aggrLevel": 2},
+]
+REPORTER_RESULTS = [
+    {"id": 842, "text": "USA", "reporterCodeIsoAlpha3": "USA", "isGroup": False},
+    {"id": 76, "text": "Brazil", "reporterCodeIsoAlpha3": "BRA", "isGroup": False},
+]
+
+class TestReferenceIndex(unittest.TestCase):
+
+    def setUp(self):
+        """Write Comtrade-format reference files to a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.hs_path = os.path.join(self.tmp_dir.name, 'hs.json')
+        self.reporters_path = os.path.join(self.tmp_dir.name, 'reporters.json')
+        with open(self.hs_path, 'w') as f:
+            json.dump({"results": HS_RESULTS}, f)
+        with open(self.reporters_path, 'w') as f:
+            json.dump({"results": REPORTER_RESULTS}, f)
+        self.hs = ReferenceIndex(commodity_entries(self.hs_path))
+
+    def test_code_and_name_prefix_search(self):
+        """Test that codes match by prefix and names match by word prefix."""
+        self.assertEqual([e.id for e in self.hs.search('87')], ['87', '8703', '870380'])
+        self.assertEqual([e.id for e in self.hs.search('veh')], ['87', '8703', '870380'])
+        self.assertEqual([e.id for e in self.hs.search('electric veh')], ['870380'])
+        self.assertEqual(self.hs.search('zzz'), [])
+        self.assertEqual(len(self.hs.search('', limit=2)), 2)
+
+    def test_hierarchy(self):
+        """Test that parent links give children and ancestors."""
+        self.assertEqual([e.id for e in self.hs.children('87')], ['8703'])
+        self.assertEqual([e.id for e in self.hs.ancestors('870380')], ['8703', '87', 'TOTAL'])
+        self.assertEqual([c[1] for c in self.hs.choices(max_level=2)], ['01', '87', 'TOTAL'])
+
+    def test_round_trip_and_country_codes(self):
+        """Test that the prebuilt index loads back with the same search results."""
+        reporters, commodities = build_reference_indexes(self.reporters_path, self.hs_path)
+        self.assertEqual(reporters.iso3_map(), {'76': 'BRA', '842': 'USA'})
+
+        path = os.path.join(self.tmp_dir.name, 'index.json')
+        save_reference_indexes(reporters, commodities, path)
+        loaded_reporters, loaded_commodities = load_reference_indexes(path)
+        self.assertEqual(loaded_commodities.search('motor'), commodities.search('motor'))
+        self.assertEqual(loaded_reporters.get('76').text, 'Brazil')
+
+    def test_local_list_fallback(self):
+        """Test that the small local lists without Comtrade fields still load."""
+        path = os.path.join(self.tmp_dir.name, 'local.json')
+        with open(path, 'w') as f:
+            json.dump([{"id": "AG2", "text": "Agricultural products (2-digit)"}, {"id": "87", "text": "Vehicles"}], f)
+        index = ReferenceIndex(commodity_entries(path))
+        self.assertEqual([(e.id, e.level) for e in index.entries], [('87', 2), ('AG2', 0)])
+        self.assertEqual(reporter_entries(self.reporters_path)[0].id, '842')
+
+if __name__ == '__main__':
+    unittest.main()
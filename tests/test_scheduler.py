@@ -0,0 +1,43 @@
+import unittest
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.scheduler import FitTimeHistory, StageScheduler
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a fit-time history with known priors."""
+        self.history = FitTimeHistory(priors={'sarimax': 0.01, 'lstm': 1.0}, alpha=0.5, bucket_size=5)
+
+    def test_estimate_uses_prior_then_history(self):
+        """Test that estimates fall back to priors and then follow observations."""
+        self.assertAlmostEqual(self.history.estimate('lstm', 20), 20.0)
+        self.history.record('lstm', 20, 4.0)
+        self.assertAlmostEqual(self.history.estimate('lstm', 20), 4.0)
+        self.history.record('lstm', 20, 2.0)
+        self.assertAlmostEqual(self.history.estimate('lstm', 20), 3.0)
+
+    def test_estimate_scales_from_nearest_length(self):
+        """Test that an untimed series length is scaled from the nearest timed one."""
+        self.history.record('lstm', 10, 2.0)
+        self.assertGreater(self.history.estimate('lstm', 30), 2.0)
+
+    def test_skips_stage_that_exceeds_budget(self):
+        """Test that an expensive stage is skipped and reported."""
+        scheduler = StageScheduler(budget_seconds=5, history=self.history)
+        self.assertEqual(scheduler.run('sarimax', 20, lambda: 'sarimax', required=True), 'sarimax')
+        self.assertIsNone(scheduler.run('lstm', 20, lambda: 'lstm'))
+        self.assertEqual(scheduler.skipped, ['lstm'])
+
+    def test_no_budget_runs_everything(self):
+        """Test that without a budget every stage runs and is timed."""
+        scheduler = StageScheduler(history=self.history)
+        self.assertEqual(scheduler.run('lstm', 20, lambda: 'lstm'), 'lstm')
+        self.assertEqual(scheduler.skipped, [])
+        self.assertLess(self.history.estimate('lstm', 20), 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import pickle
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.comtrade_api import SeriesKey
+from src.exog_features import ExogFeatureMatrix
+from src.baseline_forecasting import forecast_baseline
+from src.shared_data import (
+    SharedDataPlane,
+    attach_array,
+    shared_exog,
+    shared_series,
+    run_model,
+)
+
+KEYS = [SeriesKey('842', '0', '87'), SeriesKey('842', '156', '87')]
+
+class TestSharedData(unittest.TestCase):
+
+    def setUp(self):
+        """Publish a feature matrix and two series of different lengths."""
+        self.plane = SharedDataPlane()
+        self.matrix = ExogFeatureMatrix(2000, ['GDP_USD'], 1000 * 1.03 ** np.arange(25.0)[:, None])
+        self.series = {
+            KEYS[0]: pd.Series(100 + 10 * np.arange(20.0), index=range(2004, 2024)),
+            KEYS[1]: pd.Series(50 + 5 * np.arange(12.0), index=range(2012, 2024)),
+        }
+        self.plane.publish_exog('USA', self.matrix)
+        self.plane.publish_panel(self.series)
+
+    def tearDown(self):
+        self.plane.close()
+
+    def test_attach_is_zero_copy_and_read_only(self):
+        """Test that attached arrays share one buffer and cannot be written."""
+        handle = self.plane.handles[('exog', 'USA')].array
+        first, second = attach_array(handle), attach_array(handle)
+        self.assertTrue(np.shares_memory(first, second))
+        self.assertTrue(np.array_equal(first, self.matrix.values))
+        with self.assertRaises(ValueError):
+            first[0, 0] = 0.0
+
+        exog = shared_exog('USA', self.plane.handles)
+        self.assertTrue(np.shares_memory(exog.values, first))
+        self.assertIsNone(shared_exog('DEU', self.plane.handles))
+
+    def test_shared_series(self):
+        """Test that a series comes back without the padding of the panel."""
+        df = shared_series(KEYS[1], self.plane.handles)
+        self.assertEqual(len(df), 12)
+        self.assertEqual(df['Year'].iloc[0], pd.Timestamp('2012-01-01'))
+        self.assertEqual(df['Value'].tolist(), self.series[KEYS[1]].tolist())
+        self.assertTrue(np.shares_memory(df['Value'].values, attach_array(self.plane.handles['panel'].array)))
+        with self.assertRaises(KeyError):
+            shared_series(SeriesKey('842', '276', '87'), self.plane.handles)
+
+    def test_shared_series_with_gaps(self):
+        """Test that missing years inside a series are interpolated and trailing padding is dropped."""
+        gappy = self.series[KEYS[0]].drop([2010, 2011])
+        early = pd.Series(self.series[KEYS[1]].values[:8], index=range(2012, 2020))
+        with SharedDataPlane() as plane:
+            plane.publish_exog('USA', self.matrix)
+            plane.publish_panel({KEYS[0]: gappy, KEYS[1]: early})
+            df = shared_series(KEYS[0], plane.handles)
+            self.assertEqual(len(df), 20)
+            self.assertFalse(df['Value'].isna().any())
+            self.assertTrue(np.allclose(df['Value'], self.series[KEYS[0]].values))
+            self.assertEqual(shared_series(KEYS[1], plane.handles)['Year'].iloc[-1], pd.Timestamp('2019-01-01'))
+
+            expected = forecast_baseline(shared_series(KEYS[0], self.plane.handles), self.matrix)
+            self.assertTrue(np.allclose(forecast_baseline(df, self.matrix).values, expected.values))
+
+    def test_handles_are_small(self):
+        """Test that the handles sent to workers do not carry the data."""
+        self.assertLess(len(pickle.dumps(self.plane.handles)), 1000)
+
+    def test_worker_process(self):
+        """Test that a spawned worker forecasts a series attached by key."""
+        with self.plane.executor(max_workers=1) as executor:
+            forecast_df = executor.submit(run_model, 'baseline', KEYS[0], 'USA').result(timeout=120)
+            with self.assertRaises(KeyError):
+                executor.submit(run_model, 'baseline', KEYS[0], 'DEU').result(timeout=120)
+        expected = forecast_baseline(shared_series(KEYS[0], self.plane.handles), self.matrix)
+        self.assertTrue(np.allclose(forecast_df['mean'], expected['mean']))
+
+    def test_close_unlinks(self):
+        """Test that closing the plane removes the shared memory blocks."""
+        handle = self.plane.handles['panel'].array
+        self.plane.close()
+        with self.assertRaises(FileNotFoundError):
+            attach_array(handle)
+
+if __name__ == '__main__':
+    unittest.main()
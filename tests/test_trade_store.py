@@ -0,0 +1,93 @@
+import unittest
+import tempfile
+import pandas as pd
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.comtrade_api import SeriesKey
+from src.trade_store import TradeStore, refresh_series, pending_period
+
+class FakeFetch:
+    """Returns trade rows for the requested years and records each call."""
+
+    def __init__(self, years):
+        self.years = years
+        self.periods = []
+
+    def __call__(self, reporter_id, partner_id, product_id, period='recent'):
+        self.periods.append(period)
+        years = self.years if period == 'recent' else [int(y) for y in period.split(',')]
+        years = [y for y in years if y in self.years]
+        return pd.DataFrame({
+            'Year': years,
+            'Reporter': reporter_id,
+            'Partner': partner_id,
+            'Product': product_id,
+            'Value': [float(y) for y in years],
+        })
+
+class TestTradeStore(unittest.TestCase):
+
+    def setUp(self):
+        """Set up an empty store in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = TradeStore(self.tmp_dir.name)
+        self.key = SeriesKey('842', '0', '87')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_pending_period(self):
+        """Test the period string for new, current, and lagging series."""
+        self.assertEqual(pending_period(None), 'recent')
+        self.assertEqual(pending_period(2022, current_year=2023), None)
+        self.assertEqual(pending_period(2020, current_year=2023), '2021,2022')
+
+    def test_refresh_fetches_only_new_periods(self):
+        """Test that a second refresh only asks for years after the last stored one."""
+        fetch = FakeFetch(list(range(2000, 2021)))
+        refresh_series(self.store, [self.key], fetch_fn=fetch, current_year=2023)
+        self.assertEqual(self.store.last_year(self.key), 2020)
+
+        fetch.years = list(range(2000, 2023))
+        appended = refresh_series(self.store, fetch_fn=fetch, current_year=2023)
+
+        self.assertEqual(fetch.periods, ['recent', '2021,2022'])
+        self.assertEqual(appended[self.key], 2)
+        self.assertEqual(len(self.store.load(self.key)), 23)
+
+    def test_only_updated_series_are_stale(self):
+        """Test that series without new data keep their artifacts fresh."""
+        other = SeriesKey('156', '0', '87')
+        fetch = FakeFetch(list(range(2000, 2021)))
+        refresh_series(self.store, [self.key, other], fetch_fn=fetch, current_year=2023)
+        for key in (self.key, other):
+            self.store.mark_fresh(key, 'forecast')
+
+        fetch.years.append(2021)
+        self.store.append(self.key, fetch(*self.key, period='2021'))
+
+        self.assertEqual(self.store.stale_series('forecast'), [self.key])
+        self.assertFalse(self.store.is_stale(other, 'forecast'))
+
+    def test_stored_result_is_fresh_until_new_data(self):
+        """Test that a saved result is served until an append makes it stale."""
+        refresh_series(self.store, [self.key], fetch_fn=FakeFetch(list(range(2000, 2021))), current_year=2023)
+        self.assertIsNone(self.store.fresh_result(self.key))
+        self.store.save_result(self.key, {'forecast': [{'Year': 2021, 'mean': 1.0}]})
+        self.assertEqual(self.store.fresh_result(self.key)['forecast'][0]['mean'], 1.0)
+        self.assertEqual(self.store.stale_series('model'), [])
+
+        self.store.append(self.key, FakeFetch([2021])(*self.key, period='2021'))
+        self.assertIsNone(self.store.fresh_result(self.key))
+
+    def test_manifest_persists(self):
+        """Test that a reopened store remembers the last stored year."""
+        refresh_series(self.store, [self.key], fetch_fn=FakeFetch([2019, 2020]), current_year=2023)
+        reopened = TradeStore(self.tmp_dir.name)
+        self.assertEqual(reopened.last_year(self.key), 2020)
+
+if __name__ == '__main__':
+    unittest.main()